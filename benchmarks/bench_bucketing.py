@@ -0,0 +1,59 @@
+"""
+Time the bucketing strategies in `explainaboard.utils.bucketing` on synthetic feature values, e.g.
+
+    python benchmarks/bench_bucketing.py --sizes 1000000 10000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from explainaboard.utils import bucketing
+
+
+def _time(func, **kwargs) -> float:
+    start = time.perf_counter()
+    func(**kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark bucketing strategies')
+    parser.add_argument(
+        '--sizes',
+        type=int,
+        nargs="+",
+        default=[10**5, 10**6, 10**7],
+        help="numbers of samples to bucket",
+    )
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print("n_samples\tvalue\tinterval\tdiscrete")
+    for n in args.sizes:
+        lengths = rng.integers(1, 200, size=n).astype(np.float64)
+        ratios = rng.random(n).round(3)
+        labels = rng.choice(["PER", "LOC", "ORG", "MISC"], size=n).astype(object)
+
+        value_time = _time(
+            bucketing.bucket_attribute_specified_bucket_value,
+            dict_obj=lengths,
+            bucket_number=4,
+            bucket_setting=(),
+        )
+        interval_time = _time(
+            bucketing.bucket_attribute_specified_bucket_interval,
+            dict_obj=ratios,
+            bucket_setting=[(0.0,), (0.0, 0.5), (0.5, 0.9), (0.9, 1.0)],
+        )
+        discrete_time = _time(
+            bucketing.bucket_attribute_discrete_value,
+            dict_obj=labels,
+            bucket_number=4,
+            bucket_setting=1,
+        )
+        print(f"{n}\t{value_time:.3f}s\t{interval_time:.3f}s\t{discrete_time:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+Time the extraction of NER bucket cases (mis-predicted entities) on a CoNLL-2003 sized system output, comparing the
+single pass of `NERProcessor.get_bucket_cases_ner()` with the former per-bucket extraction over "|||"-joined span
+addresses, e.g.
+
+    python benchmarks/bench_ner_bucket_cases.py --repeat 4
+"""
+import argparse
+import os
+import time
+
+from explainaboard import FileType, Source, TaskType, get_loader, get_processor
+from explainaboard.utils import bucketing
+
+_DEFAULT_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "data/system_outputs/conll2003/conll2003.elmo"
+)
+
+
+def _create_sample_dict(samp_bucket, interval):
+    dict_pos2tag = {}
+    for k_bucket_eval, spans in samp_bucket.items():
+        if k_bucket_eval != interval:
+            continue
+        for span in spans:
+            pos = "|||".join(span.split("|||")[0:4])
+            tag = span.split("|||")[-1]
+            dict_pos2tag[pos] = tag
+    return dict_pos2tag
+
+
+def _per_bucket_cases(sys_output, samples_over_bucket, samples_over_bucket_pred):
+    """
+    The former extraction: one pass over all buckets of the feature for every bucket
+    """
+    bucket_cases = {}
+    for bucket_interval in samples_over_bucket:
+        dict_pos2tag_pred = _create_sample_dict(
+            samples_over_bucket_pred, bucket_interval
+        )
+        dict_pos2tag = _create_sample_dict(samples_over_bucket, bucket_interval)
+        error_case_list = []
+        for pos, tag in dict_pos2tag.items():
+            pred_label = dict_pos2tag_pred.get(pos, "O")
+            if pred_label != tag:
+                sent_id = int(pos.split("|||")[0])
+                error_case_list.append(
+                    {
+                        "span": pos.split("|||")[-1],
+                        "text": str(sys_output[sent_id]["id"]),
+                        "true_label": tag,
+                        "predicted_label": pred_label,
+                    }
+                )
+        for pos, tag in dict_pos2tag_pred.items():
+            true_label = dict_pos2tag.get(pos, "O")
+            if true_label != tag:
+                sent_id = int(pos.split("|||")[0])
+                error_case_list.append(
+                    {
+                        "span": pos.split("|||")[-1],
+                        "text": sys_output[sent_id]["id"],
+                        "true_label": true_label,
+                        "predicted_label": tag,
+                    }
+                )
+        bucket_cases[bucket_interval] = error_case_list
+    return bucket_cases
+
+
+def _addresses(span_table, tags, span_ids):
+    spans = span_table.spans
+    return [
+        f'{spans["sample_id"][i]}|||{spans["start"][i]}|||{spans["end"][i]}|||'
+        f'{span_table.texts[i]}|||{tags[spans["tag_id"][i]]}'
+        for i in span_ids.tolist()
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark NER bucket case extraction')
+    parser.add_argument(
+        '--path',
+        type=str,
+        default=_DEFAULT_PATH,
+        help="a CoNLL-formatted NER system output",
+    )
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=1,
+        help="how many copies of the system output to concatenate",
+    )
+    args = parser.parse_args()
+
+    loader = get_loader(
+        TaskType.named_entity_recognition,
+        Source.local_filesystem,
+        FileType.conll,
+        args.path,
+    )
+    data = list(loader.load())
+    sys_output = [
+        dict(sample, id=str(i)) for i, sample in enumerate(data * args.repeat)
+    ]
+    processor = get_processor(TaskType.named_entity_recognition)
+    sys_info = processor._get_sys_info({})
+    processor._complete_features(sys_info, sys_output)
+
+    bucket_features = sys_info.features.get_bucket_features()
+    pcf_set = set(sys_info.features.get_pre_computed_features())
+    tag_to_id = {}
+    true_spans = processor._get_span_table(
+        sys_output, "true_entity_info", bucket_features, pcf_set, tag_to_id
+    )
+    pred_spans = processor._get_span_table(
+        sys_output, "pred_entity_info", bucket_features, pcf_set, tag_to_id
+    )
+    tags = list(tag_to_id)
+    print(f"{len(sys_output)} sentences, {len(true_spans)} true spans")
+
+    print("feature\tbuckets\tper-bucket\tsingle-pass\tspeedup")
+    for feature_name in bucket_features:
+        if feature_name not in true_spans.features:
+            continue
+        if feature_name in sys_info.features:
+            bucket_info = sys_info.features[feature_name].bucket_info
+        else:
+            bucket_info = (
+                sys_info.features["true_entity_info"]
+                .feature.feature[feature_name]
+                .bucket_info
+            )
+        samples_over_bucket = getattr(bucketing, bucket_info.method)(
+            dict_obj=true_spans.features[feature_name],
+            bucket_number=bucket_info.number,
+            bucket_setting=bucket_info.setting,
+        )
+        samples_over_bucket_pred = bucketing.bucket_attribute_specified_bucket_interval(
+            dict_obj=pred_spans.features[feature_name],
+            bucket_setting=samples_over_bucket.keys(),
+        )
+        addresses = {
+            k: _addresses(true_spans, tags, v) for k, v in samples_over_bucket.items()
+        }
+        addresses_pred = {
+            k: _addresses(pred_spans, tags, v)
+            for k, v in samples_over_bucket_pred.items()
+        }
+
+        start = time.perf_counter()
+        expected = _per_bucket_cases(sys_output, addresses, addresses_pred)
+        per_bucket_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        bucket_cases = processor.get_bucket_cases_ner(
+            sys_output,
+            samples_over_bucket,
+            samples_over_bucket_pred,
+            true_spans,
+            pred_spans,
+            tags,
+        )
+        single_pass_time = time.perf_counter() - start
+        assert bucket_cases == expected
+        print(
+            f"{feature_name}\t{len(samples_over_bucket)}\t{per_bucket_time:.3f}s\t"
+            f"{single_pass_time:.3f}s\t{per_bucket_time / single_pass_time:.1f}x"
+        )
+
+
+if __name__ == '__main__':
+    main()
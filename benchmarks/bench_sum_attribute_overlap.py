@@ -0,0 +1,110 @@
+"""
+Time the extractive fragment matching of `SUMAttribute.overlap()` on synthetic documents of several lengths,
+comparing it with the former matcher that scans every text position for every summary position, e.g.
+
+    python benchmarks/bench_sum_attribute_overlap.py --lengths 500 2000 8000
+"""
+import argparse
+import random
+import time
+
+from explainaboard.utils.feature_functions.sum_attribute import SUMAttribute
+
+
+def _scan_overlap(a, b):
+    """
+    The former matcher, with nested loops over the summary and text positions
+    """
+    matches = []
+    a_start = 0
+    b_start = 0
+    while a_start < len(a):
+        best_match = None
+        best_match_length = 0
+        while b_start < len(b):
+            if a[a_start] == b[b_start]:
+                a_end = a_start
+                b_end = b_start
+                while a_end < len(a) and b_end < len(b) and b[b_end] == a[a_end]:
+                    b_end += 1
+                    a_end += 1
+                length = a_end - a_start
+                if length > best_match_length:
+                    best_match = SUMAttribute.Match(a_start, b_start, length)
+                    best_match_length = length
+                b_start = b_end
+            else:
+                b_start += 1
+        b_start = 0
+        if best_match:
+            if best_match_length > 0:
+                matches.append(best_match)
+            a_start += best_match_length
+        else:
+            a_start += 1
+    return matches
+
+
+def _make_document(rng, length, vocab_size):
+    # Zipf-like token frequencies, as in natural text
+    weights = [1.0 / (rank + 1) for rank in range(vocab_size)]
+    return [f"w{i}" for i in rng.choices(range(vocab_size), weights, k=length)]
+
+
+def _make_summary(rng, text, length, vocab_size):
+    # copied fragments of the text, mixed with novel tokens
+    summary = []
+    while len(summary) < length:
+        if rng.random() < 0.7:
+            start = rng.randrange(len(text))
+            summary.extend(text[start : start + rng.randint(1, 12)])
+        else:
+            summary.append(f"w{rng.randrange(vocab_size * 2)}")
+    return summary[:length]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark SUMAttribute.overlap')
+    parser.add_argument(
+        '--lengths',
+        type=int,
+        nargs="*",
+        default=[250, 1000, 4000, 16000],
+        help="the document lengths in tokens",
+    )
+    parser.add_argument(
+        '--summary_length', type=int, default=60, help="the summary length in tokens"
+    )
+    parser.add_argument(
+        '--samples', type=int, default=10, help="the number of samples per length"
+    )
+    parser.add_argument('--vocab_size', type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    sum_attribute = SUMAttribute()
+    print("doc length\tscan\tindexed\tspeedup")
+    for length in args.lengths:
+        samples = []
+        for _ in range(args.samples):
+            text = _make_document(rng, length, args.vocab_size)
+            samples.append(
+                (_make_summary(rng, text, args.summary_length, args.vocab_size), text)
+            )
+
+        start = time.perf_counter()
+        expected = [_scan_overlap(summary, text) for summary, text in samples]
+        scan_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        matches = [sum_attribute.overlap(summary, text) for summary, text in samples]
+        indexed_time = time.perf_counter() - start
+        assert matches == expected
+        print(
+            f"{length}\t{scan_time:.3f}s\t{indexed_time:.3f}s\t"
+            f"{scan_time / indexed_time:.1f}x"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,14 @@
 import argparse
+import itertools
 import json
 
 from explainaboard import get_loader, get_processor
 from explainaboard import TaskType
 from explainaboard import get_pairwise_performance_gap
+from explainaboard.loaders.loader import Loader
+from explainaboard.utils.logging import get_logger
+
+logger = get_logger(__name__)
 
 
 def main():
@@ -60,6 +65,71 @@ def main():
         help="multiple metrics should be separated by space",
     )
 
+    parser.add_argument(
+        '--num_workers',
+        type=int,
+        required=False,
+        default=1,
+        help="the number of processes used to calculate features",
+    )
+
+    parser.add_argument(
+        '--num_bucketing_threads',
+        type=int,
+        required=False,
+        default=1,
+        help="the number of threads used to bucket and evaluate features",
+    )
+
+    parser.add_argument(
+        '--scorer',
+        type=str,
+        required=False,
+        default="eaas",
+        choices=["eaas", "local"],
+        help="score generated texts with the EaaS service or locally (bleu and rouge metrics only)",
+    )
+
+    parser.add_argument(
+        '--cache_scores',
+        action="store_true",
+        help="reuse the sample-level scores of previous runs (local scorer only)",
+    )
+
+    parser.add_argument(
+        '--spacy_batch_size',
+        type=int,
+        required=False,
+        default=256,
+        help="the number of texts that spacy processes at once to find named entities",
+    )
+
+    parser.add_argument(
+        '--spacy_n_process',
+        type=int,
+        required=False,
+        default=1,
+        help="the number of processes spacy uses to find named entities (-1 means one per CPU)",
+    )
+
+    parser.add_argument(
+        '--cache_entities',
+        action="store_true",
+        help="reuse the named entities found in previous runs",
+    )
+
+    parser.add_argument(
+        '--chunk_size',
+        type=int,
+        required=False,
+        default=None,
+        help="analyze a single system output in chunks of this many samples instead of loading it into memory, "
+        "for tasks whose processor supports streaming. Memory is only bounded for loaders that read lazily "
+        "(tsv files of text classification, text pair classification, summarization and machine translation), other "
+        "loaders read the whole file first. Summarization and machine translation need --scorer local. Confidence "
+        "intervals, bucket cases and --num_bucketing_threads do not apply",
+    )
+
     args = parser.parse_args()
 
     dataset = args.dataset
@@ -69,6 +139,14 @@ def main():
     system_outputs = args.system_outputs
     num_outputs = len(system_outputs)
     metric_names = args.metrics
+    num_workers = args.num_workers
+    num_bucketing_threads = args.num_bucketing_threads
+    scorer = args.scorer
+    cache_scores = args.cache_scores
+    spacy_batch_size = args.spacy_batch_size
+    spacy_n_process = args.spacy_n_process
+    cache_entities = args.cache_entities
+    chunk_size = args.chunk_size
 
     # Checks on inputs
     if num_outputs > 2:
@@ -80,6 +158,49 @@ def main():
             f'Task name {task} was not recognized. ExplainaBoard currently supports: {TaskType.list()}'
         )
 
+    # Setup metadata
+    metadata = {
+        "dataset_name": dataset,
+        "sub_dataset_name": sub_dataset,
+        "task_name": task,
+        "reload_stat": reload_stat,
+        "num_workers": num_workers,
+        "num_bucketing_threads": num_bucketing_threads,
+        "scorer": scorer,
+        "cache_scores": cache_scores,
+        "spacy_batch_size": spacy_batch_size,
+        "spacy_n_process": spacy_n_process,
+        "cache_entities": cache_entities,
+    }
+    if metric_names is not None:
+        metadata["metric_names"] = metric_names
+
+    if chunk_size is not None:
+        if num_outputs != 1:
+            raise ValueError(
+                '--chunk_size only supports the analysis of 1 system output'
+            )
+        processor = get_processor(task)
+        if not processor.supports_streaming():
+            raise ValueError(f'--chunk_size is not supported for task {task}')
+        loader = get_loader(task, data=system_outputs[0])
+        if type(loader).iter_load is Loader.iter_load:
+            logger.warning(
+                "%s reads the whole system output into memory before it is analyzed in chunks",
+                type(loader).__name__,
+            )
+        sys_output = loader.iter_load()
+        # the user defined features are read along with the first data point
+        first = next(sys_output, None)
+        metadata["user_defined_features_configs"] = loader.user_defined_features_configs
+        report = processor.process_stream(
+            metadata=metadata,
+            sys_output=itertools.chain([] if first is None else [first], sys_output),
+            chunk_size=chunk_size,
+        )
+        report.print_as_json()
+        return
+
     # Read in data and check validity
     loaders = [get_loader(task, data=x) for x in system_outputs]
     system_datasets = [list(loader.load()) for loader in loaders]
@@ -99,17 +220,7 @@ def main():
             raise ValueError(
                 "User defined features must be the same for pairwise analysis."
             )
-
-    # Setup metadata
-    metadata = {
-        "dataset_name": dataset,
-        "sub_dataset_name": sub_dataset,
-        "task_name": task,
-        "reload_stat": reload_stat,
-        "user_defined_features_configs": loaders[0].user_defined_features_configs,
-    }
-    if metric_names is not None:
-        metadata["metric_names"] = metric_names
+    metadata["user_defined_features_configs"] = loaders[0].user_defined_features_configs
 
     # Run analysis
     reports = [
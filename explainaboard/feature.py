@@ -4,7 +4,6 @@ from collections.abc import Iterable
 from typing import Tuple, Union
 from explainaboard import config
 import numpy as np
-import pandas as pd
 from explainaboard.utils.py_utils import zip_dict
 import pyarrow as pa
 import re
@@ -137,6 +136,10 @@ def _cast_to_python_objects(obj: Any, only_1d_for_numpy: bool) -> Tuple[Any, boo
     if config.JAX_AVAILABLE and "jax" in sys.modules:
         import jax.numpy as jnp
 
+    # pandas objects can only exist if pandas has been imported
+    if "pandas" in sys.modules:
+        import pandas as pd
+
     if isinstance(obj, np.ndarray):
         if not only_1d_for_numpy or obj.ndim == 1:
             return obj, False
@@ -189,9 +192,9 @@ def _cast_to_python_objects(obj: Any, only_1d_for_numpy: bool) -> Tuple[Any, boo
                 ],
                 True,
             )
-    elif isinstance(obj, pd.Series):
+    elif "pandas" in sys.modules and isinstance(obj, pd.Series):
         return obj.values.tolist(), True
-    elif isinstance(obj, pd.DataFrame):
+    elif "pandas" in sys.modules and isinstance(obj, pd.DataFrame):
         return obj.to_dict("list"), True
     elif isinstance(obj, dict):
         output = {}
@@ -79,6 +79,17 @@ class SysOutputInfo:
                                         column type.
         is_print_case (bool): Whether or not to print out cases
         is_print_confidence_interval (bool): Whether or not to print out confidence intervals
+        num_workers (int): The number of processes used to calculate features (1 means no parallelism). Named entity
+                           recognition ignores it and calculates features serially
+        num_bucketing_threads (int): The number of threads used to bucket and evaluate features (1 means no
+                                     parallelism)
+        scorer (str): The backend that scores generated texts, "eaas" or "local" (see `utils.scorers`)
+        cache_scores (bool): Whether or not to reuse the sample-level scores of previous runs (see
+                             `utils.score_cache`), for scorers whose scores can be cached (not "eaas")
+        spacy_batch_size (int): The number of texts that spacy processes at once to find named entities
+        spacy_n_process (int): The number of processes spacy uses to find named entities (-1 means one per CPU)
+        cache_entities (bool): Whether or not to reuse the named entities found in previous runs (see
+                               `utils.entity_cache`)
     """
 
     # set in the system_output scripts
@@ -90,6 +101,13 @@ class SysOutputInfo:
     reload_stat: bool = True
     is_print_case: bool = True
     is_print_confidence_interval: bool = False
+    num_workers: int = 1
+    num_bucketing_threads: int = 1
+    scorer: str = "eaas"
+    cache_scores: bool = False
+    spacy_batch_size: int = 256
+    spacy_n_process: int = 1
+    cache_entities: bool = False
     # language : str = "English"
 
     # set later
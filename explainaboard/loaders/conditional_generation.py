@@ -1,4 +1,4 @@
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, Iterator
 from explainaboard.constants import Source, FileType
 from .loader import register_loader
 from .loader import Loader
@@ -33,35 +33,31 @@ class ConditionalGenerationLoader(Loader):
         text \t label \t predicted_label
         :return: class object
         """
+        return list(self.iter_load())
 
-        super().load()
-        data: List[Dict] = []
+    def iter_load(self) -> Iterator[Dict]:
+        raw_data = self._iter_raw_data_points()
         if self._file_type == FileType.tsv:
-            for id, dp in enumerate(self._raw_data):
+            for id, dp in enumerate(raw_data):
                 source, reference, hypothesis = dp[:3]
-                data.append(
-                    {
-                        "id": str(id),
-                        "source": source.strip(),
-                        "reference": reference.strip(),
-                        "hypothesis": hypothesis.strip(),
-                    }
-                )
+                yield {
+                    "id": str(id),
+                    "source": source.strip(),
+                    "reference": reference.strip(),
+                    "hypothesis": hypothesis.strip(),
+                }
         elif self._file_type == FileType.json:  # This function has been unittested
-            for id, info in enumerate(self._raw_data):
+            for id, info in enumerate(raw_data):
                 source, reference, hypothesis = (
                     info["source"],
                     info["references"],
                     info["hypothesis"],
                 )
-                data.append(
-                    {
-                        "id": str(id),
-                        "source": source.strip(),
-                        "reference": reference.strip(),
-                        "hypothesis": hypothesis.strip(),
-                    }
-                )
+                yield {
+                    "id": str(id),
+                    "source": source.strip(),
+                    "reference": reference.strip(),
+                    "hypothesis": hypothesis.strip(),
+                }
         else:
             raise NotImplementedError
-        return data
@@ -2,7 +2,6 @@ from typing import Dict, Iterable, List
 from explainaboard.constants import Source, FileType
 from .loader import register_loader
 from .loader import Loader
-from datasets import load_dataset
 from explainaboard.tasks import TaskType
 
 
@@ -27,6 +26,8 @@ class HellaswagLoader(Loader):
         text \t label \t predicted_label
         :return: class object
         """
+        from datasets import load_dataset
+
         super().load()
         dataset = load_dataset('hellaswag')['validation']
 
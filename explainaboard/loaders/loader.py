@@ -1,5 +1,6 @@
-from typing import Dict, Iterable, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
 import typing as t
+import importlib
 import json
 from io import StringIO
 import csv
@@ -79,18 +80,52 @@ class Loader:
         self._raw_data = raw_data
         return raw_data
 
+    def _iter_raw_data_points(self) -> Iterator:
+        """
+        iterates over the data points like `_load_raw_data_points()`, but reads tsv files from the local filesystem
+        line by line instead of loading them into memory first
+        """
+        if self._source == Source.local_filesystem and self._file_type == FileType.tsv:
+            self._user_defined_features_configs = {}
+            with open(self._data, "r", encoding="utf8") as fin:
+                yield from csv.reader(fin, delimiter='\t')
+        else:
+            yield from self._load_raw_data_points()
+
     def load(self) -> Iterable[dict]:
         return self._load_raw_data_points()
 
+    def iter_load(self) -> Iterator[dict]:
+        """
+        iterates over the loaded data points, so that system outputs too large for memory can be processed in
+        chunks (see `Processor.process_stream()`). Loaders that can read their input lazily override this.
+        """
+        return iter(self.load())
+
 
 # loader_registry is a global variable, storing all basic loading functions
 _loader_registry: Dict = {}
 
+# the module defining the loader of each task, which is imported on the first `get_loader()` of the task
+_loader_modules = {
+    TaskType.text_classification: "explainaboard.loaders.text_classification",
+    TaskType.named_entity_recognition: "explainaboard.loaders.named_entity_recognition",
+    TaskType.question_answering_extractive: "explainaboard.loaders.extractive_qa",
+    TaskType.summarization: "explainaboard.loaders.conditional_generation",
+    TaskType.machine_translation: "explainaboard.loaders.conditional_generation",
+    TaskType.text_pair_classification: "explainaboard.loaders.text_pair_classification",
+    TaskType.hellaswag: "explainaboard.loaders.hellaswag",
+    TaskType.aspect_based_sentiment_classification: "explainaboard.loaders.aspect_based_sentiment_classification",
+    TaskType.kg_link_tail_prediction: "explainaboard.loaders.kg_link_tail_prediction",
+    TaskType.qa_multiple_choice: "explainaboard.loaders.qa_multiple_choice",
+}
+
 
 def get_loader(
     task: TaskType, source: Source = None, file_type: FileType = None, data: str = None
 ) -> Loader:
-
+    if task not in _loader_registry and task in _loader_modules:
+        importlib.import_module(_loader_modules[task])
     return _loader_registry[task](source, file_type, data)
 
 
@@ -98,6 +133,7 @@ def register_loader(task_type: TaskType):
     """
     a register for different data loaders, for example
     For example, `@register_loader(TaskType.text_classification)`
+    When a new loader is implemented, remember to add its module to `_loader_modules` so it gets registered
     """
 
     def register_loader_fn(cls):
@@ -1,4 +1,4 @@
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, Iterator
 from explainaboard.constants import Source, FileType
 from explainaboard.tasks import TaskType
 from .loader import register_loader
@@ -32,50 +32,45 @@ class TextClassificationLoader(Loader):
         text \t label \t predicted_label
         :return: class object
         """
-        super().load()
-        data: List[Dict] = []
+        return list(self.iter_load())
+
+    def iter_load(self) -> Iterator[Dict]:
+        raw_data = self._iter_raw_data_points()
         if self._file_type == FileType.tsv:
-            for id, dp in enumerate(self._raw_data):
+            for id, dp in enumerate(raw_data):
                 text, true_label, predicted_label = dp[:3]
-                data.append(
-                    {
-                        "id": str(id),
-                        "text": text.strip(),
-                        "true_label": true_label.strip(),
-                        "predicted_label": predicted_label.strip(),
-                    }
-                )
+                yield {
+                    "id": str(id),
+                    "text": text.strip(),
+                    "true_label": true_label.strip(),
+                    "predicted_label": predicted_label.strip(),
+                }
         elif self._file_type == FileType.json:
-            for id, info in enumerate(self._raw_data):
+            for id, info in enumerate(raw_data):
                 text, true_label, predicted_label = (
                     info["text"],
                     info["true_label"],
                     info["predicted_label"],
                 )
-                data.append(
-                    {
-                        "id": str(id),
-                        "text": text.strip(),
-                        "true_label": true_label.strip(),
-                        "predicted_label": predicted_label.strip(),
-                    }
-                )
+                yield {
+                    "id": str(id),
+                    "text": text.strip(),
+                    "true_label": true_label.strip(),
+                    "predicted_label": predicted_label.strip(),
+                }
         elif self._file_type == FileType.datalab:
-            for id, info in enumerate(self._raw_data):
+            for id, info in enumerate(raw_data):
                 text, true_label, predicted_label = (
                     info["text"],
                     info["label"],
                     info["prediction"],
                 )
 
-                data.append(
-                    {
-                        "id": str(id),
-                        "text": text.strip(),
-                        "true_label": true_label,
-                        "predicted_label": predicted_label,
-                    }
-                )
+                yield {
+                    "id": str(id),
+                    "text": text.strip(),
+                    "true_label": true_label,
+                    "predicted_label": predicted_label,
+                }
         else:
             raise NotImplementedError
-        return data
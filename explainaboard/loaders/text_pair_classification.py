@@ -1,4 +1,4 @@
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, Iterator
 from explainaboard.constants import Source, FileType
 from explainaboard.tasks import TaskType
 from .loader import register_loader
@@ -32,20 +32,19 @@ class TextPairClassificationLoader(Loader):
         text \t label \t predicted_label
         :return: class object
         """
-        super().load()
-        data: List[Dict] = []
+        return list(self.iter_load())
+
+    def iter_load(self) -> Iterator[Dict]:
+        raw_data = self._iter_raw_data_points()
         if self._file_type == FileType.tsv:
-            for id, dp in enumerate(self._raw_data):
+            for id, dp in enumerate(raw_data):
                 text1, text2, true_label, predicted_label = dp[:4]
-                data.append(
-                    {
-                        "id": str(id),
-                        "text1": text1.strip(),
-                        "text2": text2.strip(),
-                        "true_label": true_label.strip(),
-                        "predicted_label": predicted_label.strip(),
-                    }
-                )
+                yield {
+                    "id": str(id),
+                    "text1": text1.strip(),
+                    "text2": text2.strip(),
+                    "true_label": true_label.strip(),
+                    "predicted_label": predicted_label.strip(),
+                }
         else:
             raise NotImplementedError
-        return data
@@ -1,8 +1,55 @@
-from sklearn.metrics import accuracy_score
-from random import choices
+import threading
+from contextlib import contextmanager
+from typing import Optional
+import random
 import numpy as np
-import scipy
-import sklearn.metrics
+
+# upper bound on the number of elements gathered at once when resampling, so that
+# bootstrapping large outputs does not materialize a (n_times, n_sampling) matrix in one go
+_MAX_BOOTSTRAP_ELEMENTS = 10000000
+
+# per-thread random state for bootstrapping, see `bootstrap_seed()`
+_bootstrap_state = threading.local()
+
+
+@contextmanager
+def bootstrap_seed(seed: int):
+    """
+    Draw the bootstrap samples of the current thread from a random state seeded with `seed` instead of the global
+    one of the `random` module, so that confidence intervals do not depend on how threads are scheduled
+    :param seed: the seed of the random state
+    """
+    previous = getattr(_bootstrap_state, "random", None)
+    _bootstrap_state.random = random.Random(seed)
+    try:
+        yield
+    finally:
+        _bootstrap_state.random = previous
+
+
+def _bootstrap_random():
+    return getattr(_bootstrap_state, "random", None) or random
+
+
+def encode_labels(true_labels, predicted_labels):
+    """
+    Map true and predicted labels to integer IDs from a shared vocabulary
+    :param true_labels: a list of hashable labels
+    :param predicted_labels: a list of hashable labels
+    :return: two int arrays with the IDs of the true and predicted labels
+    """
+    label_ids = {}
+    true_ids = np.fromiter(
+        (label_ids.setdefault(x, len(label_ids)) for x in true_labels),
+        dtype=np.int64,
+        count=len(true_labels),
+    )
+    predicted_ids = np.fromiter(
+        (label_ids.setdefault(x, len(label_ids)) for x in predicted_labels),
+        dtype=np.int64,
+        count=len(predicted_labels),
+    )
+    return true_ids, predicted_ids
 
 
 class Metric:
@@ -15,38 +62,123 @@ class Metric:
         self._results = None
         self._is_print_confidence_interval = False
 
-    def get_confidence_interval(self, *args, **kwargs):
+    def get_sample_stats(self) -> Optional[np.ndarray]:
+        """
+        Reduce every sample to a row of additive statistics, so that the value of the metric over any set of
+        samples can be calculated from the sum of their rows. Metrics that cannot be decomposed this way return
+        None, in which case bootstrapping falls back to calling `self._eval_function` once per resample.
+        :return: an array of shape (n_samples, n_stats), or None
+        """
+        return None
+
+    def calc_metric_from_stats(self, stats_sum: np.ndarray) -> np.ndarray:
+        """
+        Calculate the metric value from summed sample statistics
+        :param stats_sum: an array of shape (..., n_stats + 1), where the last column is the number of samples
+        :return: an array of shape (...) with the metric values
+        """
+        raise NotImplementedError
+
+    def _get_bootstrap_values(
+        self, n_sampling: int, stats: Optional[np.ndarray] = None
+    ) -> Optional[np.ndarray]:
+        if stats is None:
+            stats = self.get_sample_stats()
+            if stats is None:
+                return None
+        # append a column of ones so that the number of samples is summed along with the statistics
+        stats = np.concatenate(
+            [stats, np.ones((stats.shape[0], 1), dtype=stats.dtype)], axis=1
+        )
+        # seed from the `random` module (or `bootstrap_seed()`) so that `random.seed()` keeps the results reproducible
+        rng = np.random.default_rng(_bootstrap_random().getrandbits(64))
+        block_size = max(1, _MAX_BOOTSTRAP_ELEMENTS // (n_sampling * stats.shape[1]))
+        values = []
+        for block_start in range(0, self._n_times, block_size):
+            n_rows = min(block_size, self._n_times - block_start)
+            sample_index_matrix = rng.integers(
+                0, stats.shape[0], size=(n_rows, n_sampling)
+            )
+            values.append(
+                self.calc_metric_from_stats(stats[sample_index_matrix].sum(axis=1))
+            )
+        return np.concatenate(values)
+
+    def _get_confidence_interval_from_values(self, performance_list: np.ndarray):
         def mean_confidence_interval(data, confidence=0.95):
+            import scipy.stats
+
             a = 1.0 * np.array(data)
             n = len(a)
             m, se = np.mean(a), scipy.stats.sem(a)
             h = se * scipy.stats.t.ppf((1 + confidence) / 2.0, n - 1)
             return m - h, m + h
 
+        if self._n_times != 1000:
+            confidence_low, confidence_up = mean_confidence_interval(performance_list)
+        else:
+            performance_list = np.sort(performance_list)
+            confidence_low = float(performance_list[24])
+            confidence_up = float(performance_list[974])
+        return confidence_low, confidence_up
+
+    def get_confidence_interval(self, *args, **kwargs):
         n_sampling = int(self._n_samples * self._sampling_rate)
         if n_sampling == 0:
             n_sampling = 1
 
-        # print(f"n_sampling: {n_sampling}\n"
-        #       f"self._n_samples {self._n_samples}\n")
+        performance_list = self._get_bootstrap_values(n_sampling)
+        if performance_list is None:
+            arrays = [np.array(x) for x in args]
+            performance_list = []
+            for i in range(self._n_times):
+                sample_index_list = _bootstrap_random().choices(
+                    range(self._n_samples), k=n_sampling
+                )
+                performance = self._eval_function(
+                    *[x[sample_index_list] for x in arrays], **kwargs
+                )
+                performance_list.append(performance)
+            performance_list = np.array(performance_list)
+
+        return self._get_confidence_interval_from_values(performance_list)
 
-        performance_list = []
-        for i in range(self._n_times):
-            sample_index_list = choices(range(self._n_samples), k=n_sampling)
-            performance = self._eval_function(
-                np.array(args[0])[sample_index_list],
-                np.array(args[1])[sample_index_list],
-                **kwargs
+    def evaluate_from_stats_sum(self, stats_sum: np.ndarray) -> float:
+        """
+        Evaluate the metric from sample statistics that were already summed, e.g. while streaming over chunks of
+        samples. Confidence intervals need the per-sample statistics, so only the value is returned.
+        :param stats_sum: the sum of `get_sample_stats()` over samples, followed by the number of samples
+        :return: the value of the metric
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return float(self.calc_metric_from_stats(stats_sum))
+
+    def evaluate_from_stats(self, stats: np.ndarray) -> dict:
+        """
+        Evaluate the metric over a subset of samples, given the subset's rows of `get_sample_stats()`. This lets
+        callers compute sample statistics once and score any number of buckets by summing over index sets.
+        :param stats: an array of shape (n_subset_samples, n_stats)
+        :return: a dictionary with the value and (optionally) the confidence interval of the metric
+        """
+        n_samples = stats.shape[0]
+        results = {
+            "value": self.evaluate_from_stats_sum(
+                np.append(stats.sum(axis=0), n_samples)
             )
-            performance_list.append(performance)
+        }
 
-        if self._n_times != 1000:
-            confidence_low, confidence_up = mean_confidence_interval(performance_list)
-        else:
-            performance_list.sort()
-            confidence_low = performance_list[24]
-            confidence_up = performance_list[974]
-        return confidence_low, confidence_up
+        confidence_interval_low, confidence_interval_high = None, None
+        if self._is_print_confidence_interval and n_samples > 0:
+            n_sampling = max(1, int(n_samples * self._sampling_rate))
+            (
+                confidence_interval_low,
+                confidence_interval_high,
+            ) = self._get_confidence_interval_from_values(
+                self._get_bootstrap_values(n_sampling, stats)
+            )
+        results["confidence_score_low"] = confidence_interval_low
+        results["confidence_score_high"] = confidence_interval_high
+        return results
 
     def _evaluate(self, *args, **kwargs):
 
@@ -72,10 +204,21 @@ class Accuracy(Metric):
         self._name = self.__class__.__name__
         self._true_labels = true_labels
         self._predicted_labels = predicted_labels
+        from sklearn.metrics import accuracy_score
+
         self._eval_function = accuracy_score
         self._is_print_confidence_interval = is_print_confidence_interval
         self._n_samples = len(self._true_labels)
 
+    def get_sample_stats(self) -> Optional[np.ndarray]:
+        true_ids, predicted_ids = encode_labels(
+            self._true_labels, self._predicted_labels
+        )
+        return (true_ids == predicted_ids).astype(np.float64)[:, np.newaxis]
+
+    def calc_metric_from_stats(self, stats_sum: np.ndarray) -> np.ndarray:
+        return stats_sum[..., 0] / stats_sum[..., 1]
+
     def evaluate(self):
 
         return self._evaluate(self._true_labels, self._predicted_labels)
@@ -90,10 +233,34 @@ class F1score(Metric):
         self._name = self.__class__.__name__
         self._true_labels = true_labels
         self._predicted_labels = predicted_labels
-        self._eval_function = sklearn.metrics.f1_score
+        from sklearn.metrics import f1_score
+
+        self._eval_function = f1_score
         self._is_print_confidence_interval = is_print_confidence_interval
         self._n_samples = len(self._true_labels)
 
+    def get_sample_stats(self) -> Optional[np.ndarray]:
+        """
+        Micro-averaged F1 over single-label samples: a correct prediction is a true positive, and a wrong one is
+        both a false positive (for the predicted class) and a false negative (for the true class)
+        :return: an array with columns (true positives, false positives, false negatives)
+        """
+        true_ids, predicted_ids = encode_labels(
+            self._true_labels, self._predicted_labels
+        )
+        correct = (true_ids == predicted_ids).astype(np.float64)
+        return np.stack([correct, 1.0 - correct, 1.0 - correct], axis=1)
+
+    def calc_metric_from_stats(self, stats_sum: np.ndarray) -> np.ndarray:
+        tp, fp, fn = stats_sum[..., 0], stats_sum[..., 1], stats_sum[..., 2]
+        denominator = 2 * tp + fp + fn
+        return np.divide(
+            2 * tp,
+            denominator,
+            out=np.zeros_like(tp, dtype=np.float64),
+            where=denominator > 0,
+        )
+
     def evaluate(self):
         # print(self._true_labels[0:10])
         # print(self._predicted_labels[0:10])
@@ -104,68 +271,131 @@ class F1score(Metric):
         )
 
 
-def hits(true_labels, predicted_labels):
-    num_hits = 0
-    for i in range(len(true_labels)):
-        i_true = true_labels[i]
-        i_preds = predicted_labels[i]
-        if i_true in i_preds:
-            num_hits += 1
-    return num_hits / len(true_labels)
+def get_true_ranks(true_labels, predicted_labels) -> np.ndarray:
+    """
+    Find the rank of each true label in its list of predicted labels. Ranking metrics, their bucket-level values and
+    their bootstrap samples are calculated on the ranks.
+    :param true_labels: a list of hashable labels
+    :param predicted_labels: a list of ranked lists of predicted labels, one per true label
+    :return: an int array with the 1-indexed rank of the first occurrence of each true label in its predicted
+             labels, or -1 if it was not predicted
+    """
+    return np.fromiter(
+        (
+            labels.index(label) + 1 if label in labels else -1
+            for label, labels in zip(
+                true_labels,
+                (
+                    x if isinstance(x, (list, tuple)) else list(x)
+                    for x in predicted_labels
+                ),
+            )
+        ),
+        dtype=np.int64,
+        count=len(true_labels),
+    )
+
 
+class RankingMetric(Metric):
+    """
+    A metric of how highly the true label is ranked in a list of predicted labels, which is calculated from the rank
+    of each true label (see `get_true_ranks()`). The ranks are computed once per metric, or passed in by callers that
+    calculate several ranking metrics of the same labels.
+    """
 
-class Hits(Metric):
     def __init__(
-        self, true_labels, predicted_labels, is_print_confidence_interval=False
+        self,
+        true_labels,
+        predicted_labels,
+        is_print_confidence_interval=False,
+        true_ranks: Optional[np.ndarray] = None,
     ):
-        super(Hits, self).__init__()
-        # Metric.__init__(self)
+        """
+        :param true_ranks: the precomputed `get_true_ranks()` of the labels, if any
+        """
+        super(RankingMetric, self).__init__()
         self._name = self.__class__.__name__
         self._true_labels = true_labels
         self._predicted_labels = predicted_labels
-        self._eval_function = self.hits
+        self._eval_function = self.calc_metric_from_ranks
         self._is_print_confidence_interval = is_print_confidence_interval
         self._n_samples = len(self._true_labels)
+        self._true_ranks = true_ranks
 
-    @staticmethod
-    def hits(true_labels, predicted_labels):
-        num_hits = 0
-        for i in range(len(true_labels)):
-            i_true = true_labels[i]
-            i_preds = predicted_labels[i]
-            if i_true in i_preds:
-                num_hits += 1
-        return num_hits / len(true_labels)
+    def get_true_ranks(self) -> np.ndarray:
+        """
+        :return: the rank of each true label of the metric, which is computed on the first call
+        """
+        if self._true_ranks is None:
+            self._true_ranks = get_true_ranks(self._true_labels, self._predicted_labels)
+        return self._true_ranks
+
+    def calc_sample_stats_from_ranks(self, true_ranks: np.ndarray) -> np.ndarray:
+        """
+        :param true_ranks: the rank of each true label, or -1 if it was not predicted
+        :return: the value of the metric for each sample
+        """
+        raise NotImplementedError
+
+    def calc_metric_from_ranks(self, true_labels, predicted_labels) -> float:
+        if (
+            true_labels is self._true_labels
+            and predicted_labels is self._predicted_labels
+        ):
+            true_ranks = self.get_true_ranks()
+        else:
+            true_ranks = get_true_ranks(true_labels, predicted_labels)
+        return float(self.calc_sample_stats_from_ranks(true_ranks).mean())
+
+    def get_sample_stats(self) -> Optional[np.ndarray]:
+        return self.calc_sample_stats_from_ranks(self.get_true_ranks()).astype(
+            np.float64
+        )[:, np.newaxis]
+
+    def calc_metric_from_stats(self, stats_sum: np.ndarray) -> np.ndarray:
+        return stats_sum[..., 0] / stats_sum[..., 1]
 
     def evaluate(self):
 
         return self._evaluate(self._true_labels, self._predicted_labels)
 
 
-class MeanReciprocalRank(Metric):
+class Hits(RankingMetric):
+    """
+    The fraction of samples whose true label is among the top `k` predicted labels (all of them by default)
+    """
+
     def __init__(
-        self, true_labels, predicted_labels, is_print_confidence_interval=False
+        self,
+        true_labels,
+        predicted_labels,
+        is_print_confidence_interval=False,
+        k: Optional[int] = None,
+        true_ranks: Optional[np.ndarray] = None,
     ):
-        super(MeanReciprocalRank, self).__init__()
-        # Metric.__init__(self)
-        self._name = self.__class__.__name__
-        self._true_labels = true_labels
-        self._predicted_labels = predicted_labels
-        self._eval_function = self.mean_reciprocal_rank
-        self._is_print_confidence_interval = is_print_confidence_interval
-        self._n_samples = len(self._true_labels)
+        super(Hits, self).__init__(
+            true_labels, predicted_labels, is_print_confidence_interval, true_ranks
+        )
+        self._k = k
 
     @staticmethod
-    def mean_reciprocal_rank(true_labels, predicted_labels):
-        total_reciprocal_rank = 0
-        for i in range(len(true_labels)):
-            i_true = true_labels[i]
-            i_preds = predicted_labels[i]
-            if i_true in i_preds:
-                true_rank = list(i_preds).index(i_true) + 1  # 1-indexed
-                total_reciprocal_rank += 1 / true_rank
-        return total_reciprocal_rank / len(true_labels)
+    def hits(true_labels, predicted_labels, k: Optional[int] = None):
+        return Hits(true_labels, predicted_labels, k=k).calc_metric_from_ranks(
+            true_labels, predicted_labels
+        )
 
-    def evaluate(self):
+    def calc_sample_stats_from_ranks(self, true_ranks: np.ndarray) -> np.ndarray:
+        if self._k is None:
+            return true_ranks > 0
+        return (true_ranks > 0) & (true_ranks <= self._k)
 
-        return self._evaluate(self._true_labels, self._predicted_labels)
+
+class MeanReciprocalRank(RankingMetric):
+    @staticmethod
+    def mean_reciprocal_rank(true_labels, predicted_labels):
+        return MeanReciprocalRank(true_labels, predicted_labels).calc_metric_from_ranks(
+            true_labels, predicted_labels
+        )
+
+    def calc_sample_stats_from_ranks(self, true_ranks: np.ndarray) -> np.ndarray:
+        return np.where(true_ranks > 0, 1 / true_ranks, 0.0)
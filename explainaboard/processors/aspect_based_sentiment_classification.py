@@ -1,8 +1,11 @@
+from typing import Any
+
+import explainaboard.utils.feature_funcs
 from explainaboard import feature
 from explainaboard.tasks import TaskType
 from explainaboard.processors.processor import Processor
 from explainaboard.processors.processor_registry import register_processor
-from explainaboard.utils.spacy_loader import get_named_entities
+from explainaboard.sys_output_table import SysOutputTable
 
 
 @register_processor(TaskType.aspect_based_sentiment_classification)
@@ -84,20 +87,27 @@ class AspectBasedSentimentClassificationProcessor(Processor):
         super().__init__()
 
     # --- Feature functions accessible by ExplainaboardBuilder._get_feature_func()
-    def _get_sentence_length(self, existing_features: dict):
-        return len(existing_features["text"].split(" "))
+    def _get_sentence_length_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_tokens(
+            samples.tokens("text")
+        )
 
-    def _get_token_number(self, existing_feature: dict):
-        return len(existing_feature["text"])
+    def _get_token_number_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_chars(samples.column("text"))
 
-    def _get_entity_number(self, existing_feature: dict):
-        return len(get_named_entities(existing_feature["text"]))
+    def _get_entity_number_batch(self, samples: SysOutputTable, statistics: Any):
+        return [
+            len(entities)
+            for entities in self._get_named_entities_batch(samples.column("text"))
+        ]
 
     def _get_label(self, existing_feature: dict):
         return existing_feature["true_label"]
 
-    def _get_aspect_length(self, existing_features: dict):
-        return len(existing_features["aspect"].split(" "))
+    def _get_aspect_length_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_tokens(
+            samples.tokens("aspect")
+        )
 
     def _get_aspect_index(self, existing_features: dict):
         return existing_features["text"].find(existing_features["aspect"])
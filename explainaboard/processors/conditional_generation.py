@@ -1,23 +1,22 @@
 from typing import Any
-from typing import Iterator, Dict, List
+from typing import Iterable, Iterator, Dict, List, Sequence
 
 import numpy
-
-# TODO(gneubig) we should try to remove this task-specific dependency with Datalab
-from datalabs.operations.aggregate.summarization import summarization_aggregating
-from datalabs.operations.featurize.plugins.summarization.sum_attribute import (
-    SUMAttribute,
-)
-from datalabs.operations.featurize.summarization import get_oracle_summary
 from tqdm import tqdm
 
 import explainaboard.utils.feature_funcs
 from explainaboard import feature
 from explainaboard.info import SysOutputInfo, Performance, BucketPerformance
+from explainaboard.metric import Metric
 from explainaboard.processors.processor import Processor
 from explainaboard.processors.processor_registry import register_processor
+from explainaboard.sys_output_table import SysOutputTable
 from explainaboard.tasks import TaskType
-from explainaboard.utils.py_utils import sort_dict
+from explainaboard.utils.feature_functions.sum_attribute import SUMAttribute
+from explainaboard.utils.py_utils import eprint, sort_dict
+from explainaboard.utils.scorers import CachedScorer, get_scorer, Scorer
+from explainaboard.utils.lazy_aggregating import lazy_aggregating
+from explainaboard.utils.statistics_builder import StatisticsBuilder, get_vocab_rank
 
 # to calculate advanced features
 summary_attribute = SUMAttribute()
@@ -160,26 +159,32 @@ class ConditionalGenerationProcessor(Processor):
         self._statistics_func = get_statistics
 
     # --- Feature functions accessible by ExplainaboardBuilder._get_feature_func()
-    def _get_source_length(self, existing_features: dict):
-        return len(existing_features["source"].split(" "))
+    def _get_source_length_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_tokens(
+            samples.tokens("source")
+        )
 
-    def _get_reference_length(self, existing_features: dict):
-        return len(existing_features["reference"].split(" "))
+    def _get_reference_length_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_tokens(
+            samples.tokens("reference")
+        )
 
-    def _get_hypothesis_length(self, existing_features: dict):
-        return len(existing_features["hypothesis"].split(" "))
+    def _get_hypothesis_length_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_tokens(
+            samples.tokens("hypothesis")
+        )
 
     # --- End feature functions
 
     # training set dependent features (could be merged for optimization?)
-    def _get_num_oov(self, existing_features: dict, statistics: Any):
-        return explainaboard.utils.feature_funcs.feat_num_oov(
-            existing_features, statistics, lambda x: x['source']
+    def _get_num_oov_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_oov(
+            samples.tokens("source"), statistics
         )
 
-    def _get_fre_rank(self, existing_features: dict, statistics: Any):
-        return explainaboard.utils.feature_funcs.feat_freq_rank(
-            existing_features, statistics, lambda x: x['source']
+    def _get_fre_rank_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_freq_rank(
+            samples.tokens("source"), statistics
         )
 
     def get_oracle(self, existing_features: dict, statistics: Any):
@@ -198,6 +203,9 @@ class ConditionalGenerationProcessor(Processor):
             "text": existing_features["source"],
             "summary": existing_features["reference"],
         }
+        # TODO(gneubig) we should try to remove this task-specific dependency with Datalab
+        from datalabs.operations.featurize.summarization import get_oracle_summary
+
         oracle_info = get_oracle_summary.func(sample)
 
         index_of_oracles = [
@@ -239,65 +247,153 @@ class ConditionalGenerationProcessor(Processor):
             )
             sys_output[_id] = feature_table
 
-        request_id = self._get_eaas_client().async_score(
-            inputs,
-            task="sum",
-            metrics=sys_info.metric_names.copy(),
-            lang="en",
-            cal_attributes=False,
+        # score in the background while the features are calculated
+        scorer = get_scorer(sys_info.scorer)
+        if sys_info.cache_scores:
+            if scorer.cacheable:
+                scorer = CachedScorer(scorer)
+            else:
+                eprint(f"scores of the {sys_info.scorer} scorer are not cached")
+        scoring = scorer.score_async(
+            inputs, metrics=sys_info.metric_names.copy(), lang="en"
         )
+        self._scorer = scorer
 
-        # Get names of bucketing features
-        # print(f"sys_info.features.get_bucket_features()\n {sys_info.features.get_bucket_features()}")
+        bucket_features = self._get_bucket_features(sys_info, statistics)
+        if sys_info.num_workers > 1:
+            feature_values = self._get_feature_values_parallel(
+                bucket_features, sys_output, statistics, sys_info.num_workers
+            )
+        else:
+            feature_values = self._get_feature_values(
+                bucket_features, sys_output, statistics
+            )
+        for bucket_key, values in feature_values.items():
+            sys_output.add_column(bucket_key, values)
+        self._log_token_cache(sys_output)
 
-        # Get names of bucketing features
+        self.score_dict = scoring.result()
+        return list(bucket_features.keys())
+
+    def _get_feature_values(
+        self,
+        bucket_features: Dict[str, bool],
+        sys_output: SysOutputTable,
+        statistics=None,
+        show_progress: bool = True,
+    ) -> Dict[str, Sequence]:
+        """
+        Same as the parent, except that the oracle and summary attribute features are computed together for each
+        sample. Overloaded from parent class, so that they are also computed in worker processes by
+        `_get_feature_values_parallel()`.
+        """
         oracle_feat_names = {"oracle_position", "oracle_score", "oracle_position_fre"}
         advanced_feat_names = set(summary_attribute.get_schema().keys())
-        bucket_feature_funcs = {}
-        for bucket_feature in sys_info.features.get_bucket_features():
-            if bucket_feature in sys_info.features.keys() and (
-                statistics is not None
-                or not sys_info.features[bucket_feature].require_training_set
-            ):
-                if (
-                    bucket_feature in oracle_feat_names
-                    or bucket_feature in advanced_feat_names
-                ):
-                    bucket_feature_funcs[bucket_feature] = (None, False)
-                else:
-                    bucket_feature_funcs[bucket_feature] = (
-                        self._get_feature_func(bucket_feature),
-                        sys_info.features[bucket_feature].require_training_set,
-                    )
+        sample_feat_names = [
+            bucket_key
+            for bucket_key in bucket_features
+            if bucket_key in oracle_feat_names or bucket_key in advanced_feat_names
+        ]
 
-        for _id, dict_sysout in enumerate(sys_output):
+        # features computed by (batch) feature functions
+        feature_values = super()._get_feature_values(
+            {
+                bucket_key: training_dependent
+                for bucket_key, training_dependent in bucket_features.items()
+                if bucket_key not in sample_feat_names
+            },
+            sys_output,
+            statistics,
+            show_progress,
+        )
+        if not sample_feat_names:
+            return feature_values
+
+        # oracle and summary attribute features, which are computed together for each sample
+        for bucket_key in sample_feat_names:
+            feature_values[bucket_key] = []
+        for dict_sysout in tqdm(
+            sys_output, desc="featurizing", disable=not show_progress
+        ):
             dict_advanced_features = None
-            oracle_feats = self.get_oracle(dict_sysout, statistics)
-            # Get values of bucketing features
-            for (
-                bucket_key,
-                (
-                    bucket_func,
-                    training_dependent,
-                ),
-            ) in bucket_feature_funcs.items():
-
-                # TODO(gneubig): this logic seems complicated, can it be simplified?
+            oracle_feats = None
+            for bucket_key in sample_feat_names:
                 if bucket_key in advanced_feat_names:
                     if dict_advanced_features is None:
                         dict_advanced_features = summary_attribute.cal_attributes_each(
                             dict_sysout["source"], dict_sysout["reference"]
                         )
-                    dict_sysout[bucket_key] = dict_advanced_features[bucket_key]
-                elif bucket_key in oracle_feat_names:
-                    dict_sysout[bucket_key] = oracle_feats[bucket_key]
-                elif training_dependent:
-                    dict_sysout[bucket_key] = bucket_func(dict_sysout, statistics)
+                    feature_values[bucket_key].append(
+                        dict_advanced_features[bucket_key]
+                    )
                 else:
-                    dict_sysout[bucket_key] = bucket_func(dict_sysout)
+                    if oracle_feats is None:
+                        oracle_feats = self.get_oracle(dict_sysout, statistics)
+                    feature_values[bucket_key].append(oracle_feats[bucket_key])
+        return feature_values
+
+    def _get_metric_stats(self, sys_info: SysOutputInfo, sys_output: List[dict]):
+        # sample-level scores are already returned in `self.score_dict` by the scorer
+        return None
+
+    def _get_stream_metric_stats(
+        self, sys_info: SysOutputInfo, sys_output: SysOutputTable
+    ) -> dict:
+        """
+        Reduce the scores of a chunk, which `_complete_features()` calculated, to additive statistics of every metric
+        (see `Scorer.get_sample_stats()`). Overloaded from parent class.
+        """
+        inputs = [
+            {
+                "source": source,
+                "references": [reference],
+                "hypothesis": hypothesis,
+            }
+            for source, reference, hypothesis in zip(
+                sys_output.column("source"),
+                sys_output.column("reference"),
+                sys_output.column("hypothesis"),
+            )
+        ]
+        metric_stats = {}
+        for metric_name in sys_info.metric_names:
+            sample_scores = [
+                scores[metric_name] for scores in self.score_dict["sample_level"]
+            ]
+            metric_stats[metric_name] = (
+                ScorerMetric(self._scorer, metric_name),
+                self._scorer.get_sample_stats(inputs, metric_name, sample_scores),
+            )
+        return metric_stats
+
+    def supports_streaming(self) -> bool:
+        """
+        Each chunk is scored by `_complete_features()`, and its scores are reduced to additive statistics by
+        `_get_stream_metric_stats()`. Overloaded from parent class.
+        """
+        return True
 
-        self.score_dict = self._eaas_client.wait_and_get_result(request_id)
-        return list(bucket_feature_funcs.keys())
+    def process_stream(
+        self, metadata: dict, sys_output: Iterable[dict], chunk_size: int = 10000
+    ) -> SysOutputInfo:
+        """
+        Same as the parent, for scorers that reduce every metric to additive sample statistics, e.g. the local
+        scorer. Unlike `process()`, the BLEU of a bucket is the corpus BLEU of its samples rather than the average of
+        their sentence BLEU. Overloaded from parent class.
+        """
+        sys_info = self._get_sys_info(metadata)
+        scorer = get_scorer(sys_info.scorer)
+        unsupported = [
+            metric_name
+            for metric_name in sys_info.metric_names
+            if not scorer.has_sample_stats(metric_name)
+        ]
+        if unsupported:
+            raise ValueError(
+                f'metrics {unsupported} of the {sys_info.scorer} scorer can not be streamed, '
+                'please use the local scorer or process()'
+            )
+        return super().process_stream(metadata, sys_output, chunk_size)
 
     # TODO(gneubig): should this be generalized or is it task specific?
     def get_overall_performance(
@@ -397,6 +493,20 @@ class ConditionalGenerationProcessor(Processor):
         return sort_dict(bucket_name_to_performance)
 
 
+class ScorerMetric(Metric):
+    """
+    A metric whose value is calculated by a scorer from summed sample statistics, see `Scorer.get_sample_stats()`
+    """
+
+    def __init__(self, scorer: Scorer, metric_name: str):
+        super().__init__()
+        self._name = metric_name
+        self._scorer = scorer
+
+    def calc_metric_from_stats(self, stats_sum: numpy.ndarray) -> numpy.ndarray:
+        return self._scorer.score_from_stats_sum(self._name, stats_sum)
+
+
 @register_processor(TaskType.summarization)
 class SummarizationProcessor(ConditionalGenerationProcessor):
     _task_type = TaskType.summarization
@@ -413,7 +523,8 @@ class MachineTranslationProcessor(ConditionalGenerationProcessor):
 # TODO(gneubig) we should try to git rid of this task-specific decorator
 # TODO(gneubig) should be conditional generation, not summarization
 # Aggregate training set statistics
-@summarization_aggregating(
+@lazy_aggregating(
+    "datalabs.operations.aggregate.summarization.summarization_aggregating",
     name="get_statistics",
     contributor="datalab",
     task="summarization",
@@ -429,7 +540,9 @@ def get_statistics(samples: Iterator):
     Output:dict:
     """
 
-    vocab = {}
+    from datalabs.operations.featurize.summarization import get_oracle_summary
+
+    builder = StatisticsBuilder()
     vocab_pruning = {}
     oracle_position_fre = {}
     for sample in tqdm(samples):
@@ -449,24 +562,17 @@ def get_statistics(samples: Iterator):
             oracle_position_fre[oracle_position] += 1
 
         # Vocabulary info
-        for w in (text + summary).split(" "):
-            if w in vocab.keys():
-                vocab[w] += 1
-            else:
-                vocab[w] = 1
+        builder.add((text + summary).split(" "))
 
-    for k, v in vocab.items():  # pruning for the availability of database storage
+    builder.flush()
+    # pruning for the availability of database storage
+    for k, v in builder.vocab.items():
         if v > 20:
             vocab_pruning[k] = v
         if len(vocab_pruning) > 100:
             break
 
-    # the rank of each word based on its frequency
-    sorted_dict = {
-        key: rank
-        for rank, key in enumerate(sorted(set(vocab_pruning.values()), reverse=True), 1)
-    }
-    vocab_rank = {k: sorted_dict[v] for k, v in vocab_pruning.items()}
+    vocab_rank = get_vocab_rank(vocab_pruning)
 
     return {
         "vocab": vocab_pruning,
@@ -1,8 +1,7 @@
 from typing import Callable, Any
 from typing import Iterator, Dict, List
 
-from datalabs import load_dataset
-from datalabs.operations.aggregate.qa_extractive import qa_extractive_aggregating
+import numpy as np
 
 import explainaboard.utils.eval_basic_qa
 import explainaboard.utils.feature_funcs
@@ -10,8 +9,10 @@ from explainaboard import feature
 from explainaboard.info import SysOutputInfo, BucketPerformance, Performance
 from explainaboard.processors.processor import Processor
 from explainaboard.processors.processor_registry import register_processor
+from explainaboard.sys_output_table import SysOutputTable
 from explainaboard.tasks import TaskType
 from explainaboard.utils.py_utils import eprint, sort_dict
+from explainaboard.utils.lazy_aggregating import get_operation, lazy_aggregating
 
 
 @register_processor(TaskType.question_answering_extractive)
@@ -104,14 +105,23 @@ class QAExtractiveProcessor(Processor):
         # Calculate statistics of training set
         statistics = None
         if sys_info.dataset_name is not None:
+            cache_key, statistics = self._read_cached_statistics(
+                sys_info, statistics_func
+            )
+            if statistics is not None:
+                return statistics
             try:
+                from datalabs import load_dataset
+
                 dataset = load_dataset(sys_info.dataset_name, sys_info.sub_dataset_name)
                 if "train" not in dataset.keys():
                     statistics = None
                 elif (
                     len(dataset['train']._stat) == 0 or not sys_info.reload_stat
                 ):  # calculate the statistics (_stat) when _stat is {} or `reload_stat` is False
-                    new_train = dataset['train'].apply(statistics_func, mode="local")
+                    new_train = dataset['train'].apply(
+                        get_operation(statistics_func), mode="local"
+                    )
                     statistics = new_train._stat
                 else:
                     statistics = dataset["train"]._stat
@@ -120,62 +130,88 @@ class QAExtractiveProcessor(Processor):
                     "The dataset hasn't been supported by DataLab so no training set dependent features will be supported by ExplainaBoard."  # noqa
                     "You can add the dataset by: https://github.com/ExpressAI/DataLab/blob/main/docs/SDK/add_new_datasets_into_sdk.md"  # noqa
                 )
+            self._write_cached_statistics(cache_key, statistics)
         return statistics
 
     # --- Feature functions accessible by ExplainaboardBuilder._get_feature_func()
-    def _get_context_length(self, existing_features: dict):
-        return len(existing_features["context"].split(" "))
-
-    def _get_question_length(self, existing_features: dict):
-        return len(existing_features["question"].split(" "))
-
-    def _get_answer_length(self, existing_features: dict):
-        if isinstance(existing_features["answers"]["text"], list):
-            return len(existing_features["answers"]["text"][0].split(" "))
-        else:
-            return len(existing_features["answers"]["text"].split(" "))
-
-    def _get_sim_context_question(self, existing_features: dict):
+    def _get_context_length_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_tokens(
+            samples.tokens("context")
+        )
 
-        references = existing_features["context"]
-        hypothesis = existing_features["question"]
+    def _get_question_length_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_tokens(
+            samples.tokens("question")
+        )
 
-        res_json = self._get_eaas_client().bleu([[references]], [hypothesis], lang="en")
-        return res_json["corpus_bleu"]
+    def _get_answer_length_batch(self, samples: SysOutputTable, statistics: Any):
+        answer_texts = [
+            answers["text"][0] if isinstance(answers["text"], list) else answers["text"]
+            for answers in samples.column("answers")
+        ]
+        return explainaboard.utils.feature_funcs.batch_num_tokens(answer_texts)
+
+    def _get_sim_context_question_batch(self, samples: SysOutputTable, statistics: Any):
+        # one request per batch of samples rather than per sample, with the BLEU of each question against its context
+        inputs = [
+            {"source": "", "references": [context], "hypothesis": question}
+            for context, question in zip(
+                samples.column("context"), samples.column("question")
+            )
+        ]
+        scores = self._get_batched_eaas_client().score(
+            inputs, metrics=["bleu"], lang="en"
+        )
+        return [sample_scores["bleu"] for sample_scores in scores["sample_level"]]
 
     # training set dependent features (could be merged for optimization?)
-    def _get_num_oov(self, existing_features: dict, statistics: Any):
-        return explainaboard.utils.feature_funcs.feat_num_oov(
-            existing_features, statistics, lambda x: x['context']
+    def _get_num_oov_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_oov(
+            samples.tokens("context"), statistics
         )
 
-    def _get_fre_rank(self, existing_features: dict, statistics: Any):
-        return explainaboard.utils.feature_funcs.feat_freq_rank(
-            existing_features, statistics, lambda x: x['context']
+    def _get_fre_rank_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_freq_rank(
+            samples.tokens("context"), statistics
         )
 
     # --- End feature functions
 
-    # TODO(gneubig): this can probably be generalized as well
-    def get_overall_performance(
-        self,
-        sys_info: SysOutputInfo,
-        sys_output: List[dict],
-    ) -> Dict[str, Performance]:
+    def _get_metric_stats(self, sys_info: SysOutputInfo, sys_output: List[dict]):
+        """
+        Reduce each sample to its F1 / exact match score once, so that overall and bucket-level scores are
+        averages over sets of sample IDs
+        :return: a dictionary mapping metric names to arrays of per-sample scores
+        """
         predicted_answers, true_answers = [], []
 
         for _id, feature_table in enumerate(sys_output):
             predicted_answers.append(feature_table["predicted_answers"]["text"])
             true_answers.append(feature_table["answers"]["text"])
 
-        overall = {}
+        metric_stats = {}
         for metric_name in sys_info.metric_names:
             # TODO(gneubig): is it necessary to have this as a separate interface than the other metrics?
             #                probably not. it'd be good to unify these.
-            metric_func = getattr(explainaboard.utils.eval_basic_qa, metric_name)
-            overall_value = metric_func(true_answers, predicted_answers)
+            stats_func = getattr(
+                explainaboard.utils.eval_basic_qa, f"{metric_name}_sample_stats"
+            )
+            metric_stats[metric_name] = stats_func(true_answers, predicted_answers)
+        return metric_stats
+
+    # TODO(gneubig): this can probably be generalized as well
+    def get_overall_performance(
+        self,
+        sys_info: SysOutputInfo,
+        sys_output: List[dict],
+    ) -> Dict[str, Performance]:
+
+        all_metric_stats = self._get_cached_metric_stats(sys_info, sys_output)
+        overall = {}
+        for metric_name in sys_info.metric_names:
+            metric_stats = all_metric_stats[metric_name]
+            overall_value = float(100.0 * metric_stats.sum() / len(metric_stats))
 
-            overall_value = overall_value
             overall_performance = Performance(
                 metric_name=metric_name,
                 value=overall_value,
@@ -200,43 +236,28 @@ class QAExtractiveProcessor(Processor):
         :return: bucket_name_to_performance: a dictionary that maps bucket names to bucket performance
         """
 
+        all_metric_stats = self._get_cached_metric_stats(sys_info, sys_output)
         bucket_name_to_performance = {}
         for bucket_interval, sample_ids in samples_over_bucket.items():
 
-            bucket_true_labels = []
-            bucket_predicted_labels = []
             bucket_cases = []
-
-            for sample_id in sample_ids:
-
-                true_label = sys_output[int(sample_id)]["answers"]["text"]
-                if isinstance(true_label, list):
-                    true_label = true_label[0]
-
-                predicted_label = sys_output[int(sample_id)]["predicted_answers"][
-                    "text"
-                ]
-                s_id = sys_output[int(sample_id)]["id"]
-
-                # get a bucket of true/predicted labels
-                bucket_true_labels.append(true_label)
-                bucket_predicted_labels.append(predicted_label)
-                # get a bucket of cases (e.g., errors)
-                if sys_info.is_print_case:
+            # get a bucket of cases (e.g., errors)
+            if sys_info.is_print_case:
+                for sample_id in sample_ids:
+                    true_label = sys_output[int(sample_id)]["answers"]["text"]
+                    if isinstance(true_label, list):
+                        true_label = true_label[0]
+                    predicted_label = sys_output[int(sample_id)]["predicted_answers"][
+                        "text"
+                    ]
                     if true_label != predicted_label:
-                        # bucket_case = true_label[0] + "|||" + predicted_label + "|||" + sent
-                        # bucket_case = {"true_answer": (sample_id, ["true_answers","text"]),
-                        #                "predicted_answer": (sample_id, ["predicted_answer"]),
-                        #                "question": (sample_id, ["question"])}
-                        bucket_case = str(s_id)
-                        bucket_cases.append(bucket_case)
+                        bucket_cases.append(str(sys_output[int(sample_id)]["id"]))
 
+            sample_index = np.asarray(sample_ids, dtype=int)
             bucket_name_to_performance[bucket_interval] = []
             for metric_name in sys_info.metric_names:
-                # TODO(gneubig): is it necessary to have this as a separate interface than the other metrics?
-                #                probably not. it'd be good to unify these.
-                metric_func = getattr(explainaboard.utils.eval_basic_qa, metric_name)
-                bucket_value = metric_func(bucket_true_labels, bucket_predicted_labels)
+                bucket_stats = all_metric_stats[metric_name][sample_index]
+                bucket_value = float(100.0 * bucket_stats.sum() / len(bucket_stats))
 
                 bucket_performance = BucketPerformance(
                     bucket_name=bucket_interval,
@@ -244,7 +265,7 @@ class QAExtractiveProcessor(Processor):
                     value=bucket_value,
                     confidence_score_low=None,
                     confidence_score_high=None,
-                    n_samples=len(bucket_true_labels),
+                    n_samples=len(sample_ids),
                     bucket_samples=bucket_cases,
                 )
 
@@ -253,7 +274,8 @@ class QAExtractiveProcessor(Processor):
         return sort_dict(bucket_name_to_performance)
 
 
-@qa_extractive_aggregating(
+@lazy_aggregating(
+    "datalabs.operations.aggregate.qa_extractive.qa_extractive_aggregating",
     name="get_statistics",
     contributor="datalab",
     task="qa-extractive",
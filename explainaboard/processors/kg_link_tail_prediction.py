@@ -1,21 +1,21 @@
-import json
 import os
-from typing import Callable
+from typing import Any, Callable, Optional
 from typing import Dict, List
 
-from datalabs import load_dataset
-from datalabs.operations.aggregate.kg_link_prediction import (
-    kg_link_prediction_aggregating,
-)
+import numpy as np
 from tqdm import tqdm
 
-import explainaboard.metric
 from explainaboard import feature
-from explainaboard.info import SysOutputInfo, BucketPerformance, Performance
+from explainaboard.info import SysOutputInfo, BucketPerformance
+import explainaboard.metric
+from explainaboard.metric import get_true_ranks, Hits, Metric, RankingMetric
 from explainaboard.processors.processor import Processor
 from explainaboard.processors.processor_registry import register_processor
+from explainaboard.sys_output_table import SysOutputTable
 from explainaboard.tasks import TaskType
 from explainaboard.utils.py_utils import eprint, sort_dict
+from explainaboard.utils.lazy_aggregating import get_operation, lazy_aggregating
+from explainaboard.utils.resource_table import get_resource_table, ResourceTable
 
 
 @register_processor(TaskType.kg_link_tail_prediction)
@@ -119,12 +119,19 @@ class KGLinkTailPredictionProcessor(Processor):
         self._statistics_func = get_statistics
         self.entity_type_level_map = None
         self._user_defined_feature_config = None
+        # the system output that the true tail ranks were last computed for, and the ranks
+        self._true_ranks = None
 
     def process(self, metadata: dict, sys_output: List[dict]) -> SysOutputInfo:
         self._user_defined_feature_config = metadata.get(
             "user_defined_features_configs"
         )
-        return super().process(metadata, sys_output)
+        self._true_ranks = None
+        try:
+            return super().process(metadata, sys_output)
+        finally:
+            # do not keep the system output alive after it is analyzed
+            self._true_ranks = None
 
     def _init_statistics(self, sys_info: SysOutputInfo, statistics_func: Callable):
 
@@ -132,24 +139,32 @@ class KGLinkTailPredictionProcessor(Processor):
         if sys_info.dataset_name != "fb15k_237":  # to be generalized
             self.entity_type_level_map = {}
         else:
-            scriptpath = os.path.dirname(__file__)
-            with open(
+            # a memory-mapped table, whose values are only decoded when they are looked up
+            self.entity_type_level_map = get_resource_table(
                 os.path.join(
-                    scriptpath, '../pre_computed/kg/entity_type_level_map.json'
-                ),
-                'r',
-            ) as file:
-                self.entity_type_level_map = json.loads(file.read())
+                    os.path.dirname(__file__),
+                    '../pre_computed/kg/entity_type_level_map.bin',
+                )
+            )
 
         # Calculate statistics of training set
         self.statistics = None
         if sys_info.dataset_name is not None:
+            cache_key, self.statistics = self._read_cached_statistics(
+                sys_info, statistics_func, sub_dataset_name="readable"
+            )
+            if self.statistics is not None:
+                return
             try:
+                from datalabs import load_dataset
+
                 dataset = load_dataset(sys_info.dataset_name, "readable")
                 if (
                     len(dataset['train']._stat) == 0 or not sys_info.reload_stat
                 ):  # calculate the statistics (_stat) when _stat is {} or `reload_stat` is False
-                    new_train = dataset['train'].apply(statistics_func, mode="local")
+                    new_train = dataset['train'].apply(
+                        get_operation(statistics_func), mode="local"
+                    )
                     self.statistics = new_train._stat
                 else:
                     self.statistics = dataset["train"]._stat
@@ -158,31 +173,16 @@ class KGLinkTailPredictionProcessor(Processor):
                     "The dataset hasn't been supported by DataLab so no training set dependent features will be supported by ExplainaBoard."  # noqa
                     "You can add the dataset by: https://github.com/ExpressAI/DataLab/blob/main/docs/SDK/add_new_datasets_into_sdk.md"  # noqa
                 )
-
-        # print(self.entity_type_level_map)
-        # exit()
-
-        # f = open('entity_type_level_map.json')
-        # self.entity_type_level_map = json.load(f)
-        # print(self.entity_type_level_map.keys())
+            self._write_cached_statistics(cache_key, self.statistics)
 
     # --- Feature functions accessible by ExplainaboardBuilder._get_feature_func()
-    def _get_entity_type_level(self, existing_features: dict):
-
-        # list of entity types at each level: [type_level_0, type_level_1, ... type_level_6]
-        # e.g. ["Thing", "Agent", "Person", None, None, None, None]
-        tail_entity_type_levels = self.entity_type_level_map.get(
-            existing_features['true_tail'], None
-        )
-        if tail_entity_type_levels is None:
-            return "-1"  # entity types not found
-
-        # find the index of the first occurrence of None in the list
-        if None in tail_entity_type_levels:
-            most_specific_level = tail_entity_type_levels.index(None) - 1
-        else:  # tail has entity types at every level
-            most_specific_level = len(tail_entity_type_levels) - 1
-        return str(most_specific_level)
+    def _get_entity_type_level_batch(self, samples: SysOutputTable, statistics: Any):
+        tails = samples.column("true_tail").tolist()
+        if isinstance(self.entity_type_level_map, ResourceTable):
+            type_levels = self.entity_type_level_map.get_many(tails)
+        else:
+            type_levels = [self.entity_type_level_map.get(tail) for tail in tails]
+        return [_most_specific_level(x) for x in type_levels]
 
     def _get_tail_entity_length(self, existing_features: dict):
         return len(existing_features["true_tail"].split(" "))
@@ -225,43 +225,75 @@ class KGLinkTailPredictionProcessor(Processor):
 
     # --- End feature functions
 
-    # TODO(gneubig): this can probably be generalized to single-metric
-    def get_overall_performance(
-        self,
-        sys_info: SysOutputInfo,
-        sys_output: List[dict],
-    ) -> Dict[str, Performance]:
-        predicted_labels, true_labels = [], []
-
-        for _id, feature_table in enumerate(sys_output):
-
-            predicted_labels.append(feature_table["predicted_tails"])
-            true_labels.append(feature_table["true_tail"])
-
-        overall = {}
-        for metric_name in sys_info.metric_names:
-            metric_func = getattr(explainaboard.metric, metric_name)
-            one_metric = metric_func(
-                true_labels=true_labels,
-                predicted_labels=predicted_labels,
-                is_print_confidence_interval=sys_info.is_print_confidence_interval,
+    def _get_true_label(self, data_point: dict):
+        """
+        Get the true label from a data point. Overloaded from parent class.
+        :param data_point: the data point under consideration
+        :return: the true tail entity
+        """
+        return data_point["true_tail"]
+
+    def _get_predicted_label(self, data_point: dict):
+        """
+        Get the predicted label from a data point. Overloaded from parent class.
+        :param data_point: the data point under consideration
+        :return: the list of top-k ranked tail entities
+        """
+        return data_point["predicted_tails"]
+
+    def _get_true_ranks(self, sys_output: SysOutputTable) -> np.ndarray:
+        """
+        :return: the rank of each sample's true tail in its predicted tails, or -1 if it was not predicted
+        """
+        if self._true_ranks is None or self._true_ranks[0] is not sys_output:
+            self._true_ranks = (
+                sys_output,
+                get_true_ranks(
+                    sys_output.column("true_tail").tolist(),
+                    sys_output.column("predicted_tails").tolist(),
+                ),
             )
-            metric_result = one_metric.evaluate()
+        return self._true_ranks[1]
 
-            overall_performance = Performance(
-                metric_name=metric_name,
-                value=metric_result["value"],
-                confidence_score_low=metric_result["confidence_score_low"],
-                confidence_score_high=metric_result["confidence_score_high"],
+    def _get_metric(
+        self,
+        sys_info: SysOutputInfo,
+        sys_output: SysOutputTable,
+        metric_name: str,
+        true_labels: list,
+        predicted_labels: list,
+    ) -> Metric:
+        """
+        Create a metric, passing the true tail ranks to ranking metrics so that they are computed once for all of
+        them and for the bucket cases. `Hits@<k>` (e.g. `Hits@10`) is the fraction of true tails among the top `k`
+        predicted tails, and `Hits` the fraction among all of them. Overloaded from parent class.
+        """
+        class_name, _, k = metric_name.partition("@")
+        metric_func = getattr(explainaboard.metric, class_name)
+        if not issubclass(metric_func, RankingMetric):
+            return super()._get_metric(
+                sys_info, sys_output, metric_name, true_labels, predicted_labels
             )
-            overall[metric_name] = overall_performance
-        return overall
+        kwargs = {}
+        if k:
+            if metric_func is not Hits or not k.isdigit() or int(k) < 1:
+                raise ValueError(
+                    f'unsupported metric {metric_name}, only Hits@<k> takes a positive cutoff k'
+                )
+            kwargs["k"] = int(k)
+        return metric_func(
+            true_labels=true_labels,
+            predicted_labels=predicted_labels,
+            is_print_confidence_interval=sys_info.is_print_confidence_interval,
+            true_ranks=self._get_true_ranks(sys_output),
+            **kwargs,
+        )
 
     # TODO(gneubig): the only difficult part in generalizing this is specifing "in" instead of "=="
     def get_bucket_performance(
         self,
         sys_info: SysOutputInfo,
-        sys_output: List[dict],
+        sys_output: SysOutputTable,
         samples_over_bucket: Dict[str, List[int]],
     ) -> Dict[str, List[BucketPerformance]]:
         """
@@ -269,42 +301,26 @@ class KGLinkTailPredictionProcessor(Processor):
         :return: bucket_name_to_performance: a dictionary that maps bucket names to bucket performance
         """
 
+        all_metric_stats = self._get_cached_metric_stats(sys_info, sys_output)
+        if sys_info.is_print_case:
+            true_ranks = self._get_true_ranks(sys_output)
+            sample_ids_str = [str(x) for x in sys_output.column("id")]
         bucket_name_to_performance = {}
         for bucket_interval, sample_ids in samples_over_bucket.items():
 
-            bucket_true_labels = []
-            bucket_predicted_labels = []  # list of (lists of top-k ranked tails)
+            sample_index = np.asarray(sample_ids, dtype=int)
             bucket_cases = []
-
-            for sample_id in sample_ids:
-
-                true_label = sys_output[int(sample_id)]["true_tail"]
-                predicted_label = sys_output[int(sample_id)]["predicted_tails"]
-                s_id = sys_output[int(sample_id)]["id"]
-
-                # get a bucket of true/predicted labels
-                bucket_true_labels.append(true_label)
-                bucket_predicted_labels.append(predicted_label)
-                # get a bucket of cases (e.g., errors)
-                if sys_info.is_print_case:
-                    if true_label not in predicted_label:
-                        # bucket_case = true_label + "|||" + predicted_label + "|||" + sent
-                        # bucket_case = {"true_label":(s_id,["true_label"]),
-                        #                "predicted_label":(s_id,["predicted_label"]),
-                        #                "text":(s_id,["text"])}
-                        bucket_case = str(s_id)
-                        bucket_cases.append(bucket_case)
+            # get a bucket of cases (e.g., errors)
+            if sys_info.is_print_case:
+                missed = sample_index[true_ranks[sample_index] < 0]
+                bucket_cases = [sample_ids_str[i] for i in missed.tolist()]
 
             bucket_name_to_performance[bucket_interval] = []
             for metric_name in sys_info.metric_names:
-
-                metric_func = getattr(explainaboard.metric, metric_name)
-                one_metric = metric_func(
-                    true_labels=bucket_true_labels,
-                    predicted_labels=bucket_predicted_labels,
-                    is_print_confidence_interval=sys_info.is_print_confidence_interval,
+                one_metric, metric_stats = all_metric_stats[metric_name]
+                metric_result = one_metric.evaluate_from_stats(
+                    metric_stats[sample_index]
                 )
-                metric_result = one_metric.evaluate()
 
                 bucket_performance = BucketPerformance(
                     bucket_name=bucket_interval,
@@ -312,43 +328,17 @@ class KGLinkTailPredictionProcessor(Processor):
                     value=metric_result["value"],
                     confidence_score_low=metric_result["confidence_score_low"],
                     confidence_score_high=metric_result["confidence_score_high"],
-                    n_samples=len(bucket_true_labels),
+                    n_samples=len(sample_ids),
                     bucket_samples=bucket_cases,
                 )
 
-                # one_metric = eval(metric_name)(
-                #     true_labels=bucket_true_labels,
-                #     predicted_labels=bucket_predicted_labels,
-                #     is_print_confidence_interval=sys_info.is_print_confidence_interval,
-                # )
-                # bucket_value_json = one_metric.evaluate()
-
-                # bucket_value = bucket_value_json["value"]
-                # confidence_score_low = bucket_value_json["confidence_score_low"]
-                # confidence_score_high = bucket_value_json["confidence_score_high"]
-
-                # # print(f"name:\t {one_metric._name} \n"
-                # #       f"value:\t {bucket_value}\n"
-                # #       f"confidence low\t {confidence_score_low}\n"
-                # #       f"confidence up \t {confidence_score_high}\n"
-                # #       f"---------------------------------")
-
-                # bucket_performance = BucketPerformance(
-                #     bucket_name=bucket_interval,
-                #     metric_name=metric_name,
-                #     value=bucket_value,
-                #     confidence_score_low=confidence_score_low,
-                #     confidence_score_high=confidence_score_high,
-                #     n_samples=len(bucket_true_labels),
-                #     bucket_samples=bucket_cases,
-                # )
-
                 bucket_name_to_performance[bucket_interval].append(bucket_performance)
 
         return sort_dict(bucket_name_to_performance)
 
 
-@kg_link_prediction_aggregating(
+@lazy_aggregating(
+    "datalabs.operations.aggregate.kg_link_prediction.kg_link_prediction_aggregating",
     name="get_statistics",
     contributor="datalab",
     task="kg-link-prediction",
@@ -387,3 +377,20 @@ def get_statistics(samples: List[Dict]):
         "link_fre": dict_link,
         "tail_fre": dict_tail,
     }
+
+
+def _most_specific_level(tail_entity_type_levels: Optional[list]) -> str:
+    """
+    :param tail_entity_type_levels: list of entity types at each level: [type_level_0, type_level_1, ... type_level_6]
+                                    e.g. ["Thing", "Agent", "Person", None, None, None, None]
+    :return: the index of the most specific level with an entity type, or "-1" if the entity types are not found
+    """
+    if tail_entity_type_levels is None:
+        return "-1"  # entity types not found
+
+    # find the index of the first occurrence of None in the list
+    if None in tail_entity_type_levels:
+        most_specific_level = tail_entity_type_levels.index(None) - 1
+    else:  # tail has entity types at every level
+        most_specific_level = len(tail_entity_type_levels) - 1
+    return str(most_specific_level)
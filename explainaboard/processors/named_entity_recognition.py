@@ -1,11 +1,10 @@
 import re
+from itertools import tee
 from typing import Callable, Tuple
 from typing import Iterator, Dict, List
 
-from datalabs import load_dataset
-from datalabs.operations.aggregate.sequence_labeling import (
-    sequence_labeling_aggregating,
-)
+import numpy as np
+
 from tqdm import tqdm
 
 import explainaboard.utils.bucketing
@@ -15,9 +14,20 @@ from explainaboard.processors.processor import Processor
 from explainaboard.processors.processor_registry import register_processor
 from explainaboard.tasks import TaskType
 from explainaboard.utils.analysis import cap_feature
-from explainaboard.utils.eval_basic_ner import get_chunks, f1_score_seqeval
+from explainaboard.utils.eval_basic_ner import (
+    f1_score_seqeval,
+    get_chunks,
+    TagSequences,
+)
 from explainaboard.utils.eval_bucket import f1_score_seqeval_bucket
+from explainaboard.utils.feature_funcs import batch_freq_rank, batch_num_oov
 from explainaboard.utils.py_utils import eprint, sort_dict
+from explainaboard.utils.statistics_builder import build_statistics
+from explainaboard.utils.lazy_aggregating import get_operation, lazy_aggregating
+from explainaboard.utils.token_cache import TokenizedTexts
+
+# characters that still make an entity pattern a regular expression after removing `()*+`
+_REGEX_SPECIAL_CHARS = set('.^$?{}[]|\\')
 
 
 @register_processor(TaskType.named_entity_recognition)
@@ -210,7 +220,13 @@ class NERProcessor(Processor):
         eprint(sys_info.dataset_name, sys_info.sub_dataset_name)
         statistics = None
         if sys_info.dataset_name is not None:
+            cache_key, statistics = self._read_cached_statistics(
+                sys_info, statistics_func
+            )
+            if statistics is not None:
+                return statistics
             try:
+                from datalabs import load_dataset
 
                 dataset = load_dataset(sys_info.dataset_name, sys_info.sub_dataset_name)
                 if (
@@ -218,7 +234,9 @@ class NERProcessor(Processor):
                 ):  # calculate the statistics (_stat) when _stat is {} or `reload_stat` is False
                     tag_id2str = dataset['train']._info.task_templates[0].labels
                     statistics_func.resources = {"tag_id2str": tag_id2str}
-                    new_train = dataset['train'].apply(statistics_func, mode="local")
+                    new_train = dataset['train'].apply(
+                        get_operation(statistics_func), mode="local"
+                    )
                     statistics = new_train._stat
                 else:
                     statistics = dataset["train"]._stat
@@ -227,6 +245,7 @@ class NERProcessor(Processor):
                     "The dataset hasn't been supported by DataLab so no training set dependent features will be supported by ExplainaBoard."  # noqa
                     "You can add the dataset by: https://github.com/ExpressAI/DataLab/blob/main/docs/SDK/add_new_datasets_into_sdk.md"  # noqa
                 )
+            self._write_cached_statistics(cache_key, statistics)
         return statistics
 
     # --- Feature functions accessible by ExplainaboardBuilder._get_feature_func()
@@ -254,34 +273,12 @@ class NERProcessor(Processor):
             efre_value = float(span_dic[span_text])
         return efre_value
 
-    # training set dependent features
-    def _get_num_oov(self, tokens, statistics):
-        num_oov = 0
-
-        for w in tokens:
-            if w not in statistics['vocab'].keys():
-                num_oov += 1
-        # print(num_oov)
-        return num_oov
-
-    # training set dependent features (this could be merged into the above one for further optimization)
-    def _get_fre_rank(self, tokens, statistics):
-        fre_rank = 0
-
-        for w in tokens:
-            if w not in statistics['vocab_rank'].keys():
-                fre_rank += len(statistics['vocab_rank'])
-            else:
-                fre_rank += statistics['vocab_rank'][w]
-
-        fre_rank = 0 if len(tokens) == 0 else fre_rank * 1.0 / len(tokens)
-        return fre_rank
-
     # --- End feature functions
 
-    def _complete_feature_raw_span_features(self, sentence, tags):
+    def _complete_feature_raw_span_features(self, sentence, tags, chunks=None):
         # span_text, span_len, span_pos, span_tag
-        chunks = get_chunks(tags)
+        if chunks is None:
+            chunks = get_chunks(tags)
         span_dics = []
         for chunk in chunks:
             tag, sid, eid = chunk
@@ -304,8 +301,12 @@ class NERProcessor(Processor):
         # self.span_dics = span_dics
         return span_dics
 
-    def _complete_feature_advanced_span_features(self, sentence, tags, statistics=None):
-        span_dics = self._complete_feature_raw_span_features(sentence, tags)
+    def _complete_feature_advanced_span_features(
+        self, sentence, tags, statistics=None, chunks=None
+    ):
+        span_dics = self._complete_feature_raw_span_features(
+            sentence, tags, chunks=chunks
+        )
         # if not self.dict_pre_computed_models:
         #     return span_dics
 
@@ -347,6 +348,20 @@ class NERProcessor(Processor):
         :param statistics: Training set statistics that are used to calculate training set specific features
         :return: The features that are active (e.g. skipping training set features when no training set available)
         """
+        if sys_info.num_workers > 1:
+            eprint(
+                "num_workers is not supported for named entity recognition, featurizing serially"
+            )
+        # extract the chunks of all sentences at once
+        true_chunks = TagSequences([x["true_tags"] for x in sys_output]).chunks()
+        pred_chunks = TagSequences([x["pred_tags"] for x in sys_output]).chunks()
+        # sentence-level training set dependent features, for all sentences at once
+        if statistics is not None:
+            tokenized = TokenizedTexts.from_token_lists(
+                [x["tokens"] for x in sys_output]
+            )
+            num_oov = batch_num_oov(tokenized, statistics).tolist()
+            fre_rank = batch_freq_rank(tokenized, statistics).tolist()
         for _id, dict_sysout in tqdm(enumerate(sys_output), desc="featurizing"):
             # Get values of bucketing features
             tokens = dict_sysout["tokens"]
@@ -356,22 +371,32 @@ class NERProcessor(Processor):
 
             # sentence-level training set dependent features
             if statistics is not None:
-                dict_sysout["num_oov"] = self._get_num_oov(tokens, statistics)
-                dict_sysout["fre_rank"] = self._get_fre_rank(tokens, statistics)
+                dict_sysout["num_oov"] = num_oov[_id]
+                dict_sysout["fre_rank"] = fre_rank[_id]
 
             dict_sysout[
                 "true_entity_info"
             ] = self._complete_feature_advanced_span_features(
-                tokens, dict_sysout["true_tags"], statistics=statistics
+                tokens,
+                dict_sysout["true_tags"],
+                statistics=statistics,
+                chunks=true_chunks[_id],
             )
             dict_sysout[
                 "pred_entity_info"
             ] = self._complete_feature_advanced_span_features(
-                tokens, dict_sysout["pred_tags"], statistics=statistics
+                tokens,
+                dict_sysout["pred_tags"],
+                statistics=statistics,
+                chunks=pred_chunks[_id],
             )
         # This should return a list, but this list isn't used in the overridden function so ignore for now
         return None  # noqa
 
+    def _get_metric_stats(self, sys_info: SysOutputInfo, sys_output: List[dict]):
+        # entity-level F1 is calculated over spans rather than samples, see `get_bucket_performance_ner()`
+        return None
+
     # TODO(gneubig): should this be generalized or is it task specific?
     def get_overall_performance(
         self,
@@ -406,38 +431,54 @@ class NERProcessor(Processor):
             overall[metric_name] = overall_performance
         return overall
 
-    def _bucketing_samples_add_feats(
+    def _get_span_table(
         self,
-        sample_id,
-        bucket_features,
-        pcf_set,
-        feature_table,
-        entity_info_list,
-        feature_to_sample_address_to_value,
-    ):
-
-        for span_info in entity_info_list:
-            span_text = span_info["span_text"]
-            span_pos = span_info["span_pos"]
-            span_label = span_info["span_tag"]
-
-            span_address = f'{sample_id}|||{span_pos[0]}|||{span_pos[1]}|||{span_text}|||{span_label}'
-
-            for feature_name in bucket_features:
-                if feature_name not in feature_to_sample_address_to_value.keys():
-                    feature_to_sample_address_to_value[feature_name] = {}
-                elif feature_name in feature_table:  # first-level features
-                    feature_to_sample_address_to_value[feature_name][
-                        span_address
-                    ] = feature_table[feature_name]
-                elif feature_name in span_info:  # second-level features
-                    feature_to_sample_address_to_value[feature_name][
-                        span_address
-                    ] = span_info[feature_name]
-                elif feature_name not in pcf_set:
-                    raise ValueError(
-                        f'Missing feature {feature_name} not found and not pre-computed'
-                    )
+        sys_output: List[dict],
+        entity_info_name: str,
+        bucket_features: List[str],
+        pcf_set: set,
+        tag_to_id: Dict[str, int],
+    ) -> "SpanTable":
+        """
+        Collect the entity spans of a system output and the values of their bucketing features
+        :param sys_output: The system output itself
+        :param entity_info_name: The field holding the spans of each sample, i.e. "true_entity_info" or
+            "pred_entity_info"
+        :param bucket_features: The names of the bucketing features
+        :param pcf_set: The names of the pre-computed features
+        :param tag_to_id: A mapping from entity tags to their IDs, which is extended with unseen tags
+        :return: The spans of all samples
+        """
+        spans = []
+        texts = []
+        feature_values: Dict[str, list] = {
+            feature_name: [] for feature_name in bucket_features
+        }
+        for sample_id, feature_table in enumerate(sys_output):
+            for span_info in feature_table[entity_info_name]:
+                span_pos = span_info["span_pos"]
+                tag_id = tag_to_id.setdefault(span_info["span_tag"], len(tag_to_id))
+                spans.append((sample_id, span_pos[0], span_pos[1], tag_id))
+                texts.append(span_info["span_text"])
+
+                for feature_name in bucket_features:
+                    if feature_name in feature_table:  # first-level features
+                        feature_values[feature_name].append(feature_table[feature_name])
+                    elif feature_name in span_info:  # second-level features
+                        feature_values[feature_name].append(span_info[feature_name])
+                    elif feature_name not in pcf_set:
+                        raise ValueError(
+                            f'Missing feature {feature_name} not found and not pre-computed'
+                        )
+        return SpanTable(
+            np.array(spans, dtype=SpanTable.dtype),
+            texts,
+            {
+                feature_name: np.array(values)
+                for feature_name, values in feature_values.items()
+                if len(values) == len(spans)
+            },
+        )
 
     def _bucketing_samples(
         self,
@@ -446,40 +487,20 @@ class NERProcessor(Processor):
         active_features: List[str],
     ) -> Tuple[dict, dict]:
 
-        feature_to_sample_address_to_value_true = {}
-        feature_to_sample_address_to_value_pred = {}
-
         bucket_features = sys_info.features.get_bucket_features()
         pcf_set = set(sys_info.features.get_pre_computed_features())
 
         # Preparation for bucketing
-        for _id, feature_table in enumerate(sys_output):
-
-            self._bucketing_samples_add_feats(
-                _id,
-                bucket_features,
-                pcf_set,
-                feature_table,
-                feature_table["true_entity_info"],
-                feature_to_sample_address_to_value_true,
-            )
-            self._bucketing_samples_add_feats(
-                _id,
-                bucket_features,
-                pcf_set,
-                feature_table,
-                feature_table["pred_entity_info"],
-                feature_to_sample_address_to_value_pred,
-            )
-
-        # Bucketing
-        samples_over_bucket = {}
-        samples_over_bucket_pred = {}
-        performances_over_bucket = {}
-        for feature_name in tqdm(
-            sys_info.features.get_bucket_features(), desc="bucketing"
-        ):
+        tag_to_id: Dict[str, int] = {}
+        true_spans = self._get_span_table(
+            sys_output, "true_entity_info", bucket_features, pcf_set, tag_to_id
+        )
+        pred_spans = self._get_span_table(
+            sys_output, "pred_entity_info", bucket_features, pcf_set, tag_to_id
+        )
+        tags = list(tag_to_id)
 
+        def bucket_feature(feature_name: str):
             _bucket_info = ""
             if feature_name in sys_info.features.keys():
                 _bucket_info = sys_info.features[feature_name].bucket_info
@@ -494,149 +515,184 @@ class NERProcessor(Processor):
             # The following indicates that there are no examples, probably because necessary data for bucketing
             # was not available.
             if (
-                len(feature_to_sample_address_to_value_true[feature_name]) == 0
-                or len(feature_to_sample_address_to_value_pred[feature_name]) == 0
+                len(true_spans) == 0
+                or len(pred_spans) == 0
+                or feature_name not in true_spans.features
+                or feature_name not in pred_spans.features
             ):
-                continue
+                return None
 
             bucket_func = getattr(
                 explainaboard.utils.bucketing,
                 _bucket_info.method,
             )
-            samples_over_bucket[feature_name] = bucket_func(
-                dict_obj=feature_to_sample_address_to_value_true[feature_name],
+            samples = bucket_func(
+                dict_obj=true_spans.features[feature_name],
                 bucket_number=_bucket_info.number,
                 bucket_setting=_bucket_info.setting,
             )
 
-            # print(f"debug-1: {samples_over_bucket_true[feature_name]}")
-            samples_over_bucket_pred[
-                feature_name
-            ] = explainaboard.utils.bucketing.bucket_attribute_specified_bucket_interval(
-                dict_obj=feature_to_sample_address_to_value_pred[feature_name],
+            samples_pred = explainaboard.utils.bucketing.bucket_attribute_specified_bucket_interval(
+                dict_obj=pred_spans.features[feature_name],
                 bucket_number=_bucket_info.number,
-                bucket_setting=samples_over_bucket[feature_name].keys(),
+                bucket_setting=samples.keys(),
             )
 
-            # print(f"samples_over_bucket.keys():\n{samples_over_bucket_true.keys()}")
-
             # evaluating bucket: get bucket performance
-            performances_over_bucket[feature_name] = self.get_bucket_performance_ner(
+            return samples, self.get_bucket_performance_ner(
                 sys_info,
                 sys_output,
-                samples_over_bucket[feature_name],
-                samples_over_bucket_pred[feature_name],
+                samples,
+                samples_pred,
+                true_spans,
+                pred_spans,
+                tags,
             )
+
+        # Bucketing
+        samples_over_bucket = {}
+        performances_over_bucket = {}
+        for feature_name, result in self._map_features(
+            sys_info, bucket_feature, bucket_features
+        ).items():
+            if result is None:
+                continue
+            samples, performances = result
+            samples_over_bucket[feature_name] = samples
+            performances_over_bucket[feature_name] = performances
         return samples_over_bucket, performances_over_bucket
 
     """
     Get bucket samples (with mis-predicted entities) for each bucket given a feature (e.g., length)
     """
 
-    def _create_sample_dict(self, samp_bucket, interval):
-        dict_pos2tag = {}
-        for k_bucket_eval, spans in samp_bucket.items():
-            if k_bucket_eval != interval:
-                continue
-            for span in spans:
-                pos = "|||".join(span.split("|||")[0:4])
-                tag = span.split("|||")[-1]
-                dict_pos2tag[pos] = tag
-        return dict_pos2tag
-
     def get_bucket_cases_ner(
         self,
-        bucket_interval,
         sys_output: List[dict],
-        samples_over_bucket: Dict[str, List[str]],
-        samples_over_bucket_pred: Dict[str, List[str]],
-    ) -> list:
-        # predict:  2_3 -> NER
-        dict_pos2tag_pred = self._create_sample_dict(
-            samples_over_bucket_pred, bucket_interval
+        samples_over_bucket_true: Dict[str, np.ndarray],
+        samples_over_bucket_pred: Dict[str, np.ndarray],
+        true_spans: "SpanTable",
+        pred_spans: "SpanTable",
+        tags: List[str],
+    ) -> Dict[str, list]:
+        """
+        Get the error cases of every bucket of a feature in one pass over the true and predicted spans: the true
+        spans that are not predicted with their tag in the same bucket, then the predicted spans that are not true
+        :param sys_output: The system output itself
+        :param samples_over_bucket_true: a dictionary mapping bucket interval names to the indices of true spans
+        :param samples_over_bucket_pred: a dictionary mapping bucket interval names to the indices of predicted spans
+        :param true_spans: all true spans
+        :param pred_spans: all predicted spans
+        :param tags: The entity tag of each tag ID
+        :return: a dictionary mapping bucket interval names to their error cases
+        """
+        buckets = list(samples_over_bucket_true)
+        true_ids, true_buckets = _flatten_buckets(
+            [samples_over_bucket_true[b] for b in buckets]
+        )
+        pred_ids, pred_buckets = _flatten_buckets(
+            [samples_over_bucket_pred.get(b, np.zeros(0, dtype=int)) for b in buckets]
         )
-        dict_pos2tag = self._create_sample_dict(samples_over_bucket, bucket_interval)
-
-        error_case_list = []
-        for pos, tag in dict_pos2tag.items():
-
-            true_label = tag
-            sent_id = int(pos.split("|||")[0])
-            span = pos.split("|||")[-1]
-            system_output_id = sys_output[int(sent_id)]["id"]
 
-            if pos in dict_pos2tag_pred.keys():
-                pred_label = dict_pos2tag_pred[pos]
-                if true_label == pred_label:
-                    continue
-            else:
-                pred_label = "O"
+        # join the true and predicted spans on their position and bucket
+        max_end = max(true_spans.max_end(), pred_spans.max_end()) + 1
+        dims = (len(sys_output), max_end, max_end)
+        true_keys = (
+            true_spans.position_keys(dims)[true_ids] * len(buckets) + true_buckets
+        )
+        pred_keys = (
+            pred_spans.position_keys(dims)[pred_ids] * len(buckets) + pred_buckets
+        )
+        true_to_pred = _find_keys(pred_keys, true_keys)
+        pred_to_true = _find_keys(true_keys, pred_keys)
+        true_tag_ids = true_spans.spans["tag_id"][true_ids]
+        pred_tag_ids = pred_spans.spans["tag_id"][pred_ids]
+        # unmatched spans (-1) get the tag ID -1, which never equals a real tag ID
+        true_errors = np.append(pred_tag_ids, -1)[true_to_pred] != true_tag_ids
+        pred_errors = np.append(true_tag_ids, -1)[pred_to_true] != pred_tag_ids
+
+        bucket_cases: Dict[str, list] = {b: [] for b in buckets}
+        for i in np.flatnonzero(true_errors).tolist():
+            j = true_to_pred[i]
+            span_id = true_ids[i]
+            system_output_id = sys_output[int(true_spans.spans["sample_id"][span_id])][
+                "id"
+            ]
             error_case = {
-                "span": span,
+                "span": true_spans.texts[span_id],
                 "text": str(system_output_id),
-                "true_label": true_label,
-                "predicted_label": pred_label,
+                "true_label": tags[true_tag_ids[i]],
+                "predicted_label": tags[pred_tag_ids[j]] if j >= 0 else "O",
             }
-            error_case_list.append(error_case)
-
-        for pos, tag in dict_pos2tag_pred.items():
-
-            pred_label = tag
-
-            sent_id = int(pos.split("|||")[0])
-            span = pos.split("|||")[-1]
-            system_output_id = sys_output[int(sent_id)]["id"]
-
-            if pos in dict_pos2tag.keys():
-                true_label = dict_pos2tag[pos]
-                if true_label == pred_label:
-                    continue
-            else:
-                true_label = "O"
+            bucket_cases[buckets[true_buckets[i]]].append(error_case)
+
+        for j in np.flatnonzero(pred_errors).tolist():
+            i = pred_to_true[j]
+            span_id = pred_ids[j]
+            system_output_id = sys_output[int(pred_spans.spans["sample_id"][span_id])][
+                "id"
+            ]
             # error_case = span + "|||" + span_sentence + "|||" + true_label + "|||" + pred_label
             error_case = {
-                "span": span,
+                "span": pred_spans.texts[span_id],
                 "text": system_output_id,
-                "true_label": true_label,
-                "predicted_label": pred_label,
+                "true_label": tags[true_tag_ids[i]] if i >= 0 else "O",
+                "predicted_label": tags[pred_tag_ids[j]],
             }
-            error_case_list.append(error_case)
+            bucket_cases[buckets[pred_buckets[j]]].append(error_case)
 
-        return error_case_list
+        return bucket_cases
 
     def get_bucket_performance_ner(
         self,
         sys_info: SysOutputInfo,
         sys_output: List[dict],
-        samples_over_bucket_true: Dict[str, List[str]],
-        samples_over_bucket_pred: Dict[str, List[str]],
+        samples_over_bucket_true: Dict[str, np.ndarray],
+        samples_over_bucket_pred: Dict[str, np.ndarray],
+        true_spans: "SpanTable",
+        pred_spans: "SpanTable",
+        tags: List[str],
     ) -> Dict[str, List[BucketPerformance]]:
         """
         This function defines how to get bucket-level performance w.r.t a given feature (e.g., sentence length)
         :param sys_info: Information about the system output
         :param sys_output: The system output itself
-        :param samples_over_bucket_true: a dictionary mapping bucket interval names to true sample IDs
-        :param samples_over_bucket_pred: a dictionary mapping bucket interval names to predicted sample IDs
+        :param samples_over_bucket_true: a dictionary mapping bucket interval names to the indices of true spans
+        :param samples_over_bucket_pred: a dictionary mapping bucket interval names to the indices of predicted spans
+        :param true_spans: all true spans
+        :param pred_spans: all predicted spans
+        :param tags: the entity tag of each tag ID
         :return: bucket_name_to_performance: a dictionary that maps bucket names to bucket performance
         """
 
+        span_dims = (
+            len(sys_output),
+            max(true_spans.max_end(), pred_spans.max_end()) + 1,
+            max(true_spans.max_end(), pred_spans.max_end()) + 1,
+            len(tags),
+        )
+        true_keys = true_spans.keys(span_dims)
+        pred_keys = pred_spans.keys(span_dims)
+
+        """
+        Get bucket samples for ner task
+        """
+        bucket_cases = self.get_bucket_cases_ner(
+            sys_output,
+            samples_over_bucket_true,
+            samples_over_bucket_pred,
+            true_spans,
+            pred_spans,
+            tags,
+        )
+
         bucket_name_to_performance = {}
-        for bucket_interval, spans_true in samples_over_bucket_true.items():
+        for bucket_interval, true_ids in samples_over_bucket_true.items():
 
             if bucket_interval not in samples_over_bucket_pred.keys():
                 raise ValueError("Predict Label Bucketing Errors")
             else:
-                spans_pred = samples_over_bucket_pred[bucket_interval]
-
-            """
-            Get bucket samples for ner task
-            """
-            bucket_samples = self.get_bucket_cases_ner(
-                bucket_interval,
-                sys_output,
-                samples_over_bucket_true,
-                samples_over_bucket_pred,
-            )
+                pred_ids = samples_over_bucket_pred[bucket_interval]
 
             for metric_name in sys_info.metric_names:
                 """
@@ -647,7 +703,9 @@ class NERProcessor(Processor):
                 """
                 if metric_name != 'f1_score_seqeval':
                     raise NotImplementedError(f'Unsupported metric {metric_name}')
-                f1, p, r = f1_score_seqeval_bucket(spans_pred, spans_true)
+                f1, p, r = f1_score_seqeval_bucket(
+                    pred_keys[pred_ids], true_keys[true_ids]
+                )
 
                 bucket_name_to_performance[bucket_interval] = []
                 bucket_performance = BucketPerformance(
@@ -656,8 +714,8 @@ class NERProcessor(Processor):
                     value=f1,
                     confidence_score_low=None,
                     confidence_score_high=None,
-                    n_samples=len(spans_pred),
-                    bucket_samples=bucket_samples,
+                    n_samples=len(pred_ids),
+                    bucket_samples=bucket_cases[bucket_interval],
                 )
 
                 bucket_name_to_performance[bucket_interval].append(bucket_performance)
@@ -665,115 +723,319 @@ class NERProcessor(Processor):
         return sort_dict(bucket_name_to_performance)
 
 
-def get_econ_dic(train_word_sequences, tag_sequences_train, tags):
+class SpanTable:
+    """
+    The entity spans of a system output: a structured array of (sample_id, start, end, tag_id), the text of each
+    span in a side table, and the values of the bucketing features of each span. Spans are compared through integer
+    keys (see `keys()`) instead of strings.
+    """
+
+    dtype = np.dtype(
+        [("sample_id", int), ("start", int), ("end", int), ("tag_id", int)]
+    )
+
+    def __init__(
+        self, spans: np.ndarray, texts: List[str], features: Dict[str, np.ndarray]
+    ):
+        self.spans = spans
+        self.texts = texts
+        self.features = features
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def max_end(self) -> int:
+        return int(self.spans["end"].max()) if len(self.spans) > 0 else 0
+
+    def keys(self, dims: Tuple[int, int, int, int]) -> np.ndarray:
+        """
+        :param dims: upper bounds of the sample IDs, starts, ends and tag IDs
+        :return: one integer per span, which identifies its sample, position and tag
+        """
+        return np.ravel_multi_index(
+            (
+                self.spans["sample_id"],
+                self.spans["start"],
+                self.spans["end"],
+                self.spans["tag_id"],
+            ),
+            dims,
+        )
+
+    def position_keys(self, dims: Tuple[int, int, int]) -> np.ndarray:
+        """
+        :param dims: upper bounds of the sample IDs, starts and ends
+        :return: one integer per span, which identifies its sample and position
+        """
+        return np.ravel_multi_index(
+            (self.spans["sample_id"], self.spans["start"], self.spans["end"]), dims
+        )
+
+
+def _flatten_buckets(bucket_ids: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    :param bucket_ids: the indices of the spans of each bucket
+    :return: the indices of the spans of all buckets, in bucket order, and the bucket number of each
+    """
+    ids = np.concatenate(
+        [np.zeros(0, dtype=int)] + [np.asarray(b, dtype=int) for b in bucket_ids]
+    )
+    buckets = np.repeat(np.arange(len(bucket_ids)), [len(b) for b in bucket_ids])
+    return ids, buckets
+
+
+def _find_keys(keys: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """
+    :return: for each query, the index of the last equal key, or -1 if there is none
+    """
+    if len(keys) == 0:
+        return np.full(len(queries), -1, dtype=int)
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    found = np.searchsorted(sorted_keys, queries, side="right") - 1
+    found_clipped = np.maximum(found, 0)
+    is_found = (found >= 0) & (sorted_keys[found_clipped] == queries)
+    return np.where(is_found, order[found_clipped], -1)
+
+
+def _get_entity_pattern(entity_span: str) -> str:
+    entity_span_new = ' ' + entity_span + ' '
+    return (
+        entity_span_new.replace('(', '')
+        .replace(')', '')
+        .replace('*', '')
+        .replace('+', '')
+    )
+
+
+def get_entity_span_occurrences(
+    train_word_sequences, tag_sequences_train
+) -> Dict[str, List[int]]:
+    """
+    Find where each entity span of the training set occurs in the training corpus: the token indices of the
+    (non-overlapping) matches of `' ' + entity_span + ' '` (without the characters `()*+`) in the lowercased
+    corpus string, as `re.finditer()` would find them.
+    :param train_word_sequences: the tokens of the corpus
+    :param tag_sequences_train: the tags of the corpus' tokens
+    :return: a dictionary mapping each lowercased entity span to the token indices of its occurrences
+    """
+    return _get_entity_span_occurrences(
+        *_encode_corpus(train_word_sequences), *_encode_corpus(tag_sequences_train)
+    )
+
+
+def _encode_corpus(sequence: List[str]) -> Tuple[List[str], np.ndarray]:
+    """
+    :return: the distinct strings of a sequence, and the index of each of its strings among them
+    """
+    vocab: Dict[str, int] = {}
+    ids = np.fromiter(
+        (vocab.setdefault(x, len(vocab)) for x in sequence),
+        dtype=np.int32,
+        count=len(sequence),
+    )
+    return list(vocab), ids
+
+
+def _get_entity_span_occurrences(
+    words: List[str], token_ids: np.ndarray, tag_id2str: List[str], tag_ids: np.ndarray
+) -> Dict[str, List[int]]:
+    """
+    Same as `get_entity_span_occurrences()`, for a corpus given as arrays of token IDs and tag IDs (see
+    `StatisticsBuilder.corpus()`), so that it is not expanded to lists of strings.
+
+    Instead of scanning the corpus once per entity span, the occurrences of all spans of the same length are looked
+    up in one index of the n-grams of the corpus (sorted by their hash), which takes near-linear time. Spans that
+    still contain regex special characters (e.g. "u.s.") are matched as regular expressions.
+    :param words: the distinct tokens of the corpus
+    :param token_ids: the index of each token of the corpus in `words`
+    :param tag_id2str: the name of each tag ID
+    :param tag_ids: the tag ID of each token of the corpus
+    """
+    # the lowercased tokens, whose IDs index the n-grams of the corpus
+    vocab: Dict[str, int] = {}
+    lowercased_ids = np.array(
+        [vocab.setdefault(w.lower(), len(vocab)) for w in words], dtype=np.int32
+    )
+    tokens = np.array(list(vocab), dtype=object)
+    token_ids = lowercased_ids[token_ids]
+
+    entity_spans = {
+        ' '.join(tokens[token_ids[idx_start:idx_end]])
+        for _, idx_start, idx_end in TagSequences.from_tag_ids(
+            tag_ids, tag_id2str
+        ).chunks()[0]
+    }
+
+    if any(t.split() != [t] for t in tokens):
+        # token boundaries are not single spaces, fall back to searching the corpus string
+        word_sequences_train_str = ' '.join(tokens[token_ids])
+        occurrences = {}
+        for entity_span in entity_spans:
+            entity_str_sid = [
+                m.start()
+                for m in re.finditer(
+                    _get_entity_pattern(entity_span), word_sequences_train_str
+                )
+            ]
+            occurrences[entity_span] = [
+                len(word_sequences_train_str[0:str_idx].split())
+                for str_idx in entity_str_sid
+            ]
+        return occurrences
+
+    # the corpus string is only built for the spans that are matched as regular expressions
+    word_sequences_train_str = None
+    token_starts = np.zeros(len(token_ids), dtype=int)
+    token_lengths = np.array([len(t) + 1 for t in tokens], dtype=int)
+    np.cumsum(token_lengths[token_ids[:-1]], out=token_starts[1:])
+
+    occurrences = {}
+    patterns_by_length: Dict[int, list] = {}
+    for entity_span in entity_spans:
+        entity_pattern = _get_entity_pattern(entity_span)
+        if any(c in _REGEX_SPECIAL_CHARS for c in entity_pattern):
+            if word_sequences_train_str is None:
+                word_sequences_train_str = ' '.join(tokens[token_ids])
+            occurrences[entity_span] = np.searchsorted(
+                token_starts,
+                [
+                    m.start()
+                    for m in re.finditer(entity_pattern, word_sequences_train_str)
+                ],
+            ).tolist()
+            continue
+        pattern_tokens = entity_pattern[1:-1].split(' ')
+        if any(t not in vocab for t in pattern_tokens):
+            occurrences[entity_span] = []
+            continue
+        patterns_by_length.setdefault(len(pattern_tokens), []).append(
+            (entity_span, [vocab[t] for t in pattern_tokens])
+        )
+
+    for length, patterns in patterns_by_length.items():
+        if length > len(token_ids) - 2:
+            occurrences.update((entity_span, []) for entity_span, _ in patterns)
+            continue
+        # a match needs a token before and after the span, for the spaces around the pattern
+        windows = np.lib.stride_tricks.sliding_window_view(token_ids, length)[1:-1]
+        window_hashes = _hash_ngrams(windows)
+        window_order = np.argsort(window_hashes, kind="stable")
+        sorted_hashes = window_hashes[window_order]
+        pattern_ids = np.array([ids for _, ids in patterns], dtype=int)
+        pattern_hashes = _hash_ngrams(pattern_ids)
+        begins = np.searchsorted(sorted_hashes, pattern_hashes, side="left")
+        ends = np.searchsorted(sorted_hashes, pattern_hashes, side="right")
+        for (entity_span, _), ids, begin, end in zip(
+            patterns, pattern_ids, begins, ends
+        ):
+            positions = window_order[begin:end]
+            positions = positions[np.all(windows[positions] == ids, axis=1)] + 1
+            # the trailing space of a match can not start the next match
+            sids = []
+            next_sid = 0
+            for sid in positions.tolist():
+                if sid >= next_sid:
+                    sids.append(sid)
+                    next_sid = sid + length + 1
+            occurrences[entity_span] = sids
+    return occurrences
+
+
+def _hash_ngrams(ngrams: np.ndarray) -> np.ndarray:
+    """
+    :param ngrams: an (n, length) array of token IDs
+    :return: a hash of each n-gram
+    """
+    hashes = np.zeros(len(ngrams), dtype=np.uint64)
+    for i in range(ngrams.shape[1]):
+        hashes = hashes * np.uint64(1000003) + ngrams[:, i].astype(np.uint64)
+    return hashes
+
+
+def get_econ_dic(
+    train_word_sequences, tag_sequences_train, tags, span_occurrences=None
+):
     """
     Note: when matching, the text span and tag have been lowercased.
+    :param span_occurrences: the result of `get_entity_span_occurrences()`, computed if not given
+    """
+    if span_occurrences is None:
+        span_occurrences = get_entity_span_occurrences(
+            train_word_sequences, tag_sequences_train
+        )
+    return _get_econ_dic(*_encode_corpus(tag_sequences_train), tags, span_occurrences)
+
+
+def _get_econ_dic(
+    tag_id2str: List[str], tag_ids: np.ndarray, tags, span_occurrences
+) -> dict:
     """
+    Same as `get_econ_dic()`, for the tag IDs of the corpus
+    """
+    # the lowercased entity type of each tag ID
+    label_names: Dict[str, int] = {}
+    label_ids = np.array(
+        [
+            label_names.setdefault(
+                label.split('-')[1].lower() if len(label.split('-')) > 1 else 'o',
+                len(label_names),
+            )
+            for label in tag_id2str
+        ],
+        dtype=int,
+    )
+    label_names_list = list(label_names)
     econ_dic = dict()
-    chunks_train = set(get_chunks(tag_sequences_train))
 
     print('tags: ', tags)
-    count_idx = 0
-    print('num of computed chunks:', len(chunks_train))
-    word_sequences_train_str = ' '.join(train_word_sequences).lower()
-    for true_chunk in tqdm(chunks_train):
-        # print('true_chunk',true_chunk)
-        count_idx += 1
-        # print()
-        # print('progress: %d / %d: ' % (count_idx, len(chunks_train)))
-        idx_start = true_chunk[1]
-        idx_end = true_chunk[2]
-
-        entity_span = ' '.join(train_word_sequences[idx_start:idx_end]).lower()
-        if entity_span in econ_dic:
-            continue
-        else:
-            econ_dic[entity_span] = dict()
-            for tag in tags:
-                econ_dic[entity_span][tag] = 0.0
+    print('num of computed entity spans:', len(span_occurrences))
+    for entity_span, entity_sids in tqdm(span_occurrences.items()):
+        econ_dic[entity_span] = dict()
+        for tag in tags:
+            econ_dic[entity_span][tag] = 0.0
 
         # Determine if the same position in pred list giving a right prediction.
-        entity_span_new = ' ' + entity_span + ' '
-
-        entity_span_new = (
-            entity_span_new.replace('(', '')
-            .replace(')', '')
-            .replace('*', '')
-            .replace('+', '')
-        )
-        # print('entity_span_new', entity_span_new)
-        entity_str_sid = [
-            m.start() for m in re.finditer(entity_span_new, word_sequences_train_str)
-        ]
-        # print('count_find_span:', len(entity_str_sid))
-        if len(entity_str_sid) > 0:
-            label_list = []
-            # convert the string index into list index...
-            entity_sids = []
-            for str_idx in entity_str_sid:
-                entity_sid = len(word_sequences_train_str[0:str_idx].split())
-                entity_sids.append(entity_sid)
+        if len(entity_sids) > 0:
             entity_len = len(entity_span.split())
+            positions = (
+                np.array(entity_sids)[:, np.newaxis] + np.arange(entity_len)
+            ).reshape(-1)
+            label_list = label_ids[tag_ids[positions[positions < len(tag_ids)]]]
+
+            # the labels in the order they first appear, like `Counter(label_list)`
+            labels, first, counts = np.unique(
+                label_list, return_index=True, return_counts=True
+            )
+            for i in np.argsort(first):
+                hard = float('%.3f' % (float(counts[i]) / len(label_list)))
+                econ_dic[entity_span][label_names_list[labels[i]]] = hard
 
-            for sid in entity_sids:
-                label_candi_list = tag_sequences_train[sid : sid + entity_len]
-                for label in label_candi_list:
-                    klab = 'o'
-                    if len(label.split('-')) > 1:
-                        klab = label.split('-')[1].lower()
-                    label_list.append(klab)
-
-            label_norep = list(set(label_list))
-            for lab_norep in label_norep:
-                hard = float(
-                    '%.3f' % (float(label_list.count(lab_norep)) / len(label_list))
-                )
-                econ_dic[entity_span][lab_norep] = hard
-
-    # fwrite = open(path_write, 'wb')
-    # pickle.dump(econ_dic, fwrite)
-    # fwrite.close()
     """
     {
         'benson koech': {'O': 0.0, 'org': 0.0, 'loc': 0.0, 'per': 1.0, 'misc': 0.0}
     }
     """
-    # exit()
     return econ_dic
 
 
 # Global functions for training set dependent features
-def get_efre_dic(train_word_sequences, tag_sequences_train):
-    efre_dic = dict()
-    chunks_train = set(get_chunks(tag_sequences_train))
-    count_idx = 0
-    word_sequences_train_str = ' '.join(train_word_sequences).lower()
-    for true_chunk in tqdm(chunks_train):
-        count_idx += 1
-        # print('progress: %d / %d: ' % (count_idx, len(chunks_train)))
-        idx_start = true_chunk[1]
-        idx_end = true_chunk[2]
-
-        entity_span = ' '.join(train_word_sequences[idx_start:idx_end]).lower()
-        # print('entity_span', entity_span)
-        if entity_span in efre_dic:
-            continue
-        else:
-            efre_dic[entity_span] = []
-
-        # Determine if the same position in pred list giving a right prediction.
-        entity_span_new = ' ' + entity_span + ' '
-        entity_span_new = (
-            entity_span_new.replace('(', '')
-            .replace(')', '')
-            .replace('*', '')
-            .replace('+', '')
+def get_efre_dic(train_word_sequences, tag_sequences_train, span_occurrences=None):
+    """
+    :param span_occurrences: the result of `get_entity_span_occurrences()`, computed if not given
+    """
+    if span_occurrences is None:
+        span_occurrences = get_entity_span_occurrences(
+            train_word_sequences, tag_sequences_train
         )
-        entity_str_sid = [
-            m.start() for m in re.finditer(entity_span_new, word_sequences_train_str)
-        ]
+    return _get_efre_dic(span_occurrences)
 
-        efre_dic[entity_span] = len(entity_str_sid)
+
+def _get_efre_dic(span_occurrences) -> dict:
+    efre_dic = {
+        entity_span: len(entity_sids)
+        for entity_span, entity_sids in span_occurrences.items()
+    }
 
     sorted_efre_dic = sorted(efre_dic.items(), key=lambda item: item[1], reverse=True)
 
@@ -788,14 +1050,11 @@ def get_efre_dic(train_word_sequences, tag_sequences_train):
     # print('The number of words whose word frequency exceeds the threshold: %d is %d' % (
     #     max_freq, count_bigger_than_max_freq))
 
-    # fwrite = open(path_write, 'wb')
-    # pickle.dump(efre_dic_keep, fwrite)
-    # fwrite.close()
-
     return efre_dic_keep
 
 
-@sequence_labeling_aggregating(
+@lazy_aggregating(
+    "datalabs.operations.aggregate.sequence_labeling.sequence_labeling_aggregating",
     name="get_statistics",
     contributor="datalab",
     task="sequence-labeling, named-entity-recognition, structure-prediction",
@@ -816,42 +1075,28 @@ def get_statistics(samples: Iterator, tag_id2str=None):
 
     if tag_id2str is None:
         tag_id2str = []
-    tokens_sequences = []
-    tags_sequences = []
     tags_without_bio = list(
         set([t.split('-')[1].lower() if len(t) > 1 else t for t in tag_id2str])
     )
 
-    vocab = {}
-    for sample in tqdm(samples):
-        tokens, tag_ids = sample["tokens"], sample["tags"]
-        tags = [tag_id2str[tag_id] for tag_id in tag_ids]
-
-        # update vocabulary
-        for w in tokens:
-            if w in vocab.keys():
-                vocab[w] += 1
-            else:
-                vocab[w] = 1
-
-        tokens_sequences += tokens
-        tags_sequences += tags
+    samples_tee = tee(samples)
+    builder = build_statistics(
+        (sample["tokens"] for sample in samples_tee[0]),
+        (sample["tags"] for sample in samples_tee[1]),
+        keep_corpus=True,
+    )
+    words, token_ids, tag_ids = builder.corpus()
 
+    span_occurrences = _get_entity_span_occurrences(
+        words, token_ids, tag_id2str, tag_ids
+    )
     # efre_dic
-    econ_dic = get_econ_dic(tokens_sequences, tags_sequences, tags_without_bio)
+    econ_dic = _get_econ_dic(tag_id2str, tag_ids, tags_without_bio, span_occurrences)
     # econ_dic = {"a":1} # for debugging purpose
     # econ_dic
-    efre_dic = get_efre_dic(tokens_sequences, tags_sequences)
-    # vocab_rank: the rank of each word based on its frequency
-    sorted_dict = {
-        key: rank
-        for rank, key in enumerate(sorted(set(vocab.values()), reverse=True), 1)
-    }
-    vocab_rank = {k: sorted_dict[v] for k, v in vocab.items()}
-
+    efre_dic = _get_efre_dic(span_occurrences)
     return {
         "efre_dic": efre_dic,
         "econ_dic": econ_dic,
-        "vocab": vocab,
-        "vocab_rank": vocab_rank,
+        **builder.statistics(),
     }
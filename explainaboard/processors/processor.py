@@ -1,23 +1,45 @@
 import json
-from typing import Callable, List, Tuple, Dict
+import pickle
+import random
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
-from datalabs import load_dataset
-from explainaboard.utils.async_eaas import AsyncEaaSClient
-from eaas.config import Config
+import numpy as np
 from tqdm import tqdm
 
 import explainaboard.metric
 import explainaboard.utils.bucketing
 from explainaboard import feature
 from explainaboard.info import SysOutputInfo, Performance, BucketPerformance, Result
+from explainaboard.sys_output_table import SysOutputTable
 from explainaboard.tasks import TaskType
 from explainaboard.utils.db_api import read_statistics_from_db, write_statistics_to_db
+from explainaboard.utils.entity_cache import EntityCache
+from explainaboard.utils.lazy_aggregating import get_operation
+from explainaboard.utils.logging import get_logger
+from explainaboard.utils.spacy_loader import get_named_entities_batch
+from explainaboard.utils.statistics_cache import StatisticsCache, dataset_fingerprint
+from explainaboard.utils.value_histogram import ValueHistogram
 from explainaboard.utils.py_utils import (
     eprint,
     print_dict,
     sort_dict,
 )
 
+logger = get_logger(__name__)
+
 
 class Processor:
     """Base case for task-based processor"""
@@ -29,9 +51,54 @@ class Processor:
 
     def __init__(self) -> None:
         # Things to use only if necessary
-        self._eaas_config = None
         self._eaas_client = None
+        self._batched_eaas_client = None
         self._statistics_func = None
+        self._statistics_cache = StatisticsCache()
+        # the system output whose metric statistics were last calculated, and the statistics
+        self._metric_stats = None
+        # the spacy options of the system output being featurized, see `_get_named_entities_batch()`
+        self._named_entity_options: dict = {}
+        self._cache_entities = False
+
+    def __getstate__(self):
+        # the statistics function and EaaS client are only used by the main process and are not always picklable,
+        # so they are not sent to featurization workers
+        state = self.__dict__.copy()
+        state.update(
+            _statistics_func=None,
+            _eaas_client=None,
+            _batched_eaas_client=None,
+        )
+        return state
+
+    def _read_cached_statistics(
+        self,
+        sys_info: SysOutputInfo,
+        statistics_func: Callable,
+        sub_dataset_name: Optional[str] = None,
+    ) -> Tuple[str, Optional[dict]]:
+        """Look up the statistics of a dataset in the local statistics cache, before any network or recompute path.
+
+        :param sys_info: Information about the system outputs
+        :param statistics_func: The function used to get the statistics
+        :param sub_dataset_name: The subset the statistics are calculated on, if not `sys_info.sub_dataset_name`
+        :return: The cache key, and the cached statistics or None if they are not cached (or `reload_stat` is False)
+        """
+        sub_dataset_name = sub_dataset_name or sys_info.sub_dataset_name
+        cache_key = self._statistics_cache.make_key(
+            sys_info.dataset_name,
+            sub_dataset_name,
+            statistics_func,
+            dataset_fingerprint(sys_info.dataset_name, sub_dataset_name),
+        )
+        if not sys_info.reload_stat:
+            return cache_key, None
+        return cache_key, self._statistics_cache.get(cache_key)
+
+    def _write_cached_statistics(self, cache_key: str, statistics: Optional[dict]):
+        if statistics is not None:
+            self._statistics_cache.put(cache_key, statistics)
 
     def _init_statistics(self, sys_info: SysOutputInfo, statistics_func: Callable):
         """Take in information about the system outputs and a statistic calculating function and return a dictionary
@@ -43,6 +110,11 @@ class Processor:
         """
         statistics = None
         if sys_info.dataset_name is not None:
+            cache_key, statistics = self._read_cached_statistics(
+                sys_info, statistics_func
+            )
+            if statistics is not None:
+                return statistics
             dataset_name = sys_info.dataset_name
             split_name = "train"
             sub_dataset = (
@@ -63,6 +135,8 @@ class Processor:
                     or message
                     == "the dataset does not include the information of _stat"
                 ):
+                    from datalabs import load_dataset
+
                     dataset = load_dataset(
                         sys_info.dataset_name, sys_info.sub_dataset_name
                     )
@@ -70,7 +144,7 @@ class Processor:
                         len(dataset[split_name]._stat) == 0 or not sys_info.reload_stat
                     ):  # calculate the statistics (_stat) when _stat is {} or `reload_stat` is False
                         new_train = dataset[split_name].apply(
-                            statistics_func, mode="local"
+                            get_operation(statistics_func), mode="local"
                         )
 
                         statistics = new_train._stat
@@ -91,20 +165,56 @@ class Processor:
                     "The dataset hasn't been supported by DataLab so no training set dependent features will be supported by ExplainaBoard."  # noqa
                     "You can add the dataset by: https://github.com/ExpressAI/DataLab/blob/main/docs/SDK/add_new_datasets_into_sdk.md"  # noqa
                 )
+            self._write_cached_statistics(cache_key, statistics)
         return statistics
 
     def _get_feature_func(self, func_name: str):
         return getattr(self, f'_get_{func_name}')
 
+    def _get_batch_feature_func(self, func_name: str) -> Optional[Callable]:
+        """
+        Get the batch form of a feature function if the processor defines one. A batch feature function
+        `_get_<feature>_batch(samples, statistics)` takes the whole `SysOutputTable` and training set statistics
+        (or None) and returns one value per sample, and is preferred over the per-sample `_get_<feature>`.
+        """
+        return getattr(self, f'_get_{func_name}_batch', None)
+
     def _get_eaas_client(self):
         if not self._eaas_client:
-            self._eaas_config = Config()
-            self._eaas_client = AsyncEaaSClient()
-            self._eaas_client.load_config(
-                self._eaas_config
-            )  # The config you have created above
+            from explainaboard.utils.async_eaas import make_eaas_client
+
+            self._eaas_client = make_eaas_client()
         return self._eaas_client
 
+    def _get_batched_eaas_client(self):
+        """
+        Get an EaaS client that scores samples in batches, for feature functions that would otherwise make one
+        request per sample
+        :return: a `BatchedEaaSClient`
+        """
+        if not self._batched_eaas_client:
+            from explainaboard.utils.async_eaas import BatchedEaaSClient
+
+            self._batched_eaas_client = BatchedEaaSClient.from_client(
+                self._get_eaas_client()
+            )
+        return self._batched_eaas_client
+
+    def _get_named_entities_batch(self, texts: Sequence[str]) -> List[list]:
+        """
+        Get the named entities of texts with spacy in batches, for batch feature functions
+        :param texts: the texts
+        :return: the entities of each text, as `(text, label, start_char, end_char)` tuples
+        """
+        cache = EntityCache() if self._cache_entities else None
+        try:
+            return get_named_entities_batch(
+                texts, cache=cache, **self._named_entity_options
+            )
+        finally:
+            if cache is not None:
+                cache.close()
+
     def _get_true_label(self, data_point: dict):
         """
         Get the true label from a data point. Returns "true_label" by default, but can be overloaded.
@@ -122,29 +232,97 @@ class Processor:
         return data_point["predicted_label"]
 
     def _complete_features(
-        self, sys_info: SysOutputInfo, sys_output: List[dict], statistics=None
+        self, sys_info: SysOutputInfo, sys_output: SysOutputTable, statistics=None
     ) -> List[str]:
         """
         This function takes in meta-data about system outputs, system outputs, and a few other optional pieces of
-        information, then calculates feature functions and modifies `sys_output` to add these feature values
+        information, then calculates feature functions and adds one column per feature to `sys_output`
 
         :param sys_info: Information about the system output
         :param sys_output: The system output itself
         :param statistics: Training set statistics that are used to calculate training set specific features
         :return: The features that are active (e.g. skipping training set features when no training set available)
         """
-        # Get names of bucketing features
-        bucket_feature_funcs = {}
+        bucket_features = self._get_bucket_features(sys_info, statistics)
+        self._named_entity_options = dict(
+            batch_size=sys_info.spacy_batch_size, n_process=sys_info.spacy_n_process
+        )
+        self._cache_entities = sys_info.cache_entities
+        if sys_info.num_workers > 1:
+            feature_values = self._get_feature_values_parallel(
+                bucket_features, sys_output, statistics, sys_info.num_workers
+            )
+        else:
+            feature_values = self._get_feature_values(
+                bucket_features, sys_output, statistics
+            )
+        # store each feature as a single (usually numeric) column
+        for bucket_key, values in feature_values.items():
+            sys_output.add_column(bucket_key, values)
+        self._log_token_cache(sys_output)
+        return list(bucket_features.keys())
+
+    def _log_token_cache(self, sys_output: SysOutputTable):
+        """
+        Log how often the feature functions shared the tokenization of a text field of `sys_output`
+        """
+        token_cache = sys_output.token_cache
+        logger.info(
+            "token cache: %d hits, %d misses", token_cache.hits, token_cache.misses
+        )
+
+    def _get_bucket_features(
+        self, sys_info: SysOutputInfo, statistics=None
+    ) -> Dict[str, bool]:
+        """
+        Get the bucketing features that can be calculated
+        :return: a dictionary mapping feature names to whether they require training set statistics
+        """
+        bucket_features = {}
         for bucket_feature in sys_info.features.get_bucket_features():
             if bucket_feature in sys_info.features.keys() and (
                 statistics is not None
                 or not sys_info.features[bucket_feature].require_training_set
             ):
-                bucket_feature_funcs[bucket_feature] = (
-                    self._get_feature_func(bucket_feature),
-                    sys_info.features[bucket_feature].require_training_set,
+                bucket_features[bucket_feature] = sys_info.features[
+                    bucket_feature
+                ].require_training_set
+        return bucket_features
+
+    def _get_feature_values(
+        self,
+        bucket_features: Dict[str, bool],
+        sys_output: SysOutputTable,
+        statistics=None,
+        show_progress: bool = True,
+    ) -> Dict[str, Sequence]:
+        """
+        Calculate the values of bucketing features, using batch feature functions where available and otherwise
+        going sample by sample
+        :param bucket_features: a dictionary mapping feature names to whether they require training set statistics
+        :param sys_output: The system output itself
+        :param statistics: Training set statistics that are used to calculate training set specific features
+        :param show_progress: Whether or not to show a progress bar
+        :return: a dictionary mapping feature names to lists or arrays of values, one per sample
+        """
+        feature_values = {}
+        bucket_feature_funcs = {}
+        for bucket_key, training_dependent in bucket_features.items():
+            batch_func = self._get_batch_feature_func(bucket_key)
+            if batch_func is not None:
+                feature_values[bucket_key] = batch_func(sys_output, statistics)
+            else:
+                bucket_feature_funcs[bucket_key] = (
+                    self._get_feature_func(bucket_key),
+                    training_dependent,
                 )
-        for _id, dict_sysout in tqdm(enumerate(sys_output), desc="featurizing"):
+                feature_values[bucket_key] = []
+        if not bucket_feature_funcs:
+            return feature_values
+
+        for dict_sysout in tqdm(
+            sys_output, desc="featurizing", disable=not show_progress
+        ):
             # Get values of bucketing features
             for (
                 bucket_key,
@@ -153,17 +331,75 @@ class Processor:
                     training_dependent,
                 ),
             ) in bucket_feature_funcs.items():
-                dict_sysout[bucket_key] = (
+                feature_values[bucket_key].append(
                     bucket_func(dict_sysout, statistics)
                     if training_dependent
                     else bucket_func(dict_sysout)
                 )
-        return list(bucket_feature_funcs.keys())
+        return feature_values
+
+    def _get_feature_values_parallel(
+        self,
+        bucket_features: Dict[str, bool],
+        sys_output: SysOutputTable,
+        statistics,
+        num_workers: int,
+    ) -> Dict[str, Sequence]:
+        """
+        Same as `_get_feature_values()`, but splits `sys_output` into chunks that are featurized in a process pool
+        and merged back in order, so the result is identical to the serial one. Falls back to serial mode when the
+        processor or statistics cannot be sent to worker processes.
+        :param num_workers: the number of worker processes
+        :return: a dictionary mapping feature names to lists or arrays of values, one per sample
+        """
+        n_chunks = min(len(sys_output), num_workers * _CHUNKS_PER_WORKER)
+        if n_chunks <= 1:
+            return self._get_feature_values(bucket_features, sys_output, statistics)
+        try:
+            pickle.dumps(self)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            eprint(
+                f"processor can not be sent to worker processes ({e}), featurizing serially"
+            )
+            return self._get_feature_values(bucket_features, sys_output, statistics)
+
+        boundaries = np.linspace(0, len(sys_output), n_chunks + 1).astype(int)
+        chunks = [
+            sys_output.take(slice(start, end))
+            for start, end in zip(boundaries[:-1], boundaries[1:])
+        ]
+        try:
+            with ProcessPoolExecutor(
+                max_workers=num_workers,
+                initializer=_init_featurize_worker,
+                initargs=(self, bucket_features, statistics),
+            ) as executor:
+                chunk_values = list(
+                    tqdm(
+                        executor.map(_featurize_chunk, chunks),
+                        total=len(chunks),
+                        desc="featurizing",
+                    )
+                )
+        except BrokenProcessPool as e:
+            eprint(f"worker processes failed ({e}), featurizing serially")
+            return self._get_feature_values(bucket_features, sys_output, statistics)
+
+        # the token caches of the chunks, which were used in the worker processes
+        for _, hits, misses in chunk_values:
+            sys_output.token_cache.hits += hits
+            sys_output.token_cache.misses += misses
+        return {
+            bucket_key: [
+                value for values, _, _ in chunk_values for value in values[bucket_key]
+            ]
+            for bucket_key in bucket_features
+        }
 
     def _bucketing_samples(
         self,
         sys_info: SysOutputInfo,
-        sys_output: List[dict],
+        sys_output: SysOutputTable,
         active_features: List[str],
     ) -> Tuple[dict, dict]:
         """
@@ -175,40 +411,79 @@ class Processor:
             performances_over_bucket: a dictionary of feature name -> list of performances by bucket
         """
 
-        # Bucketing
-        samples_over_bucket = {}
-        performances_over_bucket = {}
-        for feature_name in tqdm(active_features, desc="bucketing"):
-            # print(f"Feature Name: {feature_name}\n"
-            #       f"Bucket Hyper:\n function_name: {sys_info.features[feature_name].bucket_info.method} \n"
-            #       f"bucket_number: {sys_info.features[feature_name].bucket_info.number}\n"
-            #       f"bucket_setting: {sys_info.features[feature_name].bucket_info.setting}\n")
-
+        def bucket_feature(feature_name: str):
             # Preparation for bucketing
             bucket_func = getattr(
                 explainaboard.utils.bucketing,
                 sys_info.features[feature_name].bucket_info.method,
             )
-            # TODO(gneubig): make dict_obj more elegant so it doesn't have to copy memory
-            samples_over_bucket[feature_name] = bucket_func(
-                dict_obj={
-                    x: sys_output[x][feature_name] for x in range(len(sys_output))
-                },
+            samples = bucket_func(
+                dict_obj=sys_output.column(feature_name),
                 bucket_number=sys_info.features[feature_name].bucket_info.number,
                 bucket_setting=sys_info.features[feature_name].bucket_info.setting,
             )
 
             # evaluating bucket: get bucket performance
-            performances_over_bucket[feature_name] = self.get_bucket_performance(
-                sys_info, sys_output, samples_over_bucket[feature_name]
-            )
+            return samples, self.get_bucket_performance(sys_info, sys_output, samples)
+
+        # Bucketing
+        samples_over_bucket = {}
+        performances_over_bucket = {}
+        for feature_name, (samples, performances) in self._map_features(
+            sys_info, bucket_feature, active_features
+        ).items():
+            samples_over_bucket[feature_name] = samples
+            performances_over_bucket[feature_name] = performances
 
         return samples_over_bucket, performances_over_bucket
 
+    def _map_features(
+        self,
+        sys_info: SysOutputInfo,
+        func: Callable[[str], Any],
+        feature_names: List[str],
+        desc: str = "bucketing",
+    ) -> Dict[str, Any]:
+        """
+        Apply `func` to every feature, in a pool of `sys_info.num_bucketing_threads` threads if there are several.
+        Features are independent and only read the system output, so they share it without copies. Each feature
+        bootstraps confidence intervals from its own seed, drawn in feature order, so that results are the same
+        whatever the number of threads.
+        :param sys_info: Information about the system output
+        :param func: a function of a feature name, e.g. bucketing the samples and evaluating the buckets
+        :param feature_names: the names of the features
+        :param desc: the description of the progress bar
+        :return: a dictionary mapping each feature name to the result of `func`, in the order of `feature_names`
+        """
+        seeds = [random.getrandbits(64) for _ in feature_names]
+
+        def run(feature_name: str, seed: int):
+            with explainaboard.metric.bootstrap_seed(seed):
+                return func(feature_name)
+
+        num_threads = min(sys_info.num_bucketing_threads, len(feature_names))
+        if num_threads > 1:
+            with ThreadPoolExecutor(max_workers=num_threads) as executor:
+                results = list(
+                    tqdm(
+                        executor.map(run, feature_names, seeds),
+                        total=len(feature_names),
+                        desc=desc,
+                    )
+                )
+        else:
+            results = [
+                run(feature_name, seed)
+                for feature_name, seed in tqdm(
+                    zip(feature_names, seeds), total=len(feature_names), desc=desc
+                )
+            ]
+        return dict(zip(feature_names, results))
+
     def get_bucket_performance(
         self,
         sys_info: SysOutputInfo,
-        sys_output: List[dict],
+        sys_output: SysOutputTable,
         samples_over_bucket: Dict[str, List[int]],
     ) -> Dict[str, List[BucketPerformance]]:
         """
@@ -219,38 +494,26 @@ class Processor:
         :return: bucket_name_to_performance: a dictionary that maps bucket names to bucket performance
         """
 
+        all_metric_stats = self._get_cached_metric_stats(sys_info, sys_output)
         bucket_name_to_performance = {}
         for bucket_interval, sample_ids in samples_over_bucket.items():
 
-            bucket_true_labels = []
-            bucket_predicted_labels = []
             bucket_cases = []
-
-            for sample_id in sample_ids:
-
-                data_point = sys_output[sample_id]
-                true_label = self._get_true_label(data_point)
-                predicted_label = self._get_predicted_label(data_point)
-                s_id = data_point["id"]
-
-                # get a bucket of true/predicted labels
-                bucket_true_labels.append(true_label)
-                bucket_predicted_labels.append(predicted_label)
-                # get a bucket of cases (e.g., errors)
-                if sys_info.is_print_case:
-                    if true_label != predicted_label:
-                        bucket_case = str(s_id)
-                        bucket_cases.append(bucket_case)
+            # get a bucket of cases (e.g., errors)
+            if sys_info.is_print_case:
+                for sample_id in sample_ids:
+                    data_point = sys_output[sample_id]
+                    if self._get_true_label(data_point) != self._get_predicted_label(
+                        data_point
+                    ):
+                        bucket_cases.append(str(data_point["id"]))
 
             bucket_name_to_performance[bucket_interval] = []
             for metric_name in sys_info.metric_names:
-                metric_func = getattr(explainaboard.metric, metric_name)
-                one_metric = metric_func(
-                    true_labels=bucket_true_labels,
-                    predicted_labels=bucket_predicted_labels,
-                    is_print_confidence_interval=sys_info.is_print_confidence_interval,
+                one_metric, metric_stats = all_metric_stats[metric_name]
+                metric_result = one_metric.evaluate_from_stats(
+                    metric_stats[np.asarray(sample_ids, dtype=int)]
                 )
-                metric_result = one_metric.evaluate()
 
                 bucket_performance = BucketPerformance(
                     bucket_name=bucket_interval,
@@ -258,7 +521,7 @@ class Processor:
                     value=metric_result["value"],
                     confidence_score_low=metric_result["confidence_score_low"],
                     confidence_score_high=metric_result["confidence_score_high"],
-                    n_samples=len(bucket_true_labels),
+                    n_samples=len(sample_ids),
                     bucket_samples=bucket_cases,
                 )
 
@@ -266,10 +529,78 @@ class Processor:
 
         return sort_dict(bucket_name_to_performance)
 
+    def _get_metric_stats(
+        self, sys_info: SysOutputInfo, sys_output: SysOutputTable
+    ) -> Optional[dict]:
+        """
+        Reduce each sample once to additive sufficient statistics (e.g. correct counts or reciprocal ranks) for
+        every metric, so that overall and bucket-level performance are sums over sets of sample IDs rather than
+        repeated scans over the true and predicted labels.
+        :param sys_info: Information about the system output
+        :param sys_output: The system output itself
+        :return: a dictionary mapping metric names to the metric and its (n_samples, n_stats) statistics
+        """
+        true_labels, predicted_labels = [], []
+        for data_point in sys_output:
+            true_labels.append(self._get_true_label(data_point))
+            predicted_labels.append(self._get_predicted_label(data_point))
+
+        metric_stats = {}
+        for metric_name in sys_info.metric_names:
+            one_metric = self._get_metric(
+                sys_info, sys_output, metric_name, true_labels, predicted_labels
+            )
+            metric_stats[metric_name] = (one_metric, one_metric.get_sample_stats())
+        return metric_stats
+
+    def _get_metric(
+        self,
+        sys_info: SysOutputInfo,
+        sys_output: SysOutputTable,
+        metric_name: str,
+        true_labels: list,
+        predicted_labels: list,
+    ) -> explainaboard.metric.Metric:
+        """
+        Create a metric of the labels of a system output. Processors override this to pass information that several
+        metrics share (e.g. the true label ranks of ranking metrics) to the metric.
+        :param metric_name: the name of a class in `explainaboard.metric`
+        :return: the metric
+        """
+        metric_func = getattr(explainaboard.metric, metric_name)
+        return metric_func(
+            true_labels=true_labels,
+            predicted_labels=predicted_labels,
+            is_print_confidence_interval=sys_info.is_print_confidence_interval,
+        )
+
+    def _get_cached_metric_stats(
+        self, sys_info: SysOutputInfo, sys_output: SysOutputTable
+    ) -> Optional[dict]:
+        """
+        Get the `_get_metric_stats()` of a system output, which `process()` calculates once for the overall and all
+        bucket-level performances. They are calculated here when `get_overall_performance()` or
+        `get_bucket_performance()` are called directly.
+        :param sys_info: Information about the system output
+        :param sys_output: The system output itself
+        :return: a dictionary mapping metric names to the metric and its (n_samples, n_stats) statistics
+        """
+        if (
+            self._metric_stats is None
+            or self._metric_stats[0] is not sys_output
+            or self._metric_stats[1] is None
+            or any(name not in self._metric_stats[1] for name in sys_info.metric_names)
+        ):
+            self._metric_stats = (
+                sys_output,
+                self._get_metric_stats(sys_info, sys_output),
+            )
+        return self._metric_stats[1]
+
     def get_overall_performance(
         self,
         sys_info: SysOutputInfo,
-        sys_output: List[dict],
+        sys_output: SysOutputTable,
     ) -> Dict[str, Performance]:
         """
         Get the overall performance according to metrics
@@ -277,22 +608,11 @@ class Processor:
         :param sys_output: The system output itself
         :return: a dictionary of metrics to overall performance numbers
         """
-        predicted_labels, true_labels = [], []
-
-        for _id, feature_table in enumerate(sys_output):
-
-            predicted_labels.append(self._get_predicted_label(feature_table))
-            true_labels.append(self._get_true_label(feature_table))
-
+        all_metric_stats = self._get_cached_metric_stats(sys_info, sys_output)
         overall_results = {}
         for metric_name in sys_info.metric_names:
-            metric_func = getattr(explainaboard.metric, metric_name)
-            one_metric = metric_func(
-                true_labels=true_labels,
-                predicted_labels=predicted_labels,
-                is_print_confidence_interval=sys_info.is_print_confidence_interval,
-            )
-            metric_result = one_metric.evaluate()
+            one_metric, metric_stats = all_metric_stats[metric_name]
+            metric_result = one_metric.evaluate_from_stats(metric_stats)
 
             overall_performance = Performance(
                 metric_name=metric_name,
@@ -313,7 +633,7 @@ class Processor:
         for feature_name, feature_value in performances_over_bucket.items():
             print_dict(feature_value, feature_name)
 
-    def process(self, metadata: dict, sys_output: List[dict]) -> SysOutputInfo:
+    def _get_sys_info(self, metadata: Optional[dict]) -> SysOutputInfo:
         if metadata is None:
             metadata = {}
         if "task_name" not in metadata.keys():
@@ -322,16 +642,178 @@ class Processor:
             metadata["metric_names"] = self._default_metrics
         sys_info = SysOutputInfo.from_dict(metadata)
         sys_info.features = self._features
+        return sys_info
+
+    def process(
+        self, metadata: dict, sys_output: Union[List[dict], SysOutputTable]
+    ) -> SysOutputInfo:
+        sys_info = self._get_sys_info(metadata)
+        if not isinstance(sys_output, SysOutputTable):
+            sys_output = SysOutputTable.from_list(sys_output)
         statistics = self._init_statistics(sys_info, self._statistics_func)
         active_features = self._complete_features(
             sys_info, sys_output, statistics=statistics
         )
-        samples_over_bucket, performance_over_bucket = self._bucketing_samples(
-            sys_info, sys_output, active_features
+        self._metric_stats = (sys_output, self._get_metric_stats(sys_info, sys_output))
+        try:
+            samples_over_bucket, performance_over_bucket = self._bucketing_samples(
+                sys_info, sys_output, active_features
+            )
+            overall_results = self.get_overall_performance(sys_info, sys_output)
+        finally:
+            # do not keep the system output alive after it is analyzed
+            self._metric_stats = None
+        self._print_bucket_info(performance_over_bucket)
+        sys_info.results = Result(
+            overall=overall_results, fine_grained=performance_over_bucket
         )
-        overall_results = self.get_overall_performance(sys_info, sys_output)
+        return sys_info
+
+    def supports_streaming(self) -> bool:
+        """
+        Streaming needs the generic featurization and metrics, i.e. metrics that are sums of per-sample statistics
+        """
+        processor_class = type(self)
+        return all(
+            getattr(processor_class, name) is getattr(Processor, name)
+            for name in [
+                "_complete_features",
+                "_get_metric_stats",
+                "get_overall_performance",
+                "_bucketing_samples",
+            ]
+        )
+
+    def _get_stream_metric_stats(
+        self, sys_info: SysOutputInfo, sys_output: SysOutputTable
+    ) -> dict:
+        """
+        Get the additive statistics of every metric for a chunk of samples in `process_stream()`. Processors that
+        support streaming with their own metrics override this.
+        :param sys_info: Information about the system output
+        :param sys_output: The chunk of the system output, after `_complete_features()`
+        :return: a dictionary mapping metric names to the metric and its (n_samples, n_stats) statistics
+        """
+        return self._get_metric_stats(sys_info, sys_output)
+
+    def process_stream(
+        self, metadata: dict, sys_output: Iterable[dict], chunk_size: int = 10000
+    ) -> SysOutputInfo:
+        """
+        Same as `process()`, but reads `sys_output` (e.g. `Loader.iter_load()`) in chunks of `chunk_size` samples,
+        featurizes each chunk and folds it into a `ValueHistogram` per feature, so that memory does not grow with the
+        number of samples. This only holds if `sys_output` is read lazily: `Loader.iter_load()` does so for the
+        loaders that override it, other loaders read the whole system output first. Confidence intervals and bucket
+        cases need every sample, so they are not reported, and `num_bucketing_threads` is not used.
+        :param metadata: the same metadata as `process()`
+        :param sys_output: an iterable of samples
+        :param chunk_size: the number of samples held in memory at a time
+        :return: information about the system output, including the results
+        """
+        if not self.supports_streaming():
+            raise NotImplementedError(
+                f"{type(self).__name__} does not support streaming, please use process()"
+            )
+        sys_info = self._get_sys_info(metadata)
+        sys_info.is_print_case = False
+        sys_info.is_print_confidence_interval = False
+        statistics = self._init_statistics(sys_info, self._statistics_func)
+        bucket_features = self._get_bucket_features(sys_info, statistics)
+        histograms = {
+            feature_name: ValueHistogram(sys_info.features[feature_name].bucket_info)
+            for feature_name in bucket_features
+        }
+        metrics = {}
+        overall_stats = {}
+
+        for chunk in tqdm(_iter_chunks(sys_output, chunk_size), desc="streaming"):
+            table = SysOutputTable.from_list(chunk)
+            self._complete_features(sys_info, table, statistics=statistics)
+            chunk_stats = {}
+            for metric_name, (one_metric, stats) in self._get_stream_metric_stats(
+                sys_info, table
+            ).items():
+                metrics[metric_name] = one_metric
+                chunk_stats[metric_name] = stats
+                stats_sum = np.append(stats.sum(axis=0), len(stats))
+                overall_stats[metric_name] = (
+                    overall_stats[metric_name] + stats_sum
+                    if metric_name in overall_stats
+                    else stats_sum
+                )
+            for feature_name, histogram in histograms.items():
+                histogram.add(table.column(feature_name), chunk_stats)
+
+        overall_results = {}
+        for metric_name in sys_info.metric_names:
+            if metric_name not in metrics:
+                continue
+            overall_results[metric_name] = Performance(
+                metric_name=metric_name,
+                value=metrics[metric_name].evaluate_from_stats_sum(
+                    overall_stats[metric_name]
+                ),
+            )
+
+        performance_over_bucket = {}
+        for feature_name, histogram in histograms.items():
+            keys, bucket_counts, bucket_stats = histogram.get_buckets()
+            bucket_name_to_performance = {}
+            for i, bucket_interval in enumerate(keys):
+                bucket_name_to_performance[bucket_interval] = [
+                    BucketPerformance(
+                        bucket_name=bucket_interval,
+                        metric_name=metric_name,
+                        value=metrics[metric_name].evaluate_from_stats_sum(
+                            bucket_stats[metric_name][i]
+                        ),
+                        n_samples=int(bucket_counts[i]),
+                        bucket_samples=[],
+                    )
+                    for metric_name in sys_info.metric_names
+                    if metric_name in metrics
+                ]
+            performance_over_bucket[feature_name] = sort_dict(
+                bucket_name_to_performance
+            )
+
         self._print_bucket_info(performance_over_bucket)
         sys_info.results = Result(
             overall=overall_results, fine_grained=performance_over_bucket
         )
         return sys_info
+
+
+# split the system output into this many chunks per worker so that slow chunks are balanced across workers
+_CHUNKS_PER_WORKER = 4
+# state of a featurization worker process, set once by `_init_featurize_worker()`
+_worker_state = {}
+
+
+def _init_featurize_worker(processor: Processor, bucket_features, statistics):
+    _worker_state["processor"] = processor
+    _worker_state["bucket_features"] = bucket_features
+    _worker_state["statistics"] = statistics
+
+
+def _featurize_chunk(
+    sys_output: SysOutputTable,
+) -> Tuple[Dict[str, Sequence], int, int]:
+    feature_values = _worker_state["processor"]._get_feature_values(
+        _worker_state["bucket_features"],
+        sys_output,
+        _worker_state["statistics"],
+        show_progress=False,
+    )
+    return feature_values, sys_output.token_cache.hits, sys_output.token_cache.misses
+
+
+def _iter_chunks(samples: Iterable[dict], chunk_size: int) -> Iterator[List[dict]]:
+    chunk = []
+    for sample in samples:
+        chunk.append(sample)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
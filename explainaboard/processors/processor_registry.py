@@ -1,15 +1,34 @@
+import importlib
+
 from explainaboard.tasks import TaskType
 from explainaboard.processors.processor import Processor
 
 
 _processor_registry: dict = {}
 
+# the module defining the processor of each task, which is imported on the first `get_processor()` of the task so
+# that a task's dependencies are only imported if it is used
+_processor_modules = {
+    TaskType.text_classification: "explainaboard.processors.text_classification",
+    TaskType.named_entity_recognition: "explainaboard.processors.named_entity_recognition",
+    TaskType.question_answering_extractive: "explainaboard.processors.extractive_qa",
+    TaskType.summarization: "explainaboard.processors.conditional_generation",
+    TaskType.machine_translation: "explainaboard.processors.conditional_generation",
+    TaskType.text_pair_classification: "explainaboard.processors.text_pair_classification",
+    TaskType.hellaswag: "explainaboard.processors.hellaswag",
+    TaskType.aspect_based_sentiment_classification: "explainaboard.processors.aspect_based_sentiment_classification",
+    TaskType.kg_link_tail_prediction: "explainaboard.processors.kg_link_tail_prediction",
+    TaskType.qa_multiple_choice: "explainaboard.processors.qa_multiple_choice",
+}
+
 
 def get_processor(task: TaskType) -> Processor:
     """
     return a processor based on the task type
     TODO: error handling
     """
+    if task not in _processor_registry and task in _processor_modules:
+        importlib.import_module(_processor_modules[task])
     return _processor_registry[task]()
 
 
@@ -17,6 +36,7 @@ def register_processor(task_type: TaskType):
     """
     a register for task specific processors.
     example usage: `@register_processor(TaskType.text_classification)`
+    when a new processor is implemented, remember to add its module to `_processor_modules` so it gets registered
     """
 
     def register_processor_fn(cls):
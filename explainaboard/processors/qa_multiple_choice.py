@@ -1,18 +1,16 @@
 from typing import Callable, Any
 from typing import Iterator
 
-from datalabs import load_dataset
-from datalabs.operations.aggregate.qa_multiple_choice import (
-    qa_multiple_choice_aggregating,
-)
 
 import explainaboard.utils.feature_funcs
 from explainaboard import feature
 from explainaboard.info import SysOutputInfo
 from explainaboard.processors.processor import Processor
 from explainaboard.processors.processor_registry import register_processor
+from explainaboard.sys_output_table import SysOutputTable
 from explainaboard.tasks import TaskType
 from explainaboard.utils.py_utils import eprint
+from explainaboard.utils.lazy_aggregating import get_operation, lazy_aggregating
 
 
 @register_processor(TaskType.qa_multiple_choice)
@@ -100,12 +98,21 @@ class QAMultipleChoiceProcessor(Processor):
         # Calculate statistics of training set
         statistics = None
         if sys_info.dataset_name is not None:
+            cache_key, statistics = self._read_cached_statistics(
+                sys_info, statistics_func
+            )
+            if statistics is not None:
+                return statistics
             try:
+                from datalabs import load_dataset
+
                 dataset = load_dataset(sys_info.dataset_name, sys_info.sub_dataset_name)
                 if (
                     len(dataset['train']._stat) == 0 or not sys_info.reload_stat
                 ):  # calculate the statistics (_stat) when _stat is {} or `reload_stat` is False
-                    new_train = dataset['train'].apply(statistics_func, mode="local")
+                    new_train = dataset['train'].apply(
+                        get_operation(statistics_func), mode="local"
+                    )
                     statistics = new_train._stat
                 else:
                     statistics = dataset["train"]._stat
@@ -114,28 +121,35 @@ class QAMultipleChoiceProcessor(Processor):
                     "The dataset hasn't been supported by DataLab so no training set dependent features will be supported by ExplainaBoard."  # noqa
                     "You can add the dataset by: https://github.com/ExpressAI/DataLab/blob/main/docs/SDK/add_new_datasets_into_sdk.md"  # noqa
                 )
+            self._write_cached_statistics(cache_key, statistics)
         return statistics
 
     # --- Feature functions accessible by ExplainaboardBuilder._get_feature_func()
-    def _get_context_length(self, existing_features: dict):
-        return len(existing_features["context"].split(" "))
+    def _get_context_length_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_tokens(
+            samples.tokens("context")
+        )
 
-    def _get_question_length(self, existing_features: dict):
-        return len(existing_features["question"].split(" "))
+    def _get_question_length_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_tokens(
+            samples.tokens("question")
+        )
 
-    def _get_answer_length(self, existing_features: dict):
-        return len(existing_features["answers"]["text"].split(" "))
+    def _get_answer_length_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_tokens(
+            [answers["text"] for answers in samples.column("answers")]
+        )
 
     # training set dependent features
-    def _get_num_oov(self, existing_features: dict, statistics: Any):
-        return explainaboard.utils.feature_funcs.feat_num_oov(
-            existing_features, statistics, lambda x: x['context']
+    def _get_num_oov_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_oov(
+            samples.tokens("context"), statistics
         )
 
     # training set dependent features (this could be merged into the above one for further optimization)
-    def _get_fre_rank(self, existing_features: dict, statistics: Any):
-        return explainaboard.utils.feature_funcs.feat_freq_rank(
-            existing_features, statistics, lambda x: x['context']
+    def _get_fre_rank_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_freq_rank(
+            samples.tokens("context"), statistics
         )
 
     # --- End feature functions
@@ -157,7 +171,8 @@ class QAMultipleChoiceProcessor(Processor):
         return data_point["predicted_answers"]["option_index"]
 
 
-@qa_multiple_choice_aggregating(
+@lazy_aggregating(
+    "datalabs.operations.aggregate.qa_multiple_choice.qa_multiple_choice_aggregating",
     name="get_statistics",
     contributor="datalab",
     task="qa-multiple-choice",
@@ -1,17 +1,14 @@
 from typing import Iterator, Any
 
-from datalabs.operations.aggregate.text_classification import (
-    text_classification_aggregating,
-)
-from tqdm import tqdm
-
 import explainaboard.utils.feature_funcs
 from explainaboard import feature
 from explainaboard.processors.processor import Processor
 from explainaboard.processors.processor_registry import register_processor
+from explainaboard.sys_output_table import SysOutputTable
 from explainaboard.tasks import TaskType
 from explainaboard.utils.feature_funcs import get_basic_words, get_lexical_richness
-from explainaboard.utils.spacy_loader import get_named_entities
+from explainaboard.utils.lazy_aggregating import lazy_aggregating
+from explainaboard.utils.statistics_builder import build_statistics
 
 
 @register_processor(TaskType.text_classification)
@@ -122,14 +119,19 @@ class TextClassificationProcessor(Processor):
         self._statistics_func = get_statistics
 
     # --- Feature functions accessible by ExplainaboardBuilder._get_feature_func()
-    def _get_sentence_length(self, existing_features: dict):
-        return len(existing_features["text"].split(" "))
+    def _get_sentence_length_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_tokens(
+            samples.tokens("text")
+        )
 
-    def _get_token_number(self, existing_feature: dict):
-        return len(existing_feature["text"])
+    def _get_token_number_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_chars(samples.column("text"))
 
-    def _get_entity_number(self, existing_feature: dict):
-        return len(get_named_entities(existing_feature["text"]))
+    def _get_entity_number_batch(self, samples: SysOutputTable, statistics: Any):
+        return [
+            len(entities)
+            for entities in self._get_named_entities_batch(samples.column("text"))
+        ]
 
     def _get_label(self, existing_feature: dict):
         return existing_feature["true_label"]
@@ -141,31 +143,27 @@ class TextClassificationProcessor(Processor):
         return get_lexical_richness(existing_feature["text"])
 
     # training set dependent features
-    def _get_num_oov(self, existing_features: dict, statistics: Any):
-        return explainaboard.utils.feature_funcs.feat_num_oov(
-            existing_features, statistics, lambda x: x['text']
+    def _get_num_oov_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_oov(
+            samples.tokens("text"), statistics
         )
 
     # training set dependent features (this could be merged into the above one for further optimization)
-    def _get_fre_rank(self, existing_features: dict, statistics: Any):
-        return explainaboard.utils.feature_funcs.feat_freq_rank(
-            existing_features, statistics, lambda x: x['text']
+    def _get_fre_rank_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_freq_rank(
+            samples.tokens("text"), statistics
         )
 
     # training set dependent features
-    def _get_length_fre(self, existing_features: dict, statistics: Any):
-        length_fre = 0
-        length = len(existing_features["text"].split(" "))
-
-        if length in statistics['length_fre'].keys():
-            length_fre = statistics['length_fre'][length]
-
-        return length_fre
+    def _get_length_fre_batch(self, samples: SysOutputTable, statistics: Any):
+        lengths = samples.tokens("text").lengths().tolist()
+        return [statistics['length_fre'].get(length, 0) for length in lengths]
 
     # --- End feature functions
 
 
-@text_classification_aggregating(
+@lazy_aggregating(
+    "datalabs.operations.aggregate.text_classification.text_classification_aggregating",
     name="get_statistics",
     contributor="datalab",
     task="text-classification",
@@ -180,35 +178,6 @@ def get_statistics(samples: Iterator):
     }]
     """
 
-    vocab = {}
-    length_fre = {}
-    total_samps = 0
-    for sample in tqdm(samples):
-        text = sample["text"]
-        length = len(text.split(" "))
-
-        if length in length_fre.keys():
-            length_fre[length] += 1
-        else:
-            length_fre[length] = 1
-
-        # update vocabulary
-        for w in text.split(" "):
-            if w in vocab.keys():
-                vocab[w] += 1
-            else:
-                vocab[w] = 1
-
-        total_samps += 1
-
-    # the rank of each word based on its frequency
-    sorted_dict = {
-        key: rank
-        for rank, key in enumerate(sorted(set(vocab.values()), reverse=True), 1)
-    }
-    vocab_rank = {k: sorted_dict[v] for k, v in vocab.items()}
-
-    for k, v in length_fre.items():
-        length_fre[k] = v * 1.0 / total_samps
-
-    return {"vocab": vocab, "vocab_rank": vocab_rank, "length_fre": length_fre}
+    return build_statistics(
+        (sample["text"] for sample in samples), count_lengths=True
+    ).statistics()
@@ -1,15 +1,15 @@
 from typing import Callable, Iterator, Any
 
-from datalabs import load_dataset
-from datalabs.operations.aggregate.text_matching import text_matching_aggregating
 
 import explainaboard.utils.feature_funcs
 from explainaboard import feature
 from explainaboard.info import SysOutputInfo
 from explainaboard.processors.processor import Processor
 from explainaboard.processors.processor_registry import register_processor
+from explainaboard.sys_output_table import SysOutputTable
 from explainaboard.tasks import TaskType
 from explainaboard.utils.py_utils import eprint
+from explainaboard.utils.lazy_aggregating import get_operation, lazy_aggregating
 
 
 @register_processor(TaskType.text_pair_classification)
@@ -109,12 +109,21 @@ class TextPairClassificationProcessor(Processor):
         # Calculate statistics of training set
         self.statistics = None
         if sys_info.dataset_name is not None:
+            cache_key, self.statistics = self._read_cached_statistics(
+                sys_info, statistics_func
+            )
+            if self.statistics is not None:
+                return
             try:
+                from datalabs import load_dataset
+
                 dataset = load_dataset(sys_info.dataset_name, sys_info.sub_dataset_name)
                 if (
                     len(dataset['train']._stat) == 0 or not sys_info.reload_stat
                 ):  # calculate the statistics (_stat) when _stat is {} or `reload_stat` is False
-                    new_train = dataset['train'].apply(statistics_func, mode="local")
+                    new_train = dataset['train'].apply(
+                        get_operation(statistics_func), mode="local"
+                    )
                     self.statistics = new_train._stat
                 else:
                     self.statistics = dataset["train"]._stat
@@ -123,6 +132,7 @@ class TextPairClassificationProcessor(Processor):
                     "The dataset hasn't been supported by DataLab so no training set dependent features will be supported by ExplainaBoard."  # noqa
                     "You can add the dataset by: https://github.com/ExpressAI/DataLab/blob/main/docs/SDK/add_new_datasets_into_sdk.md"  # noqa
                 )
+            self._write_cached_statistics(cache_key, self.statistics)
 
     # --- Feature functions accessible by ExplainaboardBuilder._get_feature_func()
     def _get_similarity(self, existing_features: dict):
@@ -130,35 +140,47 @@ class TextPairClassificationProcessor(Processor):
             existing_features["text1"], existing_features["text2"]
         )
 
-    def _get_text1_length(self, existing_features: dict):
-        return len(existing_features["text1"].split(" "))
+    def _get_text1_length_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_tokens(
+            samples.tokens("text1")
+        )
 
-    def _get_text2_length(self, existing_feature: dict):
-        return len(existing_feature["text2"])
+    def _get_text2_length_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_chars(
+            samples.column("text2")
+        )
 
-    def _get_text1_divided_text2(self, existing_feature: dict):
-        return len(existing_feature["text1"]) * 1.0 / len(existing_feature["text2"])
+    def _get_text1_divided_text2_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_chars(
+            samples.column("text1")
+        ) / explainaboard.utils.feature_funcs.batch_num_chars(samples.column("text2"))
 
     def _get_label(self, existing_feature: dict):
         # print(f"print_existing_feature: \t {existing_feature}")
         return existing_feature["true_label"]
 
+    def _get_text_pair_tokens(self, samples: SysOutputTable):
+        return samples.token_cache.get(
+            "text1+text2", lambda: samples.column("text1") + samples.column("text2")
+        )
+
     # training set dependent features
-    def _get_num_oov(self, existing_features: dict, statistics: Any):
-        return explainaboard.utils.feature_funcs.feat_num_oov(
-            existing_features, statistics, lambda x: x['text1'] + x['text2']
+    def _get_num_oov_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_num_oov(
+            self._get_text_pair_tokens(samples), statistics
         )
 
     # training set dependent features (this could be merged into the above one for further optimization)
-    def _get_fre_rank(self, existing_features: dict, statistics: Any):
-        return explainaboard.utils.feature_funcs.feat_freq_rank(
-            existing_features, statistics, lambda x: x['text1'] + x['text2']
+    def _get_fre_rank_batch(self, samples: SysOutputTable, statistics: Any):
+        return explainaboard.utils.feature_funcs.batch_freq_rank(
+            self._get_text_pair_tokens(samples), statistics
         )
 
     # --- End feature functions
 
 
-@text_matching_aggregating(
+@lazy_aggregating(
+    "datalabs.operations.aggregate.text_matching.text_matching_aggregating",
     name="get_statistics",
     contributor="datalab",
     task="text-matching, natural-language-inference",
@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from numbers import Number
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
+from explainaboard.utils.token_cache import TokenCache, TokenizedTexts
+
+# placeholder for cells of a column that were never assigned for a given row
+_MISSING = object()
+
+
+class DictColumn:
+    """
+    A string column stored as integer codes into a dictionary of distinct values, which is how low-cardinality
+    columns such as labels are kept in a `SysOutputTable`.
+    """
+
+    def __init__(self, codes: np.ndarray, values: List[Any]):
+        self.codes = codes
+        self.values = values
+        self._value_to_code = {v: i for i, v in enumerate(values)}
+
+    @classmethod
+    def encode(cls, values: Iterable[Any]) -> "DictColumn":
+        value_to_code: Dict[Any, int] = {}
+        codes = [value_to_code.setdefault(v, len(value_to_code)) for v in values]
+        return cls(np.array(codes, dtype=np.int32), list(value_to_code))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def get(self, index: int) -> Any:
+        return self.values[self.codes[index]]
+
+    def set(self, index: int, value: Any):
+        code = self._value_to_code.get(value)
+        if code is None:
+            code = len(self.values)
+            self._value_to_code[value] = code
+            self.values.append(value)
+        self.codes[index] = code
+
+    def take(self, indices: Union[slice, np.ndarray]) -> "DictColumn":
+        return DictColumn(self.codes[indices].copy(), list(self.values))
+
+    def decode(self) -> np.ndarray:
+        values = np.empty(len(self.values), dtype=object)
+        values[:] = self.values
+        return values[self.codes]
+
+
+class RowView(Mapping):
+    """
+    A dict-like view of one row of a `SysOutputTable`. Reads and writes go directly to the underlying columns,
+    so feature functions written against `dict` samples (e.g. `_get_entity_number(existing_feature)`) keep
+    working unchanged.
+    """
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: "SysOutputTable", index: int):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._table._get_cell(key, self._index)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        self._table._set_cell(key, self._index, value)
+
+    def __contains__(self, key: object) -> bool:
+        return (
+            key in self._table._columns
+            and self._table._get_cell(key, self._index) is not _MISSING
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key in self._table._columns if key in self)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class SysOutputTable:
+    """
+    Column-oriented, in-memory storage of system outputs. Numeric columns (most bucketing features) are NumPy
+    float/int arrays, low-cardinality string columns (e.g. labels) are integer-coded `DictColumn`s, and
+    everything else (free text, nested answers, token lists) is an object array.
+
+    Indexing with an integer returns a `RowView`, so code written for `List[dict]` system outputs can still
+    use `sys_output[i][key]` and `for x in sys_output`, while bucketing and metrics read whole columns.
+
+    Text columns are tokenized at most once per table through `tokens()`, which is backed by `token_cache`.
+    """
+
+    # string columns with at most this ratio of distinct values to rows are dictionary-encoded
+    _DICT_ENCODING_RATIO = 0.5
+
+    def __init__(self, columns: Optional[Dict[str, Any]] = None, n_rows: int = 0):
+        self._columns: Dict[str, Any] = {}
+        self._n_rows = n_rows
+        self.token_cache = TokenCache()
+        for name, values in (columns or {}).items():
+            self.add_column(name, values)
+
+    @classmethod
+    def from_list(cls, data: Iterable[dict]) -> "SysOutputTable":
+        """
+        Build a table from a list of samples, e.g. the output of `Loader.load()`
+        :param data: an iterable of dictionaries, one per sample
+        :return: the table
+        """
+        data = list(data)
+        column_values: Dict[str, List[Any]] = {}
+        for row_index, row in enumerate(data):
+            for key, value in row.items():
+                if key not in column_values:
+                    column_values[key] = [_MISSING] * row_index
+                column_values[key].append(value)
+            for key, values in column_values.items():
+                if len(values) <= row_index:
+                    values.append(_MISSING)
+        return cls(column_values, n_rows=len(data))
+
+    def to_list(self) -> List[dict]:
+        return [dict(row) for row in self]
+
+    def __len__(self) -> int:
+        return self._n_rows
+
+    def __iter__(self) -> Iterator[RowView]:
+        return (RowView(self, i) for i in range(self._n_rows))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(index)
+        index = int(index)
+        if index < 0:
+            index += self._n_rows
+        if not 0 <= index < self._n_rows:
+            raise IndexError(f"row {index} out of range for {self._n_rows} rows")
+        return RowView(self, index)
+
+    def __setitem__(self, index: int, row: Mapping):
+        if isinstance(row, RowView) and row._table is self and row._index == index:
+            return
+        row_view = self[index]
+        for key, value in row.items():
+            row_view[key] = value
+
+    def take(self, indices: Union[slice, np.ndarray, List[int]]) -> "SysOutputTable":
+        """
+        Select a subset of rows as a new table
+        :param indices: a slice or an array of row indices
+        :return: a new table with the selected rows
+        """
+        if isinstance(indices, slice):
+            n_rows = len(range(self._n_rows)[indices])
+        else:
+            indices = np.asarray(indices, dtype=int)
+            n_rows = len(indices)
+        table = SysOutputTable()
+        table._n_rows = n_rows
+        for name, column in self._columns.items():
+            table._columns[name] = (
+                column.take(indices)
+                if isinstance(column, DictColumn)
+                else column[indices].copy()
+            )
+        return table
+
+    @classmethod
+    def concat(cls, tables: List["SysOutputTable"]) -> "SysOutputTable":
+        """
+        Concatenate tables row-wise, e.g. to merge chunks that were processed separately
+        """
+        names: List[str] = []
+        for table in tables:
+            names.extend(name for name in table._columns if name not in names)
+        column_values = {
+            name: [
+                value
+                for table in tables
+                for value in (
+                    table._decode(name)
+                    if name in table._columns
+                    else [_MISSING] * len(table)
+                )
+            ]
+            for name in names
+        }
+        return cls(column_values, n_rows=sum(len(table) for table in tables))
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self._columns)
+
+    def keys(self) -> List[str]:
+        return self.column_names
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._columns
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Get the values of a column
+        :param name: the column name
+        :return: a float/int array for numeric columns, or an object array otherwise
+        """
+        return self._decode(name)
+
+    def tokens(self, name: str) -> TokenizedTexts:
+        """
+        Get the space-tokenized values of a text column, which are computed once and then cached
+        :param name: the column name
+        :return: the tokenized texts
+        """
+        return self.token_cache.get(name, lambda: self.column(name))
+
+    def codes(self, name: str) -> np.ndarray:
+        """
+        Get the integer codes of a column, encoding it as a dictionary column first if necessary
+        :param name: the column name
+        :return: an int array with one code per row, see `categories()` for the decoded values
+        """
+        column = self._columns[name]
+        if not isinstance(column, DictColumn):
+            column = DictColumn.encode(self._decode(name).tolist())
+            self._columns[name] = column
+        return column.codes
+
+    def categories(self, name: str) -> List[Any]:
+        self.codes(name)
+        return self._columns[name].values
+
+    def add_column(self, name: str, values: Union[Iterable[Any], np.ndarray]):
+        """
+        Add or replace a column, choosing its storage based on the values
+        :param name: the column name
+        :param values: one value per row
+        """
+        if isinstance(values, DictColumn):
+            column = values
+        elif isinstance(values, np.ndarray) and values.dtype != object:
+            column = values
+        else:
+            column = self._encode(list(values))
+        if self._n_rows == 0 and not self._columns:
+            self._n_rows = len(column)
+        if len(column) != self._n_rows:
+            raise ValueError(
+                f"column {name} has {len(column)} values but the table has {self._n_rows} rows"
+            )
+        self._columns[name] = column
+        self.token_cache.invalidate(name)
+
+    def _encode(self, values: List[Any]):
+        present = [v for v in values if v is not _MISSING]
+        if len(present) == len(values) and present:
+            if all(isinstance(v, Number) and not isinstance(v, bool) for v in present):
+                return np.array(values)
+            if all(isinstance(v, str) for v in present):
+                column = DictColumn.encode(values)
+                if len(column.values) <= self._DICT_ENCODING_RATIO * len(values):
+                    return column
+        column = np.empty(len(values), dtype=object)
+        column[:] = values
+        return column
+
+    def _decode(self, name: str) -> np.ndarray:
+        column = self._columns[name]
+        return column.decode() if isinstance(column, DictColumn) else column
+
+    def _get_cell(self, name: str, index: int) -> Any:
+        column = self._columns[name]
+        if isinstance(column, DictColumn):
+            return column.get(index)
+        return column.item(index)
+
+    def _set_cell(self, name: str, index: int, value: Any):
+        self.token_cache.invalidate(name)
+        column = self._columns.get(name)
+        if column is None:
+            column = np.empty(self._n_rows, dtype=object)
+            column[:] = [_MISSING] * self._n_rows
+            self._columns[name] = column
+        if isinstance(column, DictColumn):
+            if isinstance(value, str):
+                column.set(index, value)
+                return
+            column = self._columns[name] = column.decode()
+        elif column.dtype != object and not (
+            isinstance(value, Number) and not isinstance(value, bool)
+        ):
+            column = self._columns[name] = column.astype(object)
+        elif column.dtype.kind in "iu" and not isinstance(value, (int, np.integer)):
+            column = self._columns[name] = column.astype(np.float64)
+        column[index] = value
@@ -0,0 +1,100 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from explainaboard.utils.async_eaas import BatchedEaaSClient
+
+
+class StubEaaSHandler(BaseHTTPRequestHandler):
+    """
+    Scores every hypothesis by its length, after failing the first `n_failures` requests
+    """
+
+    def do_POST(self):
+        server = self.server
+        data = json.loads(
+            json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        )
+        with server.lock:
+            server.n_requests += 1
+            fail = server.n_requests <= server.n_failures
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(0.05)
+        with server.lock:
+            server.in_flight -= 1
+        if fail:
+            self.send_response(503)
+            self.end_headers()
+            return
+        server.batch_sizes.append(len(data["inputs"]))
+        body = json.dumps(
+            {
+                "status": "success",
+                "scores": {
+                    "sample_level": [
+                        {metric: len(x["hypothesis"]) for metric in data["metrics"]}
+                        for x in data["inputs"]
+                    ]
+                },
+            }
+        ).encode("utf8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestBatchedEaaSClient(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubEaaSHandler)
+        self.server.lock = threading.Lock()
+        self.server.n_requests = 0
+        self.server.n_failures = 0
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        self.server.batch_sizes = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.end_point = f"http://127.0.0.1:{self.server.server_address[1]}/score"
+        self.inputs = [
+            {"source": "", "references": ["a b c"], "hypothesis": "x" * i}
+            for i in range(25)
+        ]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_batches(self):
+        client = BatchedEaaSClient(self.end_point, batch_size=10, max_in_flight=2)
+        scores = client.score(self.inputs, metrics=["bleu"])
+        self.assertEqual([x["bleu"] for x in scores["sample_level"]], list(range(25)))
+        self.assertEqual(sorted(self.server.batch_sizes), [5, 10, 10])
+        self.assertLessEqual(self.server.max_in_flight, 2)
+
+    def test_retries(self):
+        self.server.n_failures = 2
+        client = BatchedEaaSClient(
+            self.end_point, batch_size=100, max_retries=2, backoff=0.01
+        )
+        scores = client.score(self.inputs, metrics=["bleu"])
+        self.assertEqual(len(scores["sample_level"]), 25)
+        self.assertEqual(self.server.n_requests, 3)
+
+    def test_retries_exhausted(self):
+        self.server.n_failures = 3
+        client = BatchedEaaSClient(
+            self.end_point, batch_size=100, max_retries=2, backoff=0.01
+        )
+        with self.assertRaises(ConnectionError):
+            client.score(self.inputs, metrics=["bleu"])
+
+
+if __name__ == '__main__':
+    unittest.main()
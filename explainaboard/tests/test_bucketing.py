@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+
+from explainaboard.feature import BucketInfo
+from explainaboard.utils import bucketing
+from explainaboard.utils.value_histogram import ValueHistogram
+
+
+class TestBucketing(unittest.TestCase):
+    def setUp(self):
+        self.values = [3, 1, 2, 2, 5, 8, 1, 0, 13, 2]
+
+    def _assert_buckets_equal(self, buckets, expected):
+        self.assertEqual(list(buckets.keys()), list(expected.keys()))
+        for key, samples in expected.items():
+            self.assertEqual(list(buckets[key]), samples)
+
+    def test_specified_bucket_value(self):
+        expected = {
+            (0,): [7],
+            (1.0, 2.0): [1, 6, 2, 3, 9],
+            (3.0, 13.0): [0, 4, 5, 8],
+        }
+        for dict_obj in [dict(enumerate(self.values)), np.array(self.values)]:
+            self._assert_buckets_equal(
+                bucketing.bucket_attribute_specified_bucket_value(
+                    dict_obj=dict_obj, bucket_number=4, bucket_setting=[0]
+                ),
+                expected,
+            )
+
+    def test_discrete_value(self):
+        labels = ["a", "b", "a", "c", "b", "a", "d"]
+        expected = {("a",): [0, 2, 5], ("b",): [1, 4]}
+        for dict_obj in [dict(enumerate(labels)), np.array(labels, dtype=object)]:
+            self._assert_buckets_equal(
+                bucketing.bucket_attribute_discrete_value(
+                    dict_obj=dict_obj, bucket_number=2, bucket_setting=2
+                ),
+                expected,
+            )
+
+    def test_specified_bucket_interval(self):
+        expected = {(0,): [7], (1, 2): [1, 6, 2, 3, 9], (2, 5): [0, 4], (6, 20): [5, 8]}
+        span_ids = [f"span{i}" for i in range(len(self.values))]
+        buckets = bucketing.bucket_attribute_specified_bucket_interval(
+            dict_obj=dict(zip(span_ids, self.values)),
+            bucket_setting=[(0,), (1, 2), (2, 5), (6, 20)],
+        )
+        self._assert_buckets_equal(
+            buckets,
+            {k: [span_ids[i] for i in v] for k, v in expected.items()},
+        )
+
+    def test_value_histogram(self):
+        bucket_info = BucketInfo(number=4, setting=[0])
+        stats = np.arange(len(self.values), dtype=float)[:, np.newaxis]
+        histogram = ValueHistogram(bucket_info)
+        # folding two chunks gives the same buckets as bucketing all samples at once
+        histogram.add(self.values[:4], {"metric": stats[:4]})
+        histogram.add(self.values[4:], {"metric": stats[4:]})
+        keys, counts, bucket_stats = histogram.get_buckets()
+        self.assertEqual(keys, [(0,), (1.0, 2.0), (3.0, 13.0)])
+        self.assertEqual(counts.tolist(), [1, 5, 4])
+        self.assertEqual(bucket_stats["metric"].tolist(), [[7, 1], [21, 5], [17, 4]])
+
+        # with fewer bins than distinct values, adjacent bins are merged
+        histogram = ValueHistogram(bucket_info, max_bins=3)
+        histogram.add(self.values, {"metric": stats})
+        self.assertLessEqual(len(histogram.counts), 3)
+        self.assertEqual(histogram.counts.sum(), len(self.values))
+        self.assertEqual(histogram.stats["metric"].sum(), stats.sum())
+
+
+if __name__ == '__main__':
+    unittest.main()
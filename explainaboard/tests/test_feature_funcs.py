@@ -0,0 +1,80 @@
+import random
+import unittest
+
+from explainaboard.utils import feature_funcs
+from explainaboard.utils.token_cache import TokenizedTexts
+from explainaboard.utils.vocab_index import get_vocab_index, VocabIndex
+
+
+class TestFeatureFuncs(unittest.TestCase):
+    def setUp(self):
+        random.seed(1)
+        words = ["a", "b", "c", "dd", "", "e f"]
+        self.texts = [
+            " ".join(random.choice(words) for _ in range(random.randint(1, 10)))
+            for _ in range(200)
+        ] + ["", " ", "a  b"]
+        self.statistics = feature_funcs.accumulate_vocab_from_samples(
+            self.texts[:50], lambda x: x
+        )
+
+    def test_batch_num_tokens(self):
+        self.assertEqual(
+            feature_funcs.batch_num_tokens(self.texts).tolist(),
+            [len(text.split(" ")) for text in self.texts],
+        )
+        self.assertEqual(
+            feature_funcs.batch_num_chars(self.texts).tolist(),
+            [len(text) for text in self.texts],
+        )
+
+    def test_batch_num_oov(self):
+        self.assertEqual(
+            feature_funcs.batch_num_oov(self.texts, self.statistics).tolist(),
+            [
+                feature_funcs.feat_num_oov(text, self.statistics, lambda x: x)
+                for text in self.texts
+            ],
+        )
+
+    def test_batch_freq_rank(self):
+        self.assertEqual(
+            feature_funcs.batch_freq_rank(self.texts, self.statistics).tolist(),
+            [
+                feature_funcs.feat_freq_rank(text, self.statistics, lambda x: x)
+                for text in self.texts
+            ],
+        )
+
+    def test_token_lists(self):
+        token_lists = [text.split(" ") for text in self.texts] + [[]]
+        tokenized = TokenizedTexts.from_token_lists(token_lists)
+        self.assertEqual(
+            [tokenized.tokens(i) for i in range(len(tokenized))], token_lists
+        )
+        # the distinct tokens are not padded to a fixed width
+        self.assertEqual(tokenized.vocab.dtype, object)
+        self.assertEqual(
+            feature_funcs.batch_num_oov(tokenized, self.statistics).tolist(),
+            feature_funcs.batch_num_oov(self.texts, self.statistics).tolist() + [0],
+        )
+        self.assertEqual(
+            feature_funcs.batch_freq_rank(tokenized, self.statistics).tolist(),
+            feature_funcs.batch_freq_rank(self.texts, self.statistics).tolist() + [0.0],
+        )
+
+    def test_vocab_index(self):
+        index = VocabIndex({"b": 2, "é": 1, "": 1}, {"b": 1, "é": 2, "": 2, "x": 3})
+        tokens = ["", "a", "b", "x", "é", "zz"]
+        self.assertEqual(
+            index.is_oov(tokens).tolist(), [False, True, False, True, False, True]
+        )
+        self.assertEqual(index.rank(tokens).tolist(), [2, 4, 1, 3, 2, 4])
+        self.assertEqual(VocabIndex({}, {}).is_oov(tokens).tolist(), [True] * 6)
+        self.assertIs(
+            get_vocab_index(self.statistics), get_vocab_index(self.statistics)
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
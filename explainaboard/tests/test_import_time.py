@@ -0,0 +1,73 @@
+import re
+import subprocess
+import sys
+import unittest
+
+# dependencies that are slow to import and only needed by some tasks or feature functions
+HEAVY_MODULES = [
+    "datalabs",
+    "datasets",
+    "eaas",
+    "lexicalrichness",
+    "nltk",
+    "pandas",
+    "scipy",
+    "sklearn",
+    "spacy",
+]
+
+_IMPORT_TIME = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| (\S+)")
+
+
+def _import_in_subprocess(code: str):
+    """
+    Run `code` in a fresh interpreter with `-X importtime`
+    :return: the imported top-level modules, and the cumulative import time of each in seconds
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    import_times = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORT_TIME.match(line)
+        if match:
+            import_times[match.group(2)] = int(match.group(1)) / 1e6
+    return import_times
+
+
+class TestImportTime(unittest.TestCase):
+    def assert_no_heavy_imports(self, import_times: dict):
+        heavy = [m for m in HEAVY_MODULES if m in import_times]
+        self.assertEqual(
+            heavy,
+            [],
+            f"imported {', '.join(f'{m} ({import_times[m]:.2f}s)' for m in heavy)}",
+        )
+
+    def test_import(self):
+        import_times = _import_in_subprocess("import explainaboard")
+        self.assert_no_heavy_imports(import_times)
+
+    def test_text_classification(self):
+        import_times = _import_in_subprocess(
+            "from explainaboard import get_loader, get_processor, TaskType\n"
+            "get_loader(TaskType.text_classification)\n"
+            "get_processor(TaskType.text_classification)\n"
+        )
+        self.assert_no_heavy_imports(import_times)
+
+    def test_all_tasks_are_registered(self):
+        from explainaboard import get_loader, get_processor, TaskType
+        from explainaboard.loaders.loader import Loader
+        from explainaboard.processors.processor import Processor
+
+        for task in TaskType:
+            self.assertIsInstance(get_processor(task), Processor)
+            self.assertIsInstance(get_loader(task), Loader)
+
+
+if __name__ == '__main__':
+    unittest.main()
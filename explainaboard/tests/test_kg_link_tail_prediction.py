@@ -1,7 +1,11 @@
 import pathlib
 import os
 import unittest
+
+import numpy as np
+
 from explainaboard import FileType, Source, TaskType, get_loader, get_processor
+from explainaboard.metric import get_true_ranks
 
 artifacts_path = os.path.dirname(pathlib.Path(__file__)) + "/artifacts/"
 
@@ -33,6 +37,34 @@ class TestKgLinkTailPrediction(unittest.TestCase):
         self.assertIsNotNone(sys_info.results.fine_grained)
         self.assertGreater(len(sys_info.results.overall), 0)
 
+    def test_hits_at_k(self):
+        loader = get_loader(
+            TaskType.kg_link_tail_prediction,
+            Source.local_filesystem,
+            FileType.json,
+            artifacts_path + "test-kg-link-tail-prediction.json",
+        )
+        data = loader.load()
+        metric_names = ["Hits@1", "Hits@3", "Hits", "MeanReciprocalRank"]
+        processor = get_processor(TaskType.kg_link_tail_prediction.value)
+        overall = processor.process(
+            {"metric_names": metric_names}, data
+        ).results.overall
+
+        true_ranks = get_true_ranks(
+            [x["true_tail"] for x in data], [x["predicted_tails"] for x in data]
+        )
+        found = true_ranks > 0
+        self.assertAlmostEqual(
+            overall["Hits@1"].value, np.mean(found & (true_ranks <= 1))
+        )
+        self.assertAlmostEqual(
+            overall["Hits@3"].value, np.mean(found & (true_ranks <= 3))
+        )
+        self.assertAlmostEqual(overall["Hits"].value, np.mean(found))
+        with self.assertRaises(ValueError):
+            processor.process({"metric_names": ["MeanReciprocalRank@3"]}, data)
+
     def test_with_user_defined_features(self):
         loader = get_loader(
             TaskType.kg_link_tail_prediction,
@@ -0,0 +1,98 @@
+import random
+import unittest
+
+import numpy as np
+
+import explainaboard.metric
+
+
+class TestMetric(unittest.TestCase):
+    def setUp(self):
+        random.seed(1)
+        self.true_labels = [random.choice(["a", "b", "c"]) for _ in range(500)]
+        self.predicted_labels = [
+            x if random.random() < 0.7 else random.choice(["a", "b", "c"])
+            for x in self.true_labels
+        ]
+        self.true_tails = [str(random.randint(0, 20)) for _ in range(500)]
+        self.predicted_tails = [
+            [str(random.randint(0, 20)) for _ in range(5)] for _ in range(500)
+        ]
+
+    def _get_metrics(self):
+        return [
+            explainaboard.metric.Accuracy(
+                self.true_labels, self.predicted_labels, True
+            ),
+            explainaboard.metric.F1score(self.true_labels, self.predicted_labels, True),
+            explainaboard.metric.Hits(self.true_tails, self.predicted_tails, True),
+            explainaboard.metric.MeanReciprocalRank(
+                self.true_tails, self.predicted_tails, True
+            ),
+        ]
+
+    def test_sample_stats_match_eval_function(self):
+        for metric in self._get_metrics():
+            stats = metric.get_sample_stats()
+            stats_sum = np.append(stats.sum(axis=0), len(stats))
+            self.assertAlmostEqual(
+                float(metric.calc_metric_from_stats(stats_sum)),
+                metric.evaluate()["value"],
+            )
+
+    def test_evaluate_from_stats_subset(self):
+        subset = list(range(0, 500, 3))
+        full_metric = explainaboard.metric.F1score(
+            self.true_labels, self.predicted_labels
+        )
+        subset_metric = explainaboard.metric.F1score(
+            [self.true_labels[i] for i in subset],
+            [self.predicted_labels[i] for i in subset],
+        )
+        self.assertAlmostEqual(
+            full_metric.evaluate_from_stats(full_metric.get_sample_stats()[subset])[
+                "value"
+            ],
+            subset_metric.evaluate()["value"],
+        )
+
+    def test_true_ranks(self):
+        true_ranks = explainaboard.metric.get_true_ranks(
+            ["a", "b", "c", "d"], [["b", "a", "a"], ["b"], [], ("x", "y", "d")]
+        )
+        self.assertEqual(true_ranks.tolist(), [2, 1, -1, 3])
+        expected = [
+            float(t in p[:2]) for t, p in zip(self.true_tails, self.predicted_tails)
+        ]
+        self.assertEqual(
+            explainaboard.metric.Hits(self.true_tails, self.predicted_tails, k=2)
+            .get_sample_stats()[:, 0]
+            .tolist(),
+            expected,
+        )
+        metric = explainaboard.metric.MeanReciprocalRank(
+            self.true_tails, self.predicted_tails, true_ranks=np.array([1, 2, -1, 4])
+        )
+        self.assertEqual(
+            metric.get_sample_stats()[:, 0].tolist(), [1.0, 0.5, 0.0, 0.25]
+        )
+
+    def test_confidence_interval(self):
+        for metric in self._get_metrics():
+            result = metric.evaluate()
+            self.assertLessEqual(result["confidence_score_low"], result["value"])
+            self.assertGreaterEqual(result["confidence_score_high"], result["value"])
+
+    def test_confidence_interval_reproducible(self):
+        metric = explainaboard.metric.Accuracy(
+            self.true_labels, self.predicted_labels, True
+        )
+        random.seed(2)
+        first = metric.get_confidence_interval()
+        random.seed(2)
+        second = metric.get_confidence_interval()
+        self.assertEqual(first, second)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,88 @@
 import pathlib
 import os
 import unittest
+
+import numpy as np
+
 from explainaboard import FileType, Source, TaskType, get_loader, get_processor
+from explainaboard.processors.named_entity_recognition import (
+    get_entity_span_occurrences,
+    get_statistics,
+)
+from explainaboard.utils.eval_basic_ner import (
+    get_chunks,
+    get_entity_scores,
+    TagSequences,
+)
+from explainaboard.utils.lazy_aggregating import get_operation
 
 artifacts_path = os.path.dirname(pathlib.Path(__file__)) + "/artifacts/"
 
 
 class TestNER(unittest.TestCase):
+    def test_entity_span_occurrences(self):
+        words = ["the", "John", "Smith", "met", "John", "Smith"]
+        words += ["John", "Smith", "in", "U.S.", "."]
+        tags = ["O", "B-PER", "I-PER", "O", "B-PER", "I-PER"]
+        tags += ["B-PER", "I-PER", "O", "B-LOC", "O"]
+        # like the regex search over the corpus string, matches do not share the space between them
+        self.assertEqual(
+            get_entity_span_occurrences(words, tags),
+            {"john smith": [1, 4], "u.s.": [9]},
+        )
+
+    def test_entity_scores(self):
+        true_tags = [["B-PER", "I-PER", "O", "B-LOC"], [], ["I-ORG", "B-ORG"]]
+        pred_tags = [["B-PER", "I-PER", "O", "B-ORG"], [], ["B-ORG", "I-ORG"]]
+        scores = get_entity_scores(TagSequences(true_tags), TagSequences(pred_tags))
+        # 1 of the 3 predicted entities is correct, as is 1 of the 4 true entities
+        self.assertAlmostEqual(scores["precision"], 100 / 3)
+        self.assertAlmostEqual(scores["recall"], 25.0)
+        self.assertAlmostEqual(scores["f1"], 200 / 7)
+        self.assertEqual(scores["per_type"]["PER"]["f1"], 100.0)
+        self.assertEqual(scores["per_type"]["LOC"]["support"], 1)
+        self.assertEqual(scores["per_type"]["ORG"]["support"], 2)
+        with self.assertRaises(ValueError):
+            get_entity_scores(TagSequences(true_tags), TagSequences(pred_tags[:2]))
+
+    def test_tag_sequences_chunks(self):
+        tag_sequences = [["B-PER", "I-PER", "O", "I-LOC"], [], ["B-ORG", "B-ORG"]]
+        self.assertEqual(
+            TagSequences(tag_sequences).chunks(),
+            [get_chunks(tags) for tags in tag_sequences],
+        )
+
+    def test_tag_sequences_from_tag_ids(self):
+        tag_id2str = ["B-PER", "I-PER", "O", "I-LOC"]
+        tag_sequences = [["B-PER", "I-PER", "O", "I-LOC"], [], ["I-LOC", "B-PER"]]
+        tag_ids = np.array(
+            [tag_id2str.index(tag) for tags in tag_sequences for tag in tags]
+        )
+        self.assertEqual(
+            TagSequences.from_tag_ids(tag_ids, tag_id2str, [4, 0, 2]).chunks(),
+            TagSequences(tag_sequences).chunks(),
+        )
+        self.assertEqual(
+            TagSequences.from_tag_ids(tag_ids, tag_id2str).chunks(),
+            [get_chunks([tag for tags in tag_sequences for tag in tags])],
+        )
+
+    def test_statistics_operation(self):
+        # the tag names are passed to the DataLab operation as resources, like in `_init_statistics()`
+        self.addCleanup(setattr, get_statistics, "resources", {})
+        get_statistics.resources = {"tag_id2str": ["O", "B-PER", "I-PER", "B-LOC"]}
+        names = ["Ann", "Bob", "Cid", "Dan", "Eve"]
+        samples = [
+            {"tokens": [name, "Lee", "in", "Rome"], "tags": [1, 2, 0, 3]}
+            for name in names
+        ]
+        statistics = get_operation(get_statistics)(samples)
+        self.assertEqual(statistics["vocab"]["Lee"], 5)
+        self.assertEqual(
+            statistics["econ_dic"]["rome"], {"per": 0.0, "loc": 1.0, "O": 0.0}
+        )
+        self.assertIn("ann lee", statistics["efre_dic"])
+
     def test_generate_system_analysis(self):
         """TODO: should add harder tests"""
 
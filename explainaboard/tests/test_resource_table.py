@@ -0,0 +1,81 @@
+import json
+import os
+import pickle
+import tempfile
+import unittest
+
+from explainaboard.utils.resource_table import (
+    convert_resource,
+    ResourceTable,
+    write_resource_table,
+)
+
+pre_computed_path = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "pre_computed"
+)
+artifacts_path = os.path.join(os.path.dirname(__file__), "artifacts")
+
+
+class TestResourceTable(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "table.bin")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_lookup(self):
+        data = {"b": [1, None], "a": {"x": 0.5}, "é": "c", "": 1, "ab": None}
+        write_resource_table(self.path, data)
+        table = ResourceTable(self.path)
+        self.assertEqual(len(table), len(data))
+        self.assertEqual(dict(table), data)
+        self.assertEqual(list(table), ["", "a", "ab", "b", "é"])
+        self.assertIn("ab", table)
+        self.assertNotIn("abc", table)
+        self.assertNotIn("a\0", table)
+        self.assertIsNone(table.get("c"))
+        self.assertEqual(
+            table.get_many(["é", "c", "a", "é"], default=0),
+            ["c", 0, {"x": 0.5}, "c"],
+        )
+        self.assertEqual(pickle.loads(pickle.dumps(table))["b"], [1, None])
+
+    def test_empty(self):
+        write_resource_table(self.path, {})
+        table = ResourceTable(self.path)
+        self.assertEqual(len(table), 0)
+        self.assertIsNone(table.get("a"))
+        self.assertEqual(table.get_many(["a"]), [None])
+
+    def test_converted_resources(self):
+        convert_resource(
+            os.path.join(
+                pre_computed_path,
+                "named_entity_recognition",
+                "conll2003",
+                "oDen.pkl",
+            ),
+            self.path,
+        )
+        self.assertIn("the", ResourceTable(self.path))
+
+        # a sample of the entity type levels that the shipped KG resource table was converted from
+        with open(
+            os.path.join(artifacts_path, "entity_type_level_map_sample.json")
+        ) as f:
+            expected = json.load(f)
+        convert_resource(
+            os.path.join(artifacts_path, "entity_type_level_map_sample.json"),
+            self.path,
+        )
+        self.assertEqual(dict(ResourceTable(self.path)), expected)
+        table = ResourceTable(
+            os.path.join(pre_computed_path, "kg", "entity_type_level_map.bin")
+        )
+        self.assertEqual(len(table), 7732)
+        self.assertEqual(table.get_many(list(expected)), list(expected.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+
+from explainaboard.utils.score_cache import sample_digest, ScoreCache
+from explainaboard.utils.scorers import CachedScorer, get_scorer, LocalScorer, Scorer
+
+
+class CountingScorer(LocalScorer):
+    """
+    A local scorer that records how many samples it scored
+    """
+
+    def __init__(self, can_aggregate=True):
+        super().__init__(num_workers=1)
+        self._can_aggregate = can_aggregate
+        self.n_scored = 0
+
+    def can_aggregate(self, metric):
+        return self._can_aggregate
+
+    def score(self, inputs, metrics, lang="en"):
+        self.n_scored += len(inputs)
+        return super().score(inputs, metrics, lang)
+
+
+class TestScoreCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = ScoreCache(os.path.join(self.tmp_dir.name, "scores.sqlite"))
+        self.inputs = [
+            {
+                "source": "",
+                "references": [f"the cat number {i} is on the mat"],
+                "hypothesis": f"the cat {i} sat on the mat",
+            }
+            for i in range(10)
+        ]
+        self.metrics = ["bleu", "rouge1"]
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        digest = sample_digest(self.inputs[0])
+        key = self.cache.make_key(digest, "bleu", "v1")
+        self.assertNotEqual(key, self.cache.make_key(digest, "bleu", "v2"))
+        self.assertNotEqual(key, self.cache.make_key(digest, "rouge1", "v1"))
+        self.assertEqual(self.cache.get_many([key]), {})
+        self.cache.put_many({key: 0.5})
+        self.assertEqual(self.cache.get_many([key]), {key: 0.5})
+
+    def test_lru_eviction(self):
+        keys = [
+            self.cache.make_key(sample_digest(x), "bleu", "v1") for x in self.inputs
+        ]
+        self.cache.max_entries = 2
+        self.cache.put_many({keys[0]: 0.0})
+        self.cache.put_many({keys[1]: 1.0})
+        # make the first score the most recently used one
+        self.assertEqual(self.cache.get_many([keys[0]]), {keys[0]: 0.0})
+        self.cache.put_many({keys[2]: 2.0})
+        self.assertEqual(self.cache.get_many(keys[:3]), {keys[0]: 0.0, keys[2]: 2.0})
+
+    def test_only_new_samples_are_scored(self):
+        expected = LocalScorer(num_workers=1).score(self.inputs, self.metrics)
+        scorer = CountingScorer()
+        cached_scorer = CachedScorer(scorer, self.cache)
+        self.assertEqual(cached_scorer.score(self.inputs, self.metrics), expected)
+        self.assertEqual(scorer.n_scored, 10)
+        self.assertEqual(cached_scorer.score(self.inputs, self.metrics), expected)
+        self.assertEqual(scorer.n_scored, 10)
+
+        # a changed sample is the only one scored again
+        inputs = list(self.inputs)
+        inputs[3] = dict(inputs[3], hypothesis="a dog")
+        cached_scorer.score(inputs, self.metrics)
+        self.assertEqual(scorer.n_scored, 11)
+
+    def test_corpus_level_metrics(self):
+        # metrics whose corpus-level score needs the whole corpus are cached per corpus
+        expected = LocalScorer(num_workers=1).score(self.inputs, self.metrics)
+        scorer = CountingScorer(can_aggregate=False)
+        cached_scorer = CachedScorer(scorer, self.cache)
+        self.assertEqual(cached_scorer.score(self.inputs, self.metrics), expected)
+        self.assertEqual(cached_scorer.score(self.inputs, self.metrics), expected)
+        self.assertEqual(scorer.n_scored, 10)
+        cached_scorer.score(self.inputs[:5], self.metrics)
+        self.assertEqual(scorer.n_scored, 15)
+
+    def test_version(self):
+        self.assertNotEqual(
+            LocalScorer().version("rouge1"),
+            LocalScorer(use_stemmer=False).version("rouge1"),
+        )
+        self.assertFalse(Scorer().can_aggregate("bleu"))
+        self.assertTrue(LocalScorer.cacheable)
+        self.assertFalse(get_scorer("eaas").cacheable)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+
+import numpy as np
+import sacrebleu
+
+from explainaboard.utils.scorers import get_scorer, LocalScorer
+
+
+class TestLocalScorer(unittest.TestCase):
+    def setUp(self):
+        self.inputs = [
+            {
+                "source": "",
+                "references": ["the cat is on the mat"],
+                "hypothesis": "the cat sat on the mat",
+            },
+            {
+                "source": "",
+                "references": ["Running dogs were barking loudly."],
+                "hypothesis": "the dog runs and barks",
+            },
+            {"source": "", "references": ["a b c d"], "hypothesis": ""},
+        ]
+
+    def test_rouge(self):
+        scores = LocalScorer(num_workers=1).score(
+            self.inputs, metrics=["rouge1", "rouge2", "rougeL"]
+        )
+        sample_scores = scores["sample_level"][0]
+        self.assertAlmostEqual(sample_scores["rouge1"], 5 / 6)
+        self.assertAlmostEqual(sample_scores["rouge2"], 3 / 5)
+        self.assertAlmostEqual(sample_scores["rougeL"], 5 / 6)
+        # "dog", "run" and "bark" match after stemming
+        self.assertAlmostEqual(scores["sample_level"][1]["rouge1"], 0.6)
+        self.assertEqual(scores["sample_level"][2]["rougeL"], 0.0)
+        self.assertAlmostEqual(
+            scores["corpus_level"]["corpus_rouge1"], (5 / 6 + 0.6 + 0.0) / 3
+        )
+
+    def test_bleu(self):
+        scores = LocalScorer(num_workers=1).score(self.inputs, metrics=["bleu"])
+        hypotheses = [x["hypothesis"] for x in self.inputs]
+        references = [x["references"][0] for x in self.inputs]
+        self.assertAlmostEqual(
+            scores["corpus_level"]["corpus_bleu"],
+            sacrebleu.corpus_bleu(hypotheses, [references]).score,
+        )
+        self.assertAlmostEqual(
+            scores["sample_level"][0]["bleu"],
+            sacrebleu.sentence_bleu(hypotheses[0], [references[0]]).score,
+        )
+
+    def test_sample_stats(self):
+        scorer = LocalScorer(num_workers=1)
+        metrics = ["bleu", "rouge1"]
+        inputs = self.inputs * 2
+        scores = scorer.score(inputs, metrics)
+        for metric in metrics:
+            stats = scorer.get_sample_stats(
+                inputs,
+                metric,
+                [sample_scores[metric] for sample_scores in scores["sample_level"]],
+            )
+            self.assertEqual(len(stats), len(inputs))
+            # statistics summed over chunks give the corpus-level score
+            stats_sum = np.append(stats[:3].sum(axis=0) + stats[3:].sum(axis=0), 6)
+            self.assertAlmostEqual(
+                scorer.score_from_stats_sum(metric, stats_sum),
+                scores["corpus_level"]["corpus_" + metric],
+            )
+
+    def test_parallel(self):
+        metrics = ["bleu", "rouge1", "rougeL"]
+        inputs = self.inputs * 5
+        self.assertEqual(
+            LocalScorer(num_workers=1).score(inputs, metrics),
+            LocalScorer(num_workers=2, chunk_size=4)
+            .score_async(inputs, metrics)
+            .result(),
+        )
+
+    def test_unsupported(self):
+        with self.assertRaises(ValueError):
+            LocalScorer().score(self.inputs, metrics=["bart_score_summ"])
+        with self.assertRaises(ValueError):
+            get_scorer("unknown")
+        self.assertIsInstance(get_scorer("local", num_workers=1), LocalScorer)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+import spacy
+
+from explainaboard.utils.entity_cache import EntityCache
+from explainaboard.utils.spacy_loader import (
+    get_named_entities,
+    get_named_entities_batch,
+    spacy_loader,
+)
+
+
+def _make_model(patterns):
+    nlp = spacy.blank("en")
+    nlp.add_pipe("entity_ruler").add_patterns(patterns)
+    return nlp
+
+
+class TestSpacyLoader(unittest.TestCase):
+    model_name = "test_entity_ruler"
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        spacy_loader._models[self.model_name] = _make_model(
+            [
+                {"label": "ORG", "pattern": "Apple"},
+                {"label": "GPE", "pattern": "Paris"},
+            ]
+        )
+        self.texts = [
+            "Apple opened a store in Paris .",
+            "nothing to see here",
+            "Apple again",
+            "Apple opened a store in Paris .",
+        ]
+
+    def tearDown(self):
+        del spacy_loader._models[self.model_name]
+        self.tmp_dir.cleanup()
+
+    def test_batch(self):
+        entities = get_named_entities_batch(
+            self.texts, model_name=self.model_name, batch_size=2
+        )
+        self.assertEqual(
+            entities[0], [("Apple", "ORG", 0, 5), ("Paris", "GPE", 24, 29)]
+        )
+        self.assertEqual(
+            [len(x) for x in entities],
+            [len(get_named_entities(x, self.model_name)) for x in self.texts],
+        )
+
+    def test_cache(self):
+        cache = EntityCache(os.path.join(self.tmp_dir.name, "entities.sqlite"))
+        expected = get_named_entities_batch(
+            self.texts, model_name=self.model_name, cache=cache
+        )
+        # a model that finds no entities, so cached entities are recognizable
+        spacy_loader._models[self.model_name] = _make_model([])
+        self.assertEqual(
+            get_named_entities_batch(
+                self.texts + ["Paris"], model_name=self.model_name, cache=cache
+            ),
+            expected + [[]],
+        )
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+
+from explainaboard.utils.entity_cache import EntityCache
+
+
+class TestSQLiteCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = EntityCache(
+            os.path.join(self.tmp_dir.name, "entities.sqlite"), max_entries=2
+        )
+        self.keys = [
+            self.cache.make_key(text, "en_core_web_sm", "3.0.0")
+            for text in ["a", "b", "c"]
+        ]
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        self.assertEqual(self.cache.get_many(self.keys), {})
+        entities = {self.keys[0]: [("Paris", "GPE", 0, 5)], self.keys[1]: []}
+        self.cache.put_many(entities)
+        self.assertEqual(self.cache.get_many(self.keys), entities)
+
+    def test_lru_eviction(self):
+        self.cache.put_many({self.keys[0]: []})
+        self.cache.put_many({self.keys[1]: []})
+        # make the first text the most recently used one
+        self.assertEqual(list(self.cache.get_many(self.keys[:1])), self.keys[:1])
+        self.cache.put_many({self.keys[2]: []})
+        self.assertEqual(
+            sorted(self.cache.get_many(self.keys)), sorted([self.keys[0], self.keys[2]])
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+import numpy as np
+
+from explainaboard.utils.statistics_builder import build_statistics
+
+
+class TestStatisticsBuilder(unittest.TestCase):
+    def setUp(self):
+        self.texts = ["a b c", "a a", "b", "c a b a", "É a", ""]
+        self.tag_id2str = ["O", "B-PER", "I-PER"]
+        self.tags = [
+            [(i + j) % 3 for j in range(len(x.split(" ")))]
+            for i, x in enumerate(self.texts)
+        ]
+
+    def test_statistics(self):
+        statistics = build_statistics(
+            self.texts, count_lengths=True, batch_size=3
+        ).statistics()
+        self.assertEqual(statistics["vocab"], {"a": 6, "b": 3, "c": 2, "É": 1, "": 1})
+        self.assertEqual(
+            statistics["vocab_rank"], {"a": 1, "b": 2, "c": 3, "É": 4, "": 4}
+        )
+        self.assertEqual(
+            statistics["length_fre"], {3: 1 / 6, 2: 2 / 6, 1: 2 / 6, 4: 1 / 6}
+        )
+
+    def test_merge(self):
+        expected = build_statistics(
+            self.texts, self.tags, count_lengths=True, keep_corpus=True
+        )
+        merged = build_statistics(
+            self.texts[:2], self.tags[:2], count_lengths=True, keep_corpus=True
+        ).merge(
+            build_statistics(
+                self.texts[2:], self.tags[2:], count_lengths=True, keep_corpus=True
+            )
+        )
+        self.assertEqual(merged.statistics(), expected.statistics())
+        self.assertEqual(self._decode(merged), self._decode(expected))
+        words, token_ids, tag_ids = merged.corpus()
+        self.assertEqual(token_ids.dtype, np.int32)
+        self.assertEqual([words[i] for i in token_ids], " ".join(self.texts).split(" "))
+        self.assertEqual(tag_ids.tolist(), [t for x in self.tags for t in x])
+
+    def test_workers(self):
+        expected = build_statistics(self.texts, self.tags, keep_corpus=True)
+        sharded = build_statistics(
+            self.texts, self.tags, num_workers=2, shard_size=2, keep_corpus=True
+        )
+        self.assertEqual(sharded.statistics(), expected.statistics())
+        self.assertEqual(self._decode(sharded), self._decode(expected))
+
+    def _decode(self, builder):
+        words, token_ids, tag_ids = builder.corpus()
+        return [words[i] for i in token_ids], tag_ids.tolist()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from explainaboard.utils.statistics_cache import StatisticsCache
+
+
+def get_statistics(samples):
+    return {"vocab": {"a": 1}}
+
+
+def get_other_statistics(samples):
+    return {"vocab": {"b": 2}}
+
+
+class TestStatisticsCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = StatisticsCache(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        key = self.cache.make_key("sst2", None, get_statistics, "fingerprint")
+        self.assertIsNone(self.cache.get(key))
+        statistics = {"vocab": {"a": 1, "b": 2}, "vocab_rank": {"a": 1, "b": 2}}
+        self.cache.put(key, statistics)
+        self.assertEqual(self.cache.get(key), statistics)
+
+    def test_key(self):
+        key = self.cache.make_key("sst2", None, get_statistics, "fingerprint")
+        self.assertEqual(
+            key, self.cache.make_key("sst2", None, get_statistics, "fingerprint")
+        )
+        self.assertNotEqual(
+            key, self.cache.make_key("sst2", None, get_other_statistics, "fingerprint")
+        )
+        self.assertNotEqual(
+            key, self.cache.make_key("sst2", "sub", get_statistics, "fingerprint")
+        )
+        self.assertNotEqual(
+            key, self.cache.make_key("sst2", None, get_statistics, "fingerprint2")
+        )
+        with mock.patch("explainaboard.utils.statistics_cache.STATISTICS_VERSION", -1):
+            self.assertNotEqual(
+                key, self.cache.make_key("sst2", None, get_statistics, "fingerprint")
+            )
+
+    def test_lru_eviction(self):
+        statistics = {"vocab": {str(i): i for i in range(100)}}
+        self.cache.put("a", statistics)
+        entry_size = os.path.getsize(self.cache._path("a"))
+        self.cache.max_size = 2 * entry_size
+        self.cache.put("b", statistics)
+        # make "a" the least recently used entry, then use it again
+        os.utime(self.cache._path("a"), (0, 0))
+        self.assertIsNotNone(self.cache.get("a"))
+        os.utime(self.cache._path("b"), (0, 0))
+        self.cache.put("c", statistics)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertIsNotNone(self.cache.get("a"))
+        self.assertIsNotNone(self.cache.get("c"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from explainaboard.utils.feature_functions.sum_attribute import SUMAttribute
+
+
+class TestSUMAttribute(unittest.TestCase):
+    def test_overlap(self):
+        overlap = SUMAttribute().overlap
+        Match = SUMAttribute.Match
+        self.assertEqual(
+            overlap("the cat sat on a mat".split(), "a cat sat on the mat".split()),
+            [Match(0, 4, 1), Match(1, 1, 3), Match(4, 0, 1), Match(5, 5, 1)],
+        )
+        # the scan resumes after each fragment, so the fragment "x x y" starting inside the first one is not found
+        self.assertEqual(
+            overlap(["x", "x", "y"], ["x", "x", "x", "y"]),
+            [Match(0, 0, 2), Match(2, 3, 1)],
+        )
+        # the first of the longest fragments is kept
+        self.assertEqual(
+            overlap(["a", "b", "c"], ["a", "b", "z", "a", "b", "c", "a", "b", "c"]),
+            [Match(0, 3, 3)],
+        )
+        self.assertEqual(overlap(["novel"], ["a", "b"]), [])
+        self.assertEqual(overlap([], ["a", "b"]), [])
+
+    def test_ngram_attributes(self):
+        sum_attribute = SUMAttribute()
+        text_sents = [["a", "b", "c"], ["d", "e"]]
+        # the bigram ("c", "d") crosses a sentence boundary of the text, so it is novel
+        summary_sents = [["a", "b", "c", "d"], ["a", "b", "c"]]
+        self.assertAlmostEqual(sum_attribute._novelty(text_sents, summary_sents), 1 / 5)
+        self.assertAlmostEqual(sum_attribute._repetition(summary_sents), 1 / 3)
+        self.assertEqual(sum_attribute._repetition([["a", "b"]]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -31,6 +31,49 @@ class TestSummarization(unittest.TestCase):
         self.assertIsNotNone(sys_info.results.fine_grained)
         self.assertGreater(len(sys_info.results.overall), 0)
 
+    def test_generate_system_analysis_stream(self):
+        path_data = artifacts_path + "test-summ.tsv"
+        loader = get_loader(
+            TaskType.summarization, Source.local_filesystem, FileType.tsv, path_data
+        )
+        data = list(loader.load())
+        metric_names = ["rouge1", "rouge2", "rougeL", "bleu"]
+        processor = get_processor(TaskType.summarization.value)
+
+        sys_info = processor.process(
+            {"metric_names": metric_names, "scorer": "local"}, data
+        )
+        stream_info = processor.process_stream(
+            {"metric_names": metric_names, "scorer": "local"},
+            loader.iter_load(),
+            chunk_size=16,
+        )
+        for metric_name in metric_names:
+            self.assertAlmostEqual(
+                sys_info.results.overall[metric_name].value,
+                stream_info.results.overall[metric_name].value,
+            )
+        fine_grained = sys_info.results.fine_grained
+        stream_fine_grained = stream_info.results.fine_grained
+        self.assertEqual(fine_grained.keys(), stream_fine_grained.keys())
+        for feature_name, buckets in fine_grained.items():
+            stream_buckets = stream_fine_grained[feature_name]
+            self.assertEqual(buckets.keys(), stream_buckets.keys())
+            for bucket_name, performances in buckets.items():
+                # the bucket-level ROUGE, which is an average of sample-level scores
+                for performance, stream_performance in zip(
+                    performances[:3], stream_buckets[bucket_name][:3]
+                ):
+                    self.assertEqual(
+                        performance.n_samples, stream_performance.n_samples
+                    )
+                    self.assertAlmostEqual(performance.value, stream_performance.value)
+
+    def test_stream_unsupported_scorer(self):
+        processor = get_processor(TaskType.summarization.value)
+        with self.assertRaises(ValueError):
+            processor.process_stream({"scorer": "eaas"}, [])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+import numpy as np
+
+from explainaboard.sys_output_table import DictColumn, SysOutputTable
+
+
+class TestSysOutputTable(unittest.TestCase):
+    def setUp(self):
+        self.data = [
+            {"id": str(i), "text": f"text {i}", "true_label": "pos", "score": i}
+            for i in range(10)
+        ]
+        self.data[3]["true_label"] = "neg"
+
+    def test_column_storage(self):
+        table = SysOutputTable.from_list(self.data)
+        self.assertEqual(len(table), 10)
+        self.assertIsInstance(table._columns["true_label"], DictColumn)
+        self.assertEqual(table.categories("true_label"), ["pos", "neg"])
+        self.assertEqual(table._columns["score"].dtype.kind, "i")
+        self.assertEqual(table._columns["text"].dtype, object)
+
+    def test_round_trip(self):
+        table = SysOutputTable.from_list(self.data)
+        self.assertEqual(table.to_list(), self.data)
+        self.assertEqual(dict(table[3]), self.data[3])
+        self.assertEqual(table[-1]["id"], "9")
+
+    def test_row_view_assignment(self):
+        table = SysOutputTable.from_list(self.data)
+        table[0]["score"] = 0.5
+        table[1]["true_label"] = "neutral"
+        table[2]["new_feature"] = [1, 2]
+        self.assertEqual(table[0]["score"], 0.5)
+        self.assertEqual(table[1]["true_label"], "neutral")
+        self.assertEqual(table[2]["new_feature"], [1, 2])
+        self.assertIn("new_feature", table[2])
+        self.assertNotIn("new_feature", table[3])
+        with self.assertRaises(KeyError):
+            table[3]["new_feature"]
+
+    def test_add_column_and_take(self):
+        table = SysOutputTable.from_list(self.data)
+        table.add_column("length", [float(i) * 2 for i in range(10)])
+        self.assertEqual(table.column("length").dtype, np.float64)
+        subset = table.take([1, 3, 5])
+        self.assertEqual(subset.column("length").tolist(), [2.0, 6.0, 10.0])
+        self.assertEqual(subset.column("true_label").tolist(), ["pos", "neg", "pos"])
+        head = table.take(slice(0, 5))
+        head[1]["true_label"] = "neg"
+        self.assertEqual(table[1]["true_label"], "pos")
+        merged = SysOutputTable.concat([table[:5], table[5:]])
+        self.assertEqual(merged.to_list(), table.to_list())
+        with self.assertRaises(ValueError):
+            table.add_column("bad", [1, 2])
+
+    def test_token_cache(self):
+        table = SysOutputTable.from_list(self.data)
+        tokens = table.tokens("text")
+        self.assertIs(table.tokens("text"), tokens)
+        self.assertEqual(tokens.lengths().tolist(), [2] * 10)
+        self.assertEqual(tokens.tokens(4), ["text", "4"])
+        self.assertEqual((table.token_cache.hits, table.token_cache.misses), (1, 1))
+        table[4]["text"] = "a b c"
+        self.assertEqual(table.tokens("text").tokens(4), ["a", "b", "c"])
+        self.assertEqual(table.token_cache.misses, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 import pathlib
 import os
+import random
 import unittest
 from explainaboard import FileType, Source, TaskType, get_loader, get_processor
 
@@ -30,3 +31,123 @@ class TestTextPairClassification(unittest.TestCase):
         # analysis.write_to_directory("./")
         self.assertIsNotNone(sys_info.results.fine_grained)
         self.assertGreater(len(sys_info.results.overall), 0)
+
+    def test_snli_num_workers(self):
+
+        path_data = artifacts_path + "test-snli.tsv"
+        loader = get_loader(
+            TaskType.text_pair_classification,
+            Source.local_filesystem,
+            FileType.tsv,
+            path_data,
+        )
+        data = list(loader.load())
+        processor = get_processor(TaskType.text_pair_classification)
+
+        serial_info = processor.process({"metric_names": ["Accuracy"]}, data)
+        parallel_info = processor.process(
+            {"metric_names": ["Accuracy"], "num_workers": 2}, data
+        )
+        self.assertEqual(serial_info.results, parallel_info.results)
+
+    def test_snli_num_bucketing_threads(self):
+
+        path_data = artifacts_path + "test-snli.tsv"
+        loader = get_loader(
+            TaskType.text_pair_classification,
+            Source.local_filesystem,
+            FileType.tsv,
+            path_data,
+        )
+        data = list(loader.load())
+        processor = get_processor(TaskType.text_pair_classification)
+        metadata = {
+            "metric_names": ["Accuracy"],
+            "is_print_confidence_interval": True,
+        }
+
+        random.seed(0)
+        serial_info = processor.process(dict(metadata), data)
+        random.seed(0)
+        parallel_info = processor.process(dict(metadata, num_bucketing_threads=4), data)
+        # the same buckets, in the same order, with the same confidence intervals
+        self.assertEqual(
+            list(serial_info.results.fine_grained),
+            list(parallel_info.results.fine_grained),
+        )
+        self.assertEqual(serial_info.results, parallel_info.results)
+
+    def test_snli_token_cache_log(self):
+
+        path_data = artifacts_path + "test-snli.tsv"
+        loader = get_loader(
+            TaskType.text_pair_classification,
+            Source.local_filesystem,
+            FileType.tsv,
+            path_data,
+        )
+        data = list(loader.load())
+        processor = get_processor(TaskType.text_pair_classification)
+
+        with self.assertLogs("explainaboard.processors.processor", "INFO") as logs:
+            processor.process({"metric_names": ["Accuracy"]}, data)
+            # each of the 8 chunks of 2 workers tokenizes the text pairs once
+            processor.process({"metric_names": ["Accuracy"], "num_workers": 2}, data)
+        self.assertEqual(
+            [record.getMessage() for record in logs.records],
+            ["token cache: 0 hits, 1 misses", "token cache: 0 hits, 8 misses"],
+        )
+
+    def test_snli_bucket_performance(self):
+
+        path_data = artifacts_path + "test-snli.tsv"
+        loader = get_loader(
+            TaskType.text_pair_classification,
+            Source.local_filesystem,
+            FileType.tsv,
+            path_data,
+        )
+        data = list(loader.load())
+        processor = get_processor(TaskType.text_pair_classification)
+        sys_info = processor._get_sys_info({"metric_names": ["Accuracy"]})
+
+        # called directly, i.e. without the metric statistics calculated by process()
+        sample_ids = list(range(0, len(data), 2))
+        performance = processor.get_bucket_performance(
+            sys_info, data, {"(0,)": sample_ids}
+        )["(0,)"][0]
+        self.assertEqual(performance.n_samples, len(sample_ids))
+        self.assertAlmostEqual(
+            performance.value,
+            sum(data[i]["true_label"] == data[i]["predicted_label"] for i in sample_ids)
+            / len(sample_ids),
+        )
+
+    def test_snli_stream(self):
+
+        path_data = artifacts_path + "test-snli.tsv"
+        loader = get_loader(
+            TaskType.text_pair_classification,
+            Source.local_filesystem,
+            FileType.tsv,
+            path_data,
+        )
+        data = list(loader.load())
+        processor = get_processor(TaskType.text_pair_classification)
+
+        sys_info = processor.process({"metric_names": ["Accuracy"]}, data)
+        stream_info = processor.process_stream(
+            {"metric_names": ["Accuracy"]}, loader.iter_load(), chunk_size=100
+        )
+        fine_grained = sys_info.results.fine_grained
+        stream_fine_grained = stream_info.results.fine_grained
+        self.assertEqual(fine_grained.keys(), stream_fine_grained.keys())
+        for feature_name, buckets in fine_grained.items():
+            stream_buckets = stream_fine_grained[feature_name]
+            self.assertEqual(buckets.keys(), stream_buckets.keys())
+            for bucket_name, performances in buckets.items():
+                stream_performance = stream_buckets[bucket_name][0]
+                self.assertEqual(
+                    performances[0].n_samples, stream_performance.n_samples
+                )
+                self.assertAlmostEqual(performances[0].value, stream_performance.value)
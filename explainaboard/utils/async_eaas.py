@@ -1,8 +1,26 @@
-from typing import Any, Dict, List
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
 from eaas import Client
+from eaas.config import Config
 from threading import Thread
 import uuid
 
+import aiohttp
+
+# responses that are worth retrying: rate limiting and server errors
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def make_eaas_client() -> "AsyncEaaSClient":
+    """
+    :return: an EaaS client with the default metric configuration
+    """
+    client = AsyncEaaSClient()
+    client.load_config(Config())
+    return client
+
 
 class AsyncEaaSClient(Client):
     """
@@ -49,3 +67,140 @@ class AsyncEaaSClient(Client):
         self._results.pop(request_id)
         self._threads.pop(request_id)
         return result
+
+
+class BatchedEaaSClient:
+    """
+    An asyncio EaaS client for scoring many samples: the samples are split into batches of `batch_size` that are
+    scored with one request each, over a pool of at most `max_in_flight` connections that are reused across
+    batches. Requests that fail with a connection error, a timeout or a 5xx/429 status are retried up to
+    `max_retries` times, waiting `backoff`, 2 * `backoff`, 4 * `backoff`... seconds in between.
+    Example usage:
+      client = BatchedEaaSClient.from_client(eaas_client)
+      scores = client.score(inputs, metrics=["bleu"])
+      scores["sample_level"][i]["bleu"]
+    """
+
+    def __init__(
+        self,
+        end_point: str,
+        config: Optional[dict] = None,
+        batch_size: int = 100,
+        max_in_flight: int = 4,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 300.0,
+    ):
+        self.end_point = end_point
+        self.config = config
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+    @classmethod
+    def from_client(cls, client: Client, **kwargs) -> "BatchedEaaSClient":
+        """
+        :param client: a configured EaaS client, whose end point and metric configuration are used
+        """
+        return cls(client.end_point, getattr(client, "_config", None), **kwargs)
+
+    def score(
+        self,
+        inputs: List[Dict],
+        metrics: List[str],
+        task: str = "sum",
+        lang: str = "en",
+        cal_attributes: bool = False,
+    ) -> Dict[str, list]:
+        """
+        Score samples, blocking until all batches are done
+        :param inputs: a list of dictionaries with the "source", "references" and "hypothesis" of each sample
+        :param metrics: the names of the metrics to calculate
+        :return: a dictionary with the "sample_level" scores of every sample, in the order of `inputs`. Corpus-level
+            scores are not returned, as they can not be combined across batches.
+        """
+        coroutine = self.score_async(inputs, metrics, task, lang, cal_attributes)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+        # called from a running event loop (e.g. in a notebook), so run the requests in their own thread
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coroutine).result()
+
+    async def score_async(
+        self,
+        inputs: List[Dict],
+        metrics: List[str],
+        task: str = "sum",
+        lang: str = "en",
+        cal_attributes: bool = False,
+    ) -> Dict[str, list]:
+        """
+        The asynchronous form of `score()`
+        """
+        batches = [
+            inputs[start : start + self.batch_size]
+            for start in range(0, len(inputs), self.batch_size)
+        ]
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight)
+        async with aiohttp.ClientSession(
+            connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout)
+        ) as session:
+            batch_scores = await asyncio.gather(
+                *[
+                    self._post(
+                        session,
+                        semaphore,
+                        {
+                            "inputs": batch,
+                            "metrics": metrics,
+                            "config": self.config,
+                            "task": task,
+                            "lang": lang,
+                            "cal_attributes": cal_attributes,
+                        },
+                    )
+                    for batch in batches
+                ]
+            )
+        sample_level = []
+        for batch, scores in zip(batches, batch_scores):
+            if len(scores["sample_level"]) != len(batch):
+                raise ValueError(
+                    f'EaaS returned {len(scores["sample_level"])} sample scores for {len(batch)} inputs'
+                )
+            sample_level.extend(scores["sample_level"])
+        return {"sample_level": sample_level}
+
+    async def _post(
+        self,
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        data: dict,
+    ) -> dict:
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            async with semaphore:
+                try:
+                    # the JSON-encoded payload is sent as a JSON string, like `eaas.Client` does
+                    async with session.post(
+                        self.end_point, json=json.dumps(data)
+                    ) as response:
+                        if response.status in _RETRY_STATUSES:
+                            error = f"status {response.status}"
+                            continue
+                        rjson = await response.json(content_type=None)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = repr(e)
+                    continue
+            if response.status != 200 or rjson.get("status") != "success":
+                raise ConnectionError(f"[Error: {rjson}]")
+            return rjson["scores"]
+        raise ConnectionError(
+            f"EaaS request failed after {self.max_retries + 1} attempts ({error})"
+        )
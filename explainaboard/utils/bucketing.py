@@ -1,172 +1,271 @@
-from explainaboard.utils.analysis import (
-    reverse_dict,
-    reverse_dict_discrete,
-    find_key,
-)
-from explainaboard.utils.py_utils import sort_dict
-
-
-def bucket_attribute_specified_bucket_value(
-    dict_obj=None, bucket_number=4, bucket_setting=None
-):
-    if not dict_obj or len(dict_obj) == 0:
-        return None
-    # Bucketing different Attributes
-    dict_span2att_val = dict_obj
+from numbers import Number
+from typing import Any, Dict, List, Tuple, Union
+
+import numpy as np
+
+# Every bucketing function takes `dict_obj`, either a dictionary mapping sample addresses (e.g. span IDs) to
+# feature values, or an array of feature values indexed by sample ID. Buckets map to lists of addresses in the
+# former case and to arrays of sample IDs in the latter.
+#
+# The bucket boundaries only depend on how many samples share each feature value, so each strategy is implemented
+# once over groups of samples (`*_groups()`), which is also what bucketing from a `ValueHistogram` uses.
+
+
+def _split_dict_obj(dict_obj) -> Tuple[Any, Union[list, np.ndarray]]:
+    """
+    :return: the sample addresses (None for arrays, whose addresses are their indices) and the feature values
+    """
+    if isinstance(dict_obj, np.ndarray):
+        return None, dict_obj
+    return list(dict_obj.keys()), list(dict_obj.values())
+
+
+def _as_float_array(values) -> np.ndarray:
+    if isinstance(values, np.ndarray):
+        return values.astype(np.float64)
+    return np.array([float(v) for v in values], dtype=np.float64)
+
+
+def group_float_values(values) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Group samples by the float value of their feature
+    :return: the positions of the samples sorted by value (ties keep their original order), the distinct values in
+        ascending order, and the number of samples with each value
+    """
+    float_values = _as_float_array(values)
+    order = np.argsort(float_values, kind="stable")
+    distinct_values, counts = np.unique(float_values[order], return_counts=True)
+    return order, distinct_values, counts
+
+
+def group_discrete_values(values) -> Tuple[List[Any], np.ndarray]:
+    """
+    Group samples by the (hashable) value of their feature, in order of first appearance
+    :return: the distinct values, and the group index of every sample
+    """
+    if isinstance(values, np.ndarray) and values.dtype != object:
+        distinct_values, first_index, inverse = np.unique(
+            values, return_index=True, return_inverse=True
+        )
+        # renumber the groups in order of first appearance
+        appearance = np.argsort(first_index, kind="stable")
+        rank = np.empty_like(appearance)
+        rank[appearance] = np.arange(len(appearance))
+        return distinct_values[appearance].tolist(), rank[inverse.reshape(-1)]
+    value_to_group: Dict[Any, int] = {}
+    group_ids = [value_to_group.setdefault(v, len(value_to_group)) for v in values]
+    return list(value_to_group), np.array(group_ids, dtype=int)
+
+
+def _add_bucket(keys: List[tuple], key: tuple) -> int:
+    if key not in keys:
+        keys.append(key)
+    return keys.index(key)
+
+
+def specified_bucket_value_groups(
+    low_values: np.ndarray,
+    high_values: np.ndarray,
+    counts: np.ndarray,
+    bucket_number: int,
+    bucket_setting,
+) -> Tuple[List[tuple], np.ndarray]:
+    """
+    Assign groups of samples to the buckets of `bucket_attribute_specified_bucket_value`
+    :param low_values: the smallest value of each group, in ascending order
+    :param high_values: the largest value of each group (the same as `low_values` unless groups were merged)
+    :param counts: the number of samples in each group
+    :return: the bucket keys, and the index of the bucket of each group (-1 if none)
+    """
     n_buckets = bucket_number
     hardcoded_bucket_values = bucket_setting
 
-    # hardcoded_bucket_values = [set([float(0), float(1)])]
-    # print("!!!debug-7--")
     p_infinity = 1000000
     n_infinity = -1000000
-    n_spans = len(dict_span2att_val)
-    dict_att_val2span = reverse_dict(dict_span2att_val)
-    dict_att_val2span = sort_dict(dict_att_val2span)
-    dict_bucket2span = {}
+    n_spans = int(counts.sum())
+    keys: List[tuple] = []
+    group_bucket = np.full(len(counts), -1, dtype=int)
 
+    # samples whose value is one of the hardcoded values get a bucket of their own
     for bucket_value in hardcoded_bucket_values:
-        if bucket_value in dict_att_val2span.keys():
-            # print("------------work!!!!---------")
-            # print(bucket_value)
-            dict_bucket2span[(bucket_value,)] = dict_att_val2span[bucket_value]
-            n_spans -= len(dict_att_val2span[bucket_value])
+        if not isinstance(bucket_value, Number):
+            continue
+        i = np.searchsorted(low_values, bucket_value)
+        if (
+            i < len(low_values)
+            and low_values[i] == bucket_value
+            and high_values[i] == bucket_value
+        ):
+            group_bucket[i] = _add_bucket(keys, (bucket_value,))
+            n_spans -= int(counts[i])
             n_buckets -= 1
 
     avg_entity = n_spans * 1.0 / n_buckets
-    n_tmp = 0
-    entity_list = []
-    val_list = []
-
-    #
-    # print("-----avg_entity----------")
-    # print(avg_entity)
-
-    for att_val, entity in dict_att_val2span.items():
-        if att_val in hardcoded_bucket_values:
-            continue
 
-        # print("debug-att_val:\t",att_val)
-        val_list.append(att_val)
-        entity_list += entity
-        n_tmp += len(entity)
-
-        # print(att_val)
-        # print(n_tmp, avg_entity)
-
-        if n_tmp > avg_entity:
-
-            if len(val_list) >= 2:
-                key_bucket = (val_list[0], val_list[-1])
-                dict_bucket2span[key_bucket] = entity_list
-            # print("debug key bucket:\t", key_bucket)
-            else:
-                dict_bucket2span[(val_list[0],)] = entity_list
-            entity_list = []
-            n_tmp = 0
-            val_list = []
-    if n_tmp != 0:
+    # greedily close a bucket as soon as it holds more than `avg_entity` samples
+    rest_groups = np.flatnonzero(group_bucket < 0)
+    rest_offsets = np.concatenate(([0], np.cumsum(counts[rest_groups])))
+    start = 0
+    while start < len(rest_groups):
+        end = max(
+            start + 1,
+            np.searchsorted(
+                rest_offsets, rest_offsets[start] + avg_entity, side="right"
+            ),
+        )
+        if end > len(rest_groups):
+            break
+        if (
+            end - start >= 2
+            or low_values[rest_groups[start]] != high_values[rest_groups[start]]
+        ):
+            key_bucket = (
+                float(low_values[rest_groups[start]]),
+                float(high_values[rest_groups[end - 1]]),
+            )
+        else:
+            key_bucket = (float(low_values[rest_groups[start]]),)
+        group_bucket[rest_groups[start:end]] = _add_bucket(keys, key_bucket)
+        start = end
+    if start < len(rest_groups):
         if n_buckets == 1:
-            dict_bucket2span[(n_infinity, p_infinity)] = entity_list
+            key_bucket = (n_infinity, p_infinity)
         else:
-            if val_list[0] <= 1:
+            if low_values[rest_groups[start]] <= 1:
                 p_infinity = 1.0
-            # print("!!!!!-debug-2")
-            if len(val_list) >= 2:
-                key_bucket = (val_list[0], p_infinity)
-                dict_bucket2span[key_bucket] = entity_list
-            else:
-                dict_bucket2span[(val_list[0], p_infinity)] = entity_list  # fix bugs
-    #
-    #
-    #
-    # [(0,), (0.1, 0.2), (0.3,0.4), (0.5, 0.6)] --> [(0,), (0,0.2), (0.2, 0.4), (0.4, 0.6)]
-    # dict_old2new = interval_transformer(dict_bucket2span.keys())
-    # dict_bucket2span_new = {}
-    # for inter_list, span_list in dict_bucket2span.items():
-    # 	dict_bucket2span_new[dict_old2new[inter_list]] = span_list
-
-    return dict_bucket2span
+            key_bucket = (float(low_values[rest_groups[start]]), p_infinity)
+        group_bucket[rest_groups[start:]] = _add_bucket(keys, key_bucket)
 
+    return keys, group_bucket
 
-def bucket_attribute_discrete_value(
-    dict_obj=None, bucket_number=100000000, bucket_setting=1
-):
-    # Bucketing different Attributes
 
-    # print("!!!!!debug---------")
-    # 	hardcoded_bucket_values = [set([float(0), float(1)])]
-    dict_span2att_val = dict_obj
-    # print(f"dict_span2att_val:\n{dict_span2att_val}")
+def discrete_value_groups(
+    counts: np.ndarray, distinct_values: List[Any], bucket_number, bucket_setting
+) -> Tuple[List[tuple], np.ndarray]:
+    """
+    Assign groups of samples to the buckets of `bucket_attribute_discrete_value`
+    :param counts: the number of samples of each value
+    :param distinct_values: the distinct values, in order of first appearance
+    :return: the bucket keys, and the index of the bucket of each group (-1 if none)
+    """
     n_buckets = bucket_number
     n_entities = bucket_setting
 
-    dict_bucket2span = {}
-
-    dict_att_val2span = reverse_dict_discrete(dict_span2att_val)
-    dict_att_val2span = sort_dict(dict_att_val2span, flag="value")
-    # dict["q_id"] = 2
-
+    keys: List[tuple] = []
+    group_bucket = np.full(len(counts), -1, dtype=int)
     n_total = 1
-    for att_val, entity in dict_att_val2span.items():
-
-        if len(entity) < n_entities or n_total > n_buckets:
+    for i in np.argsort(-counts, kind="stable").tolist():
+        if counts[i] < n_entities or n_total > n_buckets:
             break
-        dict_bucket2span[(att_val,)] = entity
-
+        group_bucket[i] = _add_bucket(keys, (distinct_values[i],))
         n_total += 1
-
-    return dict_bucket2span
-
-
-def bucket_attribute_specified_bucket_interval(
-    dict_obj=None, bucket_number=None, bucket_setting=None  # noqa
-):
-    # Bucketing different Attributes
-
-    # hardcoded_bucket_values = [set([float(0), float(1)])]
-
+    return keys, group_bucket
+
+
+def specified_bucket_interval_groups(
+    low_values, counts: np.ndarray, bucket_setting
+) -> Tuple[List[tuple], np.ndarray]:
+    """
+    Assign groups of samples to the buckets of `bucket_attribute_specified_bucket_interval`
+    :param low_values: the value of each group; in ascending order for numeric intervals, or in order of first
+        appearance for discrete intervals
+    :param counts: the number of samples of each group
+    :return: the bucket keys, and the index of the bucket of each group (-1 if none)
+    """
     # intervals = [0, (0,0.5], (0.5,0.9], (0.99,1]]
-    dict_span2att_val = dict_obj
     intervals = bucket_setting
-
-    dict_bucket2span = {}
-
-    # print("!!!!!!!enter into bucket_attribute_SpecifiedBucketInterval")
+    group_bucket = np.full(len(counts), -1, dtype=int)
+    keys: List[tuple] = []
 
     if isinstance(list(intervals)[0][0], str):  # discrete value, such as entity tags
-        dict_att_val2span = reverse_dict_discrete(dict_span2att_val)
-        dict_att_val2span = sort_dict(dict_att_val2span, flag="value")
-        for att_val, entity in dict_att_val2span.items():
-            att_val_tuple = (att_val,)
+        for i in np.argsort(-counts, kind="stable").tolist():
+            att_val_tuple = (low_values[i],)
             if att_val_tuple in intervals:
-                if att_val_tuple not in dict_bucket2span.keys():
-                    dict_bucket2span[att_val_tuple] = entity
-                else:
-                    dict_bucket2span[att_val_tuple] += entity
-
+                group_bucket[i] = _add_bucket(keys, att_val_tuple)
         for val in intervals:
-            if val not in dict_bucket2span.keys():
-                dict_bucket2span[val] = []
-    # print("dict_bucket2span: ",dict_bucket2span)
+            _add_bucket(keys, val)
     else:
-        # print("---debug----5")
-        # print(intervals)
-        dict_att_val2span = reverse_dict(dict_span2att_val)
-        dict_att_val2span = sort_dict(dict_att_val2span)
+        is_assigned = np.zeros(len(counts), dtype=bool)
         for v in intervals:
-            if len(v) == 1:
-                dict_bucket2span[v] = []
-            else:
-                dict_bucket2span[v] = []
+            _add_bucket(keys, v)
+        # each group goes to the first interval that contains it: [v0, v1] or the single value (v0,)
+        for bucket_index, v in enumerate(keys):
+            if not (len(v) in (1, 2) and all(isinstance(x, Number) for x in v)):
+                continue
+            begin = np.searchsorted(low_values, v[0], side="left")
+            end = np.searchsorted(low_values, v[-1], side="right")
+            groups = np.arange(begin, max(begin, end))
+            groups = groups[~is_assigned[groups]]
+            is_assigned[groups] = True
+            group_bucket[groups] = bucket_index
+    return keys, group_bucket
+
+
+def _bucket_members(
+    addresses, order: np.ndarray, counts: np.ndarray, group_bucket: np.ndarray, keys
+) -> dict:
+    """
+    Collect the samples of each bucket
+    :param order: the positions of the samples, sorted by group
+    :param counts: the number of samples in each group
+    :param group_bucket: the bucket index of each group
+    :return: a dictionary mapping bucket keys to their samples
+    """
+    position_bucket = np.repeat(group_bucket, counts)
+    by_bucket = order[np.argsort(position_bucket, kind="stable")]
+    bucket_sizes = np.bincount(position_bucket + 1, minlength=len(keys) + 1)
+    members = np.split(by_bucket, np.cumsum(bucket_sizes)[:-1].tolist())[1:]
+    return {
+        key: members[i]
+        if addresses is None
+        else [addresses[j] for j in members[i].tolist()]
+        for i, key in enumerate(keys)
+    }
+
+
+def _discrete_groups(values) -> Tuple[List[Any], np.ndarray, np.ndarray]:
+    """
+    :return: the distinct values in order of first appearance, the positions of the samples sorted by group, and
+        the number of samples of each value
+    """
+    distinct_values, group_ids = group_discrete_values(values)
+    counts = np.bincount(group_ids, minlength=len(distinct_values))
+    return distinct_values, np.argsort(group_ids, kind="stable"), counts
 
-        # print("debug-interval:\t", intervals)
 
-        for att_val, entity in dict_att_val2span.items():
-            res_key = find_key(dict_bucket2span, att_val)
-            # print("res-key:\t"+ str(res_key))
-            if res_key is None:
-                continue
-            dict_bucket2span[res_key] += entity
+def bucket_attribute_specified_bucket_value(
+    dict_obj=None, bucket_number=4, bucket_setting=None
+):
+    if dict_obj is None or len(dict_obj) == 0:
+        return None
+    addresses, values = _split_dict_obj(dict_obj)
+    order, distinct_values, counts = group_float_values(values)
+    keys, group_bucket = specified_bucket_value_groups(
+        distinct_values, distinct_values, counts, bucket_number, bucket_setting
+    )
+    return _bucket_members(addresses, order, counts, group_bucket, keys)
+
+
+def bucket_attribute_discrete_value(
+    dict_obj=None, bucket_number=100000000, bucket_setting=1
+):
+    addresses, values = _split_dict_obj(dict_obj)
+    distinct_values, order, counts = _discrete_groups(values)
+    keys, group_bucket = discrete_value_groups(
+        counts, distinct_values, bucket_number, bucket_setting
+    )
+    return _bucket_members(addresses, order, counts, group_bucket, keys)
 
-    return dict_bucket2span
+
+def bucket_attribute_specified_bucket_interval(
+    dict_obj=None, bucket_number=None, bucket_setting=None  # noqa
+):
+    addresses, values = _split_dict_obj(dict_obj)
+    if isinstance(list(bucket_setting)[0][0], str):
+        distinct_values, order, counts = _discrete_groups(values)
+    else:
+        order, distinct_values, counts = group_float_values(values)
+    keys, group_bucket = specified_bucket_interval_groups(
+        distinct_values, counts, bucket_setting
+    )
+    return _bucket_members(addresses, order, counts, group_bucket, keys)
@@ -0,0 +1,64 @@
+import hashlib
+import importlib.metadata
+import json
+import os
+from typing import Optional
+
+from explainaboard.utils.sqlite_cache import SQLiteCache
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "explainaboard", "entities.sqlite"
+)
+# the maximum number of texts whose entities are cached, about 100MB on disk for sentence-length texts
+DEFAULT_MAX_ENTRIES = 500000
+
+
+def spacy_model_version(model_name: str) -> str:
+    """
+    :param model_name: the name of a spacy model package, e.g. en_core_web_sm
+    :return: the version of the installed model package, or "unknown" if the model is not an installed package
+    """
+    try:
+        return importlib.metadata.version(model_name)
+    except (importlib.metadata.PackageNotFoundError, ValueError):
+        return "unknown"
+
+
+class EntityCache(SQLiteCache):
+    """
+    A persistent cache of the named entities that a spacy model finds in texts, in an SQLite database that maps a hash
+    of the text, the model name and the model version to the entities in the text. The cache holds the entities of at
+    most `max_entries` texts by evicting the least recently used ones. The database defaults to the
+    `EXPLAINABOARD_ENTITY_CACHE` environment variable or `~/.cache/explainaboard/entities.sqlite`.
+    """
+
+    table = "entities"
+    value_column = "entities"
+    value_type = "TEXT"
+    description = "entity cache"
+
+    def __init__(
+        self, path: Optional[str] = None, max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        super().__init__(
+            path or os.environ.get("EXPLAINABOARD_ENTITY_CACHE") or DEFAULT_CACHE_PATH,
+            max_entries,
+        )
+
+    def encode(self, value: list) -> str:
+        return json.dumps(value)
+
+    def decode(self, stored: str) -> list:
+        return [tuple(entity) for entity in json.loads(stored)]
+
+    @staticmethod
+    def make_key(text: str, model_name: str, version: str) -> bytes:
+        """
+        :param text: the text that entities are extracted from
+        :param model_name: the name of the spacy model
+        :param version: the version of the spacy model, see `spacy_model_version()`
+        :return: the cache key of the text's entities
+        """
+        return hashlib.blake2b(
+            json.dumps([text, model_name, version]).encode("utf8"), digest_size=16
+        ).digest()
@@ -1,8 +1,6 @@
 import numpy as np
-import scipy
 from random import choices
-from seqeval.metrics import precision_score, recall_score, f1_score
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 
 '''
@@ -11,10 +9,12 @@ Sequence Labeling
 
 
 def f1_score_seqeval(labels, predictions, language=None):
-    f1 = f1_score(labels, predictions)
-    precision = precision_score(labels, predictions)
-    recall = recall_score(labels, predictions)
-    return {'f1': f1 * 100, 'precision': precision * 100, 'recall': recall * 100}
+    scores = get_entity_scores(TagSequences(labels), TagSequences(predictions))
+    return {
+        'f1': scores['f1'],
+        'precision': scores['precision'],
+        'recall': scores['recall'],
+    }
 
 
 def get_chunks(seq):
@@ -73,6 +73,234 @@ def get_chunk_type(tok):
     return tok_split[0], tok_split[-1]
 
 
+class TagSequences:
+    """
+    The tag sequences of a corpus (e.g. the true or predicted tags of every sentence), with the tags encoded to
+    integer IDs so that chunks are extracted for the whole corpus at once:
+    - `entities()` extracts chunks like seqeval (compatible with conlleval.pl, for BIO and BIOES tags), and is used
+      to calculate P/R/F1 (see `get_entity_scores()`)
+    - `chunks()` extracts chunks like `get_chunks()`, and is used by featurization
+    """
+
+    def __init__(self, tag_sequences: List[List[str]]):
+        self.lengths = np.array([len(tags) for tags in tag_sequences], dtype=int)
+        self.offsets = np.zeros(len(self.lengths) + 1, dtype=int)
+        np.cumsum(self.lengths, out=self.offsets[1:])
+        tag_to_id = {'O': 0}
+        self.tag_ids = np.fromiter(
+            (
+                tag_to_id.setdefault(tag, len(tag_to_id))
+                for tags in tag_sequences
+                for tag in tags
+            ),
+            dtype=int,
+            count=int(self.offsets[-1]),
+        )
+        self.vocab: List[str] = list(tag_to_id)
+        self.default_id = 0
+
+    @classmethod
+    def from_tag_ids(
+        cls,
+        tag_ids: np.ndarray,
+        tag_id2str: List[str],
+        lengths: Optional[np.ndarray] = None,
+    ) -> "TagSequences":
+        """
+        :param tag_ids: the tag IDs of all sequences, concatenated
+        :param tag_id2str: the name of each tag ID
+        :param lengths: the length of each sequence, or None for a single sequence
+        :return: the same tag sequences as `TagSequences()` of the tag names
+        """
+        tag_sequences = cls([])
+        if lengths is None:
+            lengths = [len(tag_ids)]
+        tag_sequences.lengths = np.array(lengths, dtype=int)
+        tag_sequences.offsets = np.zeros(len(tag_sequences.lengths) + 1, dtype=int)
+        np.cumsum(tag_sequences.lengths, out=tag_sequences.offsets[1:])
+        # renumber the tags so that "O" is the default ID 0
+        tag_to_id = {'O': 0}
+        mapping = np.array(
+            [tag_to_id.setdefault(tag, len(tag_to_id)) for tag in tag_id2str],
+            dtype=int,
+        )
+        tag_sequences.tag_ids = mapping[tag_ids]
+        tag_sequences.vocab = list(tag_to_id)
+        return tag_sequences
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def _corpus_entities(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Extract chunks with the rules of seqeval's `get_entities()`, which sees the corpus as one sequence with an "O"
+        after every sentence
+        :return: the start, end (exclusive) and type of every chunk in that sequence
+        """
+        # the prefix and type of each tag, as in seqeval: "B-PER" -> "B", "PER"
+        prefixes = np.array([tag[:1] for tag in self.vocab] + ['O'], dtype=str)
+        type_names = [tag[1:].split('-', maxsplit=1)[-1] or '_' for tag in self.vocab]
+        # an extra type that differs from all others, for the beginning of the corpus
+        type_vocab, type_ids = np.unique(type_names + [''], return_inverse=True)
+        initial_id = len(self.vocab)
+
+        # the tags of the corpus, with an "O" after every sentence and the extra tag before the beginning
+        n_tokens = len(self.tag_ids) + len(self) + 1
+        corpus = np.full(n_tokens + 1, self.default_id, dtype=int)
+        corpus[0] = initial_id
+        token_positions = np.arange(len(self.tag_ids)) + np.repeat(
+            np.arange(len(self)), self.lengths
+        )
+        corpus[token_positions + 1] = self.tag_ids
+
+        prev_prefix, prefix = prefixes[corpus[:-1]], prefixes[corpus[1:]]
+        type_changes = type_ids[corpus[:-1]] != type_ids[corpus[1:]]
+        prefix_ends = np.isin(prefix, ['B', 'S', 'O'])
+        prefix_continues = np.isin(prefix, ['E', 'I'])
+        is_end = (
+            (prev_prefix == 'E')
+            | (prev_prefix == 'S')
+            | (((prev_prefix == 'B') | (prev_prefix == 'I')) & prefix_ends)
+            | ((prev_prefix != 'O') & (prev_prefix != '.') & type_changes)
+        )
+        is_start = (
+            (prefix == 'B')
+            | (prefix == 'S')
+            | (np.isin(prev_prefix, ['E', 'S', 'O']) & prefix_continues)
+            | ((prefix != 'O') & (prefix != '.') & type_changes)
+        )
+
+        # a chunk ending before position i began at the last start before i
+        start_positions = np.flatnonzero(is_start)
+        end_positions = np.flatnonzero(is_end)
+        # (or at 0 if no chunk started yet, as seqeval's `begin_offset` starts at 0)
+        begins = np.concatenate(([0], start_positions))[
+            np.searchsorted(start_positions, end_positions, side="left")
+        ]
+        chunk_types = type_vocab[type_ids[corpus[end_positions]]]
+
+        return begins, end_positions, chunk_types
+
+    def entities(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        :return: the sequence index, start, end (exclusive) and type of every chunk, as extracted by seqeval
+        """
+        begins, ends, chunk_types = self._corpus_entities()
+        # every sentence is followed by an "O" in the corpus
+        corpus_offsets = self.offsets + np.arange(len(self.offsets))
+        sequence_ids = np.maximum(
+            np.searchsorted(corpus_offsets, begins, side="right") - 1, 0
+        )
+        return (
+            sequence_ids,
+            begins - corpus_offsets[sequence_ids],
+            ends - corpus_offsets[sequence_ids],
+            chunk_types,
+        )
+
+    def chunks(self) -> List[List[Tuple[str, int, int]]]:
+        """
+        :return: the chunks of every sequence, the same as `get_chunks()`
+        """
+        classes = [tag.split('-')[0] for tag in self.vocab]
+        type_names = [tag.split('-')[-1] for tag in self.vocab]
+        type_vocab, type_ids = np.unique(type_names, return_inverse=True)
+        type_ids = type_ids.reshape(-1)[self.tag_ids]
+        is_begin = np.array([c == 'B' for c in classes], dtype=bool)[self.tag_ids]
+        is_default = self.tag_ids == self.default_id
+
+        is_start = ~is_default
+        is_start[1:] &= is_default[:-1] | (type_ids[1:] != type_ids[:-1]) | is_begin[1:]
+        is_start[self.offsets[:-1][self.lengths > 0]] = ~is_default[
+            self.offsets[:-1][self.lengths > 0]
+        ]
+
+        # a chunk ends at the next "O", start of chunk or end of sequence
+        starts = np.flatnonzero(is_start)
+        boundaries = np.union1d(np.flatnonzero(is_default | is_start), self.offsets)
+        ends = boundaries[np.searchsorted(boundaries, starts, side="right")]
+        sequence_ids = np.searchsorted(self.offsets, starts, side="right") - 1
+
+        chunks: List[List[Tuple[str, int, int]]] = [[] for _ in range(len(self))]
+        for sequence_id, chunk_type, start, end in zip(
+            sequence_ids.tolist(),
+            type_vocab[type_ids[starts]].tolist(),
+            (starts - self.offsets[sequence_ids]).tolist(),
+            (ends - self.offsets[sequence_ids]).tolist(),
+        ):
+            chunks[sequence_id].append((chunk_type, start, end))
+        return chunks
+
+
+def _prf(
+    n_correct: np.ndarray, n_pred: np.ndarray, n_true: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Precision, recall and F1 like seqeval, which are 0 when undefined
+    """
+    precision = n_correct / np.where(n_pred == 0, 1, n_pred)
+    recall = n_correct / np.where(n_true == 0, 1, n_true)
+    denom = precision + recall
+    denom[denom == 0.0] = 1
+    f1 = 2 * precision * recall / denom
+    return precision, recall, f1
+
+
+def get_entity_scores(true_tags: TagSequences, pred_tags: TagSequences) -> Dict:
+    """
+    Entity-level precision, recall and F1 (in %), the same as seqeval's micro-averaged scores, and the scores of every
+    entity type, computed from one chunk extraction of the true and predicted tags
+    :param true_tags: the true tags of every sentence
+    :param pred_tags: the predicted tags of every sentence
+    :return: a dictionary with "precision", "recall", "f1" and "per_type", which maps entity types to their
+        "precision", "recall", "f1" and "support" (number of true entities)
+    """
+    if not np.array_equal(true_tags.lengths, pred_tags.lengths):
+        raise ValueError('Found inconsistent lengths of true and predicted tags')
+
+    true_begins, true_ends, true_types = true_tags._corpus_entities()
+    pred_begins, pred_ends, pred_types = pred_tags._corpus_entities()
+    n_true_entities = len(true_begins)
+    type_vocab, type_ids = np.unique(
+        np.concatenate((true_types, pred_types)), return_inverse=True
+    )
+    type_ids = type_ids.reshape(-1)
+    # both corpora have the same length, as sentences have the same lengths
+    n_positions = len(true_tags.tag_ids) + len(true_tags) + 2
+    dims = (n_positions, n_positions, max(len(type_vocab), 1))
+    true_keys = np.ravel_multi_index(
+        (true_begins, true_ends, type_ids[:n_true_entities]), dims
+    )
+    pred_keys = np.ravel_multi_index(
+        (pred_begins, pred_ends, type_ids[n_true_entities:]), dims
+    )
+    correct_types = type_ids[:n_true_entities][np.isin(true_keys, pred_keys)]
+
+    n_types = len(type_vocab)
+    n_correct = np.bincount(correct_types, minlength=n_types)
+    n_pred = np.bincount(type_ids[n_true_entities:], minlength=n_types)
+    n_true = np.bincount(type_ids[:n_true_entities], minlength=n_types)
+
+    precision, recall, f1 = _prf(
+        np.array([n_correct.sum()]), np.array([n_pred.sum()]), np.array([n_true.sum()])
+    )
+    type_precision, type_recall, type_f1 = _prf(n_correct, n_pred, n_true)
+    return {
+        'f1': float(f1[0]) * 100,
+        'precision': float(precision[0]) * 100,
+        'recall': float(recall[0]) * 100,
+        'per_type': {
+            entity_type: {
+                'f1': float(type_f1[i]) * 100,
+                'precision': float(type_precision[i]) * 100,
+                'recall': float(type_recall[i]) * 100,
+                'support': int(n_true[i]),
+            }
+            for i, entity_type in enumerate(type_vocab.tolist())
+        },
+    }
+
+
 def accuracy(labels: List[str], predictions: List[str], language=None):
     correct = sum([int(p == l) for p, l in zip(predictions, labels)])
     accuracy_value = float(correct) / len(predictions)
@@ -80,6 +308,8 @@ def accuracy(labels: List[str], predictions: List[str], language=None):
 
 
 def mean_confidence_interval(data, confidence=0.95):
+    import scipy.stats
+
     a = 1.0 * np.array(data)
     n = len(a)
     m, se = np.mean(a), scipy.stats.sem(a)
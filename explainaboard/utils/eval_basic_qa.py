@@ -3,6 +3,8 @@ import string
 import re
 from typing import List
 
+import numpy as np
+
 
 '''
 QA
@@ -62,36 +64,43 @@ def metric_max_over_ground_truths(metric_fn, prediction: str, ground_truths: lis
     return max(scores_for_ground_truths)
 
 
-def exact_match_qa(true_answers: List[list], predicted_answer: List[str]):
-    exact_match = 0
-    total = 0
-    # for k1,k2 in zip(true_Anss,pred_Anss):
-    #     print(k1, k2)
-    for true_ans, pred_ans in zip(true_answers, predicted_answer):
-        total += 1
-        exact_match1 = metric_max_over_ground_truths(
-            exact_match_sample_level, pred_ans, true_ans
-        )
-
-        exact_match += exact_match1
+def exact_match_qa_sample_stats(
+    true_answers: List[list], predicted_answer: List[str]
+) -> np.ndarray:
+    """
+    Per-sample exact match, i.e. the additive statistic that `exact_match_qa` averages over. The score of any
+    subset of samples is `100 * stats[subset].mean()`.
+    """
+    return np.fromiter(
+        (
+            metric_max_over_ground_truths(exact_match_sample_level, pred_ans, true_ans)
+            for true_ans, pred_ans in zip(true_answers, predicted_answer)
+        ),
+        dtype=np.float64,
+    )
+
+
+def f1_score_qa_sample_stats(
+    true_answers: List[list], predicted_answer: List[str]
+) -> np.ndarray:
+    """
+    Per-sample F1, i.e. the additive statistic that `f1_score_qa` averages over. The score of any subset of
+    samples is `100 * stats[subset].mean()`.
+    """
+    return np.fromiter(
+        (
+            metric_max_over_ground_truths(f1_score_qa_sample_level, pred_ans, true_ans)
+            for true_ans, pred_ans in zip(true_answers, predicted_answer)
+        ),
+        dtype=np.float64,
+    )
 
-    exact_match = 100.0 * exact_match / total
 
-    return exact_match
+def exact_match_qa(true_answers: List[list], predicted_answer: List[str]):
+    sample_stats = exact_match_qa_sample_stats(true_answers, predicted_answer)
+    return float(100.0 * sample_stats.sum() / len(sample_stats))
 
 
 def f1_score_qa(true_answers: List[list], predicted_answer: List[str]):
-    f1_dataset_level = 0
-    total = 0
-
-    for true_ans, pred_ans in zip(true_answers, predicted_answer):
-        total += 1
-
-        f1_sample = metric_max_over_ground_truths(
-            f1_score_qa_sample_level, pred_ans, true_ans
-        )
-        f1_dataset_level += f1_sample
-
-    f1_dataset_level = 100.0 * f1_dataset_level / total
-
-    return f1_dataset_level
+    sample_stats = f1_score_qa_sample_stats(true_answers, predicted_answer)
+    return float(100.0 * sample_stats.sum() / len(sample_stats))
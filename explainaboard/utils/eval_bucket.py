@@ -1,6 +1,16 @@
+import numpy as np
+
+
 def f1_score_seqeval_bucket(pred_chunks, true_chunks):
+    """
+    :param pred_chunks: the predicted chunks, either hashable objects or an array of integer chunk keys
+    :param true_chunks: the true chunks, in the same format as `pred_chunks`
+    """
 
-    correct_preds = len(set(true_chunks) & set(pred_chunks))
+    if isinstance(pred_chunks, np.ndarray) and isinstance(true_chunks, np.ndarray):
+        correct_preds = len(np.intersect1d(true_chunks, pred_chunks))
+    else:
+        correct_preds = len(set(true_chunks) & set(pred_chunks))
     total_preds = len(pred_chunks)
     total_correct = len(true_chunks)
 
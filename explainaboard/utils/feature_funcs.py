@@ -1,7 +1,9 @@
-import sacrebleu
-from lexicalrichness import LexicalRichness
-from tqdm import tqdm
-from typing import Iterator, Callable, Any
+import numpy as np
+from typing import Iterator, Callable, Any, Sequence, Union
+
+from explainaboard.utils.statistics_builder import build_statistics
+from explainaboard.utils.token_cache import TokenizedTexts
+from explainaboard.utils.vocab_index import get_vocab_index
 
 
 BASIC_WORDS = (
@@ -12,6 +14,8 @@ BASIC_WORDS = (
 
 def get_similarity_by_sacrebleu(text1, text2):
     # pip install sacrebleu
+    import sacrebleu
+
     references = [text1]
     hypothesis = text2
     score = sacrebleu.sentence_bleu(hypothesis, references).score
@@ -39,6 +43,9 @@ def get_basic_words(sentence: str):
 
 def get_lexical_richness(sentence: str):
 
+    # lexicalrichness is slow to import, so it is only imported when the feature is calculated
+    from lexicalrichness import LexicalRichness
+
     # print(f"-------\n{sentence}\n")
     lex = LexicalRichness(sentence)
     results = 0
@@ -54,41 +61,81 @@ def get_lexical_richness(sentence: str):
 
 
 def accumulate_vocab_from_samples(samples: Iterator, text_from_sample: Callable):
-    vocab = {}
-    for sample in tqdm(samples):
-        for w in text_from_sample(sample).split(" "):
-            vocab[w] = vocab.get(w, 0) + 1
-    # the rank of each word based on its frequency
-    sorted_dict = {
-        key: rank
-        for rank, key in enumerate(sorted(set(vocab.values()), reverse=True), 1)
-    }
-    vocab_rank = {k: sorted_dict[v] for k, v in vocab.items()}
-    return {
-        "vocab": vocab,
-        "vocab_rank": vocab_rank,
-    }
+    return build_statistics(text_from_sample(sample) for sample in samples).statistics()
 
 
 def feat_freq_rank(
     existing_features: dict, statistics: Any, text_from_sample: Callable
 ):
     fre_rank = 0
+    vocab_rank = statistics['vocab_rank']
+    oov_rank = len(vocab_rank)
 
     tokens = text_from_sample(existing_features).split(" ")
     for w in tokens:
-        if w not in statistics['vocab_rank']:
-            fre_rank += len(statistics['vocab_rank'])
-        else:
-            fre_rank += statistics['vocab_rank'][w]
+        fre_rank += vocab_rank.get(w, oov_rank)
 
     fre_rank = fre_rank * 1.0 / len(tokens)
     return fre_rank
 
 
 def feat_num_oov(existing_features: dict, statistics: Any, text_from_sample: Callable):
-    num_oov = 0
-    for w in text_from_sample(existing_features).split(" "):
-        if w not in statistics['vocab'].keys():
-            num_oov += 1
-    return num_oov
+    vocab = statistics['vocab']
+    return sum(w not in vocab for w in text_from_sample(existing_features).split(" "))
+
+
+# --- Batch versions of the feature functions above, which take one text per sample (or the texts already tokenized
+# by a `TokenCache`) and return one value per sample
+
+
+def _tokenize(texts: Union[Sequence[str], TokenizedTexts]) -> TokenizedTexts:
+    return (
+        texts if isinstance(texts, TokenizedTexts) else TokenizedTexts.from_texts(texts)
+    )
+
+
+def batch_num_tokens(texts: Union[Sequence[str], TokenizedTexts]) -> np.ndarray:
+    """
+    Equivalent to `[len(text.split(" ")) for text in texts]`
+    """
+    if isinstance(texts, TokenizedTexts):
+        return texts.lengths()
+    return np.array([text.count(" ") + 1 for text in texts], dtype=int)
+
+
+def batch_num_chars(texts: Sequence[str]) -> np.ndarray:
+    """
+    Equivalent to `[len(text) for text in texts]`
+    """
+    return np.array([len(text) for text in texts], dtype=int)
+
+
+def batch_num_oov(
+    texts: Union[Sequence[str], TokenizedTexts], statistics: Any
+) -> np.ndarray:
+    """
+    Equivalent to `feat_num_oov()` applied to each text
+    """
+    tokenized = _tokenize(texts)
+    is_oov = get_vocab_index(statistics).is_oov(tokenized.vocab)
+    return np.bincount(
+        tokenized.text_ids()[is_oov[tokenized.token_ids]], minlength=len(tokenized)
+    )
+
+
+def batch_freq_rank(
+    texts: Union[Sequence[str], TokenizedTexts], statistics: Any
+) -> np.ndarray:
+    """
+    Equivalent to `feat_freq_rank()` applied to each text
+    """
+    tokenized = _tokenize(texts)
+    ranks = get_vocab_index(statistics).rank(tokenized.vocab)
+    rank_sum = np.bincount(
+        tokenized.text_ids(),
+        weights=ranks[tokenized.token_ids],
+        minlength=len(tokenized),
+    )
+    lengths = tokenized.lengths()
+    # texts without tokens (only from `TokenizedTexts.from_token_lists()`) have a rank of 0
+    return np.divide(rank_sum, lengths, out=np.zeros(len(tokenized)), where=lengths > 0)
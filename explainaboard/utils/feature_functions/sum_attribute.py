@@ -1,13 +1,24 @@
 # %%
-import nltk
-from nltk import word_tokenize, sent_tokenize
+from bisect import bisect_left
+from functools import lru_cache
+
 from collections import namedtuple, Counter
-from nltk.util import ngrams
 
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
+
+@lru_cache(maxsize=None)
+def _load_tokenizers():
+    """
+    Import nltk and download its sentence tokenizer models if they are missing. Importing nltk is slow, so this is
+    only done on the first tokenization.
+    :return: nltk's `sent_tokenize` and `word_tokenize`
+    """
+    import nltk
+
+    try:
+        nltk.data.find('tokenizers/punkt')
+    except LookupError:
+        nltk.download('punkt')
+    return nltk.sent_tokenize, nltk.word_tokenize
 
 
 class SUMAttribute:
@@ -47,17 +58,31 @@ class SUMAttribute:
             "attr_hypothesis_len": 0.0,
         }
 
+    def tokenize(self, doc):
+        """
+        Split a document into sentences of tokens, the same tokens as `word_tokenize(doc)`
+        :return: a list of lists of tokens
+        """
+        sent_tokenize, word_tokenize = _load_tokenizers()
+        return [word_tokenize(sent, preserve_line=True) for sent in sent_tokenize(doc)]
+
     def cal_attributes_each(self, text, summary):
 
+        # Tokenize once, the attributes below are calculated from the same tokens
+        text_sents = self.tokenize(text)
+        summary_sents = self.tokenize(summary)
+
         # Normalize text
-        tokenized_text = word_tokenize(text)
-        tokenized_summary = word_tokenize(summary)
-        normalized_text = [str(t).lower() for t in tokenized_text]
-        normalized_summary = [str(t).lower() for t in tokenized_summary]
+        normalized_text_sents = [[str(t).lower() for t in sent] for sent in text_sents]
+        normalized_summary_sents = [
+            [str(t).lower() for t in sent] for sent in summary_sents
+        ]
+        normalized_text = [t for sent in normalized_text_sents for t in sent]
+        normalized_summary = [t for sent in normalized_summary_sents for t in sent]
 
         # Calculate matches
         matches = self.overlap(normalized_summary, normalized_text)
-        summary_len = len(tokenized_summary)
+        summary_len = len(normalized_summary)
 
         if summary_len == 0:
             density, coverage, compression = 0, 0, 0
@@ -67,12 +92,12 @@ class SUMAttribute:
             # Coverage
             coverage = sum(o.length for o in matches) / summary_len
             # Compression
-            compression = len(tokenized_text) / summary_len
+            compression = len(normalized_text) / summary_len
 
         # Repetition
-        repetition = self.cal_repetition(summary)
+        repetition = self._repetition(normalized_summary_sents)
         # Novelty
-        novelty = self.cal_novelty(text, summary)
+        novelty = self._novelty(normalized_text_sents, normalized_summary_sents)
 
         # Copy length
         copy_lens = [o.length for o in matches]
@@ -91,29 +116,32 @@ class SUMAttribute:
             "attr_hypothesis_len": len(normalized_summary),
         }
 
+    def _count_ngrams(self, sents, n):
+        # n-grams do not cross sentence boundaries
+        counter = Counter()
+        for sent in sents:
+            counter.update(zip(*[sent[i:] for i in range(n)]))
+        return counter
+
     def get_ngrams(self, doc, n):
-        doc = doc.lower()
-        doc_sents = sent_tokenize(doc)
         _ngrams = []
-        for sent in doc_sents:
-            sent = word_tokenize(sent)
-            _ngrams.extend(list(ngrams(sent, n=n)))
+        for sent in self.tokenize(doc.lower()):
+            _ngrams.extend(zip(*[sent[i:] for i in range(n)]))
         return _ngrams
 
     def cal_novelty(self, text, summary, n=2):
         """Proportion of segments in the summaries that haven’t appeared in source documents.
         The segments can be instantiated as n-grams.
         """
-        cnt_all = 0
-        cnt_nov = 0
-        _ngrams_text = self.get_ngrams(text, n=n)
-        _ngrams_summary = self.get_ngrams(summary, n=n)
-        counter_text = Counter(_ngrams_text)
-        counter_summary = Counter(_ngrams_summary)
-        for k, v in counter_summary.items():
-            cnt_all += v
-            if k not in counter_text:
-                cnt_nov += v
+        return self._novelty(
+            self.tokenize(text.lower()), self.tokenize(summary.lower()), n=n
+        )
+
+    def _novelty(self, text_sents, summary_sents, n=2):
+        counter_text = self._count_ngrams(text_sents, n)
+        counter_summary = self._count_ngrams(summary_sents, n)
+        cnt_all = sum(counter_summary.values())
+        cnt_nov = sum(v for k, v in counter_summary.items() if k not in counter_text)
         if cnt_all == 0:
             return 0
         else:
@@ -121,14 +149,12 @@ class SUMAttribute:
 
     def cal_repetition(self, summary, n=3):
         """Measures the rate of repeated segments in summaries. We choose n-gram as segment unit."""
-        cnt_all = 0
-        cnt_rep = 0
-        _ngrams = self.get_ngrams(summary, n=n)
-        counter = Counter(_ngrams)
-        for k, v in counter.items():
-            cnt_all += v
-            if v >= 2:
-                cnt_rep += v - 1
+        return self._repetition(self.tokenize(summary.lower()), n=n)
+
+    def _repetition(self, summary_sents, n=3):
+        counter = self._count_ngrams(summary_sents, n)
+        cnt_all = sum(counter.values())
+        cnt_rep = sum(v - 1 for v in counter.values() if v >= 2)
         if cnt_all == 0:
             return 0
         else:
@@ -141,17 +167,50 @@ class SUMAttribute:
             - summary (int): the start index of the match in the summary
             - text (int): the start index of the match in the reference
             - length (int): the length of the extractive fragment
+
+        For every summary position, this is the greedy matcher of Grusky et al. (2018): the text is scanned from
+        the start, the scan resumes after each matched fragment, and the first of the longest fragments is kept.
+        Fragments of one token never make the scan skip text positions, so it is enough to take the first
+        occurrence of the summary token and to walk the occurrences of the summary bigram, which are looked up in
+        an index of the text built in one pass, instead of visiting every text position.
         """
+        # index the text positions of the summary tokens: the first position of each token, and the positions of
+        # each bigram in increasing order
+        summary_tokens = set(a)
+        summary_bigrams = set(zip(a, a[1:]))
+        candidates = [
+            b_position for b_position, token in enumerate(b) if token in summary_tokens
+        ]
+        first_positions = {}
+        bigram_positions = {}
+        for b_position in candidates:
+            token = b[b_position]
+            if token not in first_positions:
+                first_positions[token] = b_position
+            if b_position + 1 < len(b):
+                bigram = (token, b[b_position + 1])
+                if bigram in summary_bigrams:
+                    bigram_positions.setdefault(bigram, []).append(b_position)
+
         matches = []
         a_start = 0
-        b_start = 0
         while a_start < len(a):
             best_match = None
             best_match_length = 0
-            while b_start < len(b):
-                if a[a_start] == b[b_start]:
-                    a_end = a_start
-                    b_end = b_start
+            first_position = first_positions.get(a[a_start])
+            if first_position is not None:
+                best_match = SUMAttribute.Match(a_start, first_position, 1)
+                best_match_length = 1
+                occurrences = bigram_positions.get(tuple(a[a_start : a_start + 2]), [])
+                max_length = len(a) - a_start
+                k = 0
+                while k < len(occurrences):
+                    b_start = occurrences[k]
+                    if len(b) - b_start <= best_match_length:
+                        # no later fragment can be longer
+                        break
+                    a_end = a_start + 2
+                    b_end = b_start + 2
                     while a_end < len(a) and b_end < len(b) and b[b_end] == a[a_end]:
                         b_end += 1
                         a_end += 1
@@ -159,13 +218,12 @@ class SUMAttribute:
                     if length > best_match_length:
                         best_match = SUMAttribute.Match(a_start, b_start, length)
                         best_match_length = length
-                    b_start = b_end
-                else:
-                    b_start += 1
-            b_start = 0
+                        if length == max_length:
+                            break
+                    # the scan resumes at the end of the fragment
+                    k = bisect_left(occurrences, b_end, k + 1)
             if best_match:
-                if best_match_length > 0:
-                    matches.append(best_match)
+                matches.append(best_match)
                 a_start += best_match_length
             else:
                 a_start += 1
@@ -0,0 +1,62 @@
+import importlib
+from typing import Callable
+
+
+class LazyAggregating:
+    """
+    A training set statistics function that is only wrapped into a DataLab aggregating operation when the operation is
+    used, so that defining the function does not import DataLab. Like the operation, it keeps the original function in
+    `func`, and the keyword arguments it is called with in `resources` (e.g. the tag names of a dataset), which are
+    passed on to the operation.
+    """
+
+    def __init__(self, aggregating: str, func: Callable, **kwargs):
+        """
+        :param aggregating: the import path of the DataLab aggregating decorator
+        :param func: the statistics function
+        :param kwargs: the arguments of the aggregating decorator
+        """
+        self.func = func
+        self.resources = dict(kwargs.get("resources") or {})
+        self._aggregating = aggregating
+        self._kwargs = kwargs
+        self._operation = None
+
+    def operation(self):
+        """
+        :return: the DataLab aggregating operation, which is created (and DataLab imported) on the first call, with the
+                 current `resources`
+        """
+        if self._operation is None:
+            module_name, name = self._aggregating.rsplit(".", 1)
+            aggregating = getattr(importlib.import_module(module_name), name)
+            self._operation = aggregating(**self._kwargs)(self.func)
+        self._operation.resources = self.resources
+        return self._operation
+
+    def __call__(self, *args, **kwargs):
+        return self.operation()(*args, **kwargs)
+
+
+def lazy_aggregating(aggregating: str, **kwargs):
+    """
+    A decorator that is used like the DataLab aggregating decorators, but defers importing DataLab. For example,
+    `@lazy_aggregating("datalabs.operations.aggregate.text_classification.text_classification_aggregating", ...)`
+    :param aggregating: the import path of the DataLab aggregating decorator
+    :param kwargs: the arguments of the aggregating decorator
+    """
+
+    def lazy_aggregating_fn(func):
+        return LazyAggregating(aggregating, func, **kwargs)
+
+    return lazy_aggregating_fn
+
+
+def get_operation(statistics_func: Callable):
+    """
+    :param statistics_func: a statistics function, either a `LazyAggregating` or a DataLab operation
+    :return: the DataLab operation, to be applied to a dataset
+    """
+    if isinstance(statistics_func, LazyAggregating):
+        return statistics_func.operation()
+    return statistics_func
@@ -0,0 +1,197 @@
+import argparse
+import json
+import mmap
+import os
+import pickle
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any, Iterator, List, Sequence, Union
+
+import numpy as np
+
+_MAGIC = b"EXBTAB1\0"
+# the magic number, then the number of keys, the width of the keys and the size of the value data, as little-endian
+# uint64
+_HEADER_SIZE = len(_MAGIC) + 3 * 8
+_UINT64 = np.dtype("<u8")
+
+
+def write_resource_table(path: str, table: Union[dict, list]):
+    """
+    Write a lookup table in the resource table format: the offsets of the values, the UTF-8 keys sorted bytewise and
+    padded with null bytes to the same width, and the concatenated JSON-encoded values.
+    :param path: the path of the resource table
+    :param table: a dictionary with string keys and JSON-serializable values, or a list of strings that is stored as
+                  keys with `None` values
+    """
+    if isinstance(table, list):
+        table = dict.fromkeys(table)
+    items = sorted((k.encode("utf8"), v) for k, v in table.items())
+    if any(k.endswith(b"\0") for k, _ in items):
+        raise ValueError("keys of a resource table can not end with a null character")
+    keys = np.array([k for k, _ in items], dtype=bytes)
+    if keys.itemsize == 0:
+        keys = keys.astype("S1")
+    values = [json.dumps(v, ensure_ascii=False).encode("utf8") for _, v in items]
+    value_offsets = np.zeros(len(values) + 1, dtype=_UINT64)
+    np.cumsum([len(v) for v in values], out=value_offsets[1:])
+    with open(path, "wb") as f:
+        f.write(_MAGIC)
+        f.write(
+            np.array(
+                [len(keys), keys.itemsize, value_offsets[-1]], dtype=_UINT64
+            ).tobytes()
+        )
+        f.write(value_offsets.tobytes())
+        f.write(keys.tobytes())
+        f.write(b"".join(values))
+
+
+class ResourceTable(Mapping):
+    """
+    A read-only dictionary backed by a memory-mapped file in the format of `write_resource_table()`. Opening the
+    table only maps the file, keys are looked up with `np.searchsorted()` in the mapped array of sorted keys, and only
+    the values that are looked up are decoded. Tables are pickled by path, so they can be sent to worker processes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{path} is not a resource table")
+        num_keys, key_width, _ = np.frombuffer(
+            self._mmap, dtype=_UINT64, count=3, offset=len(_MAGIC)
+        ).tolist()
+        self._value_offsets = np.frombuffer(
+            self._mmap, dtype=_UINT64, count=num_keys + 1, offset=_HEADER_SIZE
+        )
+        self._keys_start = _HEADER_SIZE + 8 * (num_keys + 1)
+        self._keys = np.frombuffer(
+            self._mmap, dtype=f"S{key_width}", count=num_keys, offset=self._keys_start
+        )
+        self._values_start = self._keys_start + num_keys * key_width
+
+    def _find(self, keys: List[str]) -> np.ndarray:
+        """
+        :return: the index of each key, or -1 for the keys that are not in the table
+        """
+        encoded = [k.encode("utf8") for k in keys]
+        queries = np.array(encoded, dtype=bytes)
+        if len(self._keys) == 0 or len(queries) == 0:
+            return np.full(len(queries), -1)
+        positions = np.minimum(
+            np.searchsorted(self._keys, queries), len(self._keys) - 1
+        )
+        # a key that ends with null bytes would match the padding of another key
+        is_found = (self._keys[positions] == queries) & np.array(
+            [not k.endswith(b"\0") for k in encoded], dtype=bool
+        )
+        return np.where(is_found, positions, -1)
+
+    def _find_one(self, key: str) -> int:
+        """
+        Same as `_find()` for one key, by binary search over the padded keys in the mapped file, which is faster than
+        going through numpy for a single key
+        :return: the index of the key, or -1 if it is not in the table
+        """
+        encoded = key.encode("utf8")
+        width = self._keys.itemsize
+        if len(encoded) > width or encoded.endswith(b"\0"):
+            return -1
+        padded = encoded.ljust(width, b"\0")
+        lo, hi = 0, len(self._keys)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = self._keys_start + mid * width
+            if self._mmap[start : start + width] < padded:
+                lo = mid + 1
+            else:
+                hi = mid
+        start = self._keys_start + lo * width
+        if lo < len(self._keys) and self._mmap[start : start + width] == padded:
+            return lo
+        return -1
+
+    def _values(self, indices: List[int]) -> List[Any]:
+        """
+        :return: the values at the indices, decoded as one JSON array
+        """
+        indices = np.asarray(indices, dtype=int)
+        starts = (self._value_offsets[indices] + self._values_start).tolist()
+        ends = (self._value_offsets[indices + 1] + self._values_start).tolist()
+        return json.loads(
+            b"[" + b",".join(self._mmap[s:e] for s, e in zip(starts, ends)) + b"]"
+        )
+
+    def get_many(self, keys: Sequence[str], default: Any = None) -> List[Any]:
+        """
+        Look up many keys at once, decoding the value of each distinct key once
+        :param keys: the keys
+        :param default: the value of the keys that are not in the table
+        :return: the value of each key
+        """
+        positions = self._find(list(keys))
+        found = np.unique(positions[positions >= 0]).tolist()
+        distinct = dict(zip(found, self._values(found)))
+        return [distinct.get(i, default) for i in positions.tolist()]
+
+    def __getitem__(self, key: str) -> Any:
+        i = self._find_one(key) if isinstance(key, str) else -1
+        if i < 0:
+            raise KeyError(key)
+        start, end = self._value_offsets[i : i + 2].tolist()
+        return json.loads(
+            self._mmap[self._values_start + start : self._values_start + end]
+        )
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._find_one(key) >= 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[str]:
+        return (k.decode("utf8") for k in self._keys.tolist())
+
+    def __reduce__(self):
+        return ResourceTable, (self.path,)
+
+
+@lru_cache(maxsize=None)
+def get_resource_table(path: str) -> ResourceTable:
+    """
+    :param path: the path of a resource table
+    :return: the table, which is opened on the first call and shared by later calls with the same path
+    """
+    return ResourceTable(path)
+
+
+def convert_resource(source_path: str, target_path: str):
+    """
+    Convert a JSON or pickle lookup table (a dictionary or a list of strings) into a resource table
+    :param source_path: the path of a .json or .pkl file
+    :param target_path: the path of the resource table
+    """
+    if os.path.splitext(source_path)[1] == ".pkl":
+        # only for the trusted resources shipped with ExplainaBoard
+        with open(source_path, "rb") as f:
+            table = pickle.load(f)
+    else:
+        with open(source_path, "r", encoding="utf8") as f:
+            table = json.load(f)
+    write_resource_table(target_path, table)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert a JSON or pickle lookup table into a resource table"
+    )
+    parser.add_argument("source", type=str, help="the .json or .pkl file")
+    parser.add_argument("target", type=str, help="the resource table to write")
+    args = parser.parse_args()
+    convert_resource(args.source, args.target)
+
+
+if __name__ == '__main__':
+    main()
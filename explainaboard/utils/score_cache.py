@@ -0,0 +1,60 @@
+import hashlib
+import json
+import os
+from typing import Optional
+
+from explainaboard.utils.sqlite_cache import SQLiteCache
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "explainaboard", "scores.sqlite"
+)
+# the maximum number of cached scores, about 100MB on disk
+DEFAULT_MAX_ENTRIES = 1000000
+
+
+def sample_digest(sample: dict) -> bytes:
+    """
+    :param sample: a dictionary with the "source", "references" and "hypothesis" of a sample
+    :return: a digest of the sample's texts
+    """
+    texts = json.dumps(
+        [sample.get("source"), sample.get("references"), sample.get("hypothesis")]
+    )
+    return hashlib.blake2b(texts.encode("utf8"), digest_size=16).digest()
+
+
+class ScoreCache(SQLiteCache):
+    """
+    A persistent cache of sample-level scores in an SQLite database, which maps a hash of the sample's texts, the
+    metric name and the metric version to the score of the sample. The cache holds at most `max_entries` scores by
+    evicting the least recently used ones. The database defaults to the `EXPLAINABOARD_SCORE_CACHE` environment
+    variable or `~/.cache/explainaboard/scores.sqlite`.
+    """
+
+    table = "sample_scores"
+    value_column = "score"
+    value_type = "REAL"
+    description = "score cache"
+
+    def __init__(
+        self, path: Optional[str] = None, max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        super().__init__(
+            path or os.environ.get("EXPLAINABOARD_SCORE_CACHE") or DEFAULT_CACHE_PATH,
+            max_entries,
+        )
+
+    def encode(self, value: float) -> float:
+        return float(value)
+
+    @staticmethod
+    def make_key(digest: bytes, metric: str, version: str) -> bytes:
+        """
+        :param digest: the digest of a sample, see `sample_digest()`
+        :param metric: the name of the metric
+        :param version: the version of the metric implementation
+        :return: the cache key of the sample's score
+        """
+        return hashlib.blake2b(
+            digest + json.dumps([metric, version]).encode("utf8"), digest_size=16
+        ).digest()
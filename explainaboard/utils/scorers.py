@@ -0,0 +1,496 @@
+import hashlib
+import importlib.metadata
+import os
+import re
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import sacrebleu
+
+from explainaboard.utils.score_cache import sample_digest, ScoreCache
+
+
+_scorer_registry: dict = {}
+
+
+def get_scorer(name: str, **kwargs) -> "Scorer":
+    """
+    return a scorer based on its name, e.g. "eaas" or "local"
+    :param kwargs: the arguments of the scorer's constructor
+    """
+    if name not in _scorer_registry:
+        raise ValueError(
+            f'unknown scorer {name}, supported scorers: {list(_scorer_registry)}'
+        )
+    return _scorer_registry[name](**kwargs)
+
+
+def register_scorer(name: str):
+    """
+    a register for scoring backends.
+    example usage: `@register_scorer("local")`
+    """
+
+    def register_scorer_fn(cls):
+        _scorer_registry[name] = cls
+        return cls
+
+    return register_scorer_fn
+
+
+class Scorer:
+    """
+    Scores generated texts against their references. A scorer returns a dictionary with
+    - "corpus_level": a dictionary mapping "corpus_<metric name>" to the corpus-level score of each metric
+    - "sample_level": a list with, for every sample, a dictionary mapping metric names to its scores
+    """
+
+    # whether the scores can be cached across runs (see `CachedScorer`), i.e. `version()` identifies the
+    # implementation of each metric
+    cacheable = True
+
+    def score(self, inputs: List[Dict], metrics: List[str], lang: str = "en") -> dict:
+        """
+        :param inputs: a list of dictionaries with the "source", "references" (a list) and "hypothesis" of each sample
+        :param metrics: the names of the metrics to calculate
+        :param lang: the language of the texts
+        :return: the corpus-level and sample-level scores
+        """
+        raise NotImplementedError
+
+    def version(self, metric: str) -> str:
+        """
+        :return: the version of the implementation of a metric, which changes whenever its scores may change
+        """
+        return type(self).__name__
+
+    def can_aggregate(self, metric: str) -> bool:
+        """
+        :return: whether `aggregate()` can calculate the corpus-level score of a metric
+        """
+        return False
+
+    def aggregate(
+        self, inputs: List[Dict], metric: str, sample_scores: List[float]
+    ) -> float:
+        """
+        Calculate the corpus-level score of a metric without scoring samples again
+        :param inputs: the samples
+        :param metric: the name of the metric
+        :param sample_scores: the sample-level scores of the metric
+        :return: the corpus-level score
+        """
+        raise NotImplementedError
+
+    def has_sample_stats(self, metric: str) -> bool:
+        """
+        :return: whether `get_sample_stats()` can reduce samples to additive statistics of a metric
+        """
+        return False
+
+    def get_sample_stats(
+        self, inputs: List[Dict], metric: str, sample_scores: List[float]
+    ) -> np.ndarray:
+        """
+        Reduce every sample to a row of additive statistics of a metric, so that its corpus-level score over any set
+        of samples can be calculated from the sum of their rows by `score_from_stats_sum()`, e.g. while streaming
+        over chunks of samples
+        :param inputs: the samples
+        :param metric: the name of the metric
+        :param sample_scores: the sample-level scores of the metric
+        :return: an array of shape (n_samples, n_stats)
+        """
+        raise NotImplementedError
+
+    def score_from_stats_sum(self, metric: str, stats_sum: np.ndarray) -> float:
+        """
+        :param metric: the name of the metric
+        :param stats_sum: the sum of `get_sample_stats()` over samples, followed by the number of samples
+        :return: the corpus-level score of the samples
+        """
+        raise NotImplementedError
+
+    def score_async(
+        self, inputs: List[Dict], metrics: List[str], lang: str = "en"
+    ) -> Future:
+        """
+        Start scoring in the background, e.g. while features are calculated
+        :return: a future of the result of `score()`
+        """
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(self.score, inputs, metrics, lang)
+        executor.shutdown(wait=False)
+        return future
+
+
+@register_scorer("eaas")
+class EaaSScorer(Scorer):
+    """
+    Sends the whole corpus to the EaaS service. Its scores are not cached, since the service does not report the
+    version of its metrics and the local version of the `eaas` client does not identify them.
+    """
+
+    cacheable = False
+
+    def __init__(self, client=None):
+        self._client = client
+
+    def score(self, inputs: List[Dict], metrics: List[str], lang: str = "en") -> dict:
+        if self._client is None:
+            from explainaboard.utils.async_eaas import make_eaas_client
+
+            self._client = make_eaas_client()
+        return self._client.score(
+            inputs, task="sum", metrics=metrics, lang=lang, cal_attributes=False
+        )
+
+    def version(self, metric: str) -> str:
+        return f"eaas-{importlib.metadata.version('eaas')}"
+
+
+@register_scorer("local")
+class LocalScorer(Scorer):
+    """
+    Computes BLEU (with sacrebleu) and ROUGE-1/2/L F-measures (like the `rouge_score` package) in-process, without
+    a round-trip to EaaS. Sample-level scores are computed in `num_workers` processes (all cores by default) for
+    corpora of more than `chunk_size` samples. BLEU is on a 0-100 scale, ROUGE on a 0-1 scale, and the corpus-level
+    ROUGE scores are averages of the sample-level ones. All metrics can be reduced to additive sample statistics.
+    """
+
+    supported_metrics = ["bleu", "rouge1", "rouge2", "rougeL"]
+
+    def __init__(
+        self,
+        num_workers: Optional[int] = None,
+        chunk_size: int = 1000,
+        use_stemmer: bool = True,
+    ):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.use_stemmer = use_stemmer
+
+    def score(self, inputs: List[Dict], metrics: List[str], lang: str = "en") -> dict:
+        unsupported = [m for m in metrics if m not in self.supported_metrics]
+        if unsupported:
+            raise ValueError(
+                f'metrics {unsupported} are not supported by the local scorer, '
+                f'supported metrics: {self.supported_metrics}'
+            )
+        hypotheses = [x["hypothesis"] for x in inputs]
+        references = [x["references"] for x in inputs]
+
+        chunks = [
+            (
+                hypotheses[start : start + self.chunk_size],
+                references[start : start + self.chunk_size],
+                metrics,
+                self.use_stemmer,
+            )
+            for start in range(0, len(inputs), self.chunk_size)
+        ]
+        if self.num_workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(
+                max_workers=min(self.num_workers, len(chunks))
+            ) as executor:
+                chunk_scores = list(executor.map(_score_chunk, chunks))
+        else:
+            chunk_scores = [_score_chunk(chunk) for chunk in chunks]
+        sample_level = [scores for chunk in chunk_scores for scores in chunk]
+
+        corpus_level = {
+            "corpus_"
+            + metric: self.aggregate(
+                inputs, metric, [scores[metric] for scores in sample_level]
+            )
+            for metric in metrics
+        }
+        return {"corpus_level": corpus_level, "sample_level": sample_level}
+
+    def version(self, metric: str) -> str:
+        if metric == "bleu":
+            return f"sacrebleu-{sacrebleu.__version__}"
+        return f"rouge-1{'-stemmed' if self.use_stemmer else ''}"
+
+    def can_aggregate(self, metric: str) -> bool:
+        return metric in self.supported_metrics
+
+    def aggregate(
+        self, inputs: List[Dict], metric: str, sample_scores: List[float]
+    ) -> float:
+        if metric == "bleu":
+            return corpus_bleu(
+                [x["hypothesis"] for x in inputs], [x["references"] for x in inputs]
+            )
+        return float(np.mean(sample_scores)) if sample_scores else 0.0
+
+    def has_sample_stats(self, metric: str) -> bool:
+        return metric in self.supported_metrics
+
+    def get_sample_stats(
+        self, inputs: List[Dict], metric: str, sample_scores: List[float]
+    ) -> np.ndarray:
+        if metric == "bleu":
+            # n-gram matches and counts, since corpus BLEU is not an average of sentence BLEU
+            return bleu_sample_stats(
+                [x["hypothesis"] for x in inputs], [x["references"] for x in inputs]
+            )
+        return np.array(sample_scores, dtype=float).reshape(-1, 1)
+
+    def score_from_stats_sum(self, metric: str, stats_sum: np.ndarray) -> float:
+        if metric == "bleu":
+            return bleu_from_stats(stats_sum[:-1])
+        return float(stats_sum[0] / stats_sum[-1]) if stats_sum[-1] else 0.0
+
+
+class CachedScorer(Scorer):
+    """
+    Looks up sample-level scores in a `ScoreCache` and only passes the samples that are not cached (e.g. new or
+    changed ones) to `scorer`. Metrics whose corpus-level score can not be calculated from sample-level scores (see
+    `Scorer.aggregate()`) are cached along with the corpus-level score of the whole corpus, and are scored again for
+    the whole corpus when any sample changes.
+    """
+
+    def __init__(self, scorer: Scorer, cache: Optional[ScoreCache] = None):
+        self.scorer = scorer
+        self.cache = cache or ScoreCache()
+
+    def version(self, metric: str) -> str:
+        return self.scorer.version(metric)
+
+    def can_aggregate(self, metric: str) -> bool:
+        return self.scorer.can_aggregate(metric)
+
+    def aggregate(
+        self, inputs: List[Dict], metric: str, sample_scores: List[float]
+    ) -> float:
+        return self.scorer.aggregate(inputs, metric, sample_scores)
+
+    def has_sample_stats(self, metric: str) -> bool:
+        return self.scorer.has_sample_stats(metric)
+
+    def get_sample_stats(
+        self, inputs: List[Dict], metric: str, sample_scores: List[float]
+    ) -> np.ndarray:
+        return self.scorer.get_sample_stats(inputs, metric, sample_scores)
+
+    def score_from_stats_sum(self, metric: str, stats_sum: np.ndarray) -> float:
+        return self.scorer.score_from_stats_sum(metric, stats_sum)
+
+    def score(self, inputs: List[Dict], metrics: List[str], lang: str = "en") -> dict:
+        digests = [sample_digest(x) for x in inputs]
+        corpus_digest = hashlib.blake2b(b"".join(digests), digest_size=16).digest()
+        versions = {metric: f"{self.version(metric)}:{lang}" for metric in metrics}
+        keys = {
+            metric: [
+                self.cache.make_key(digest, metric, versions[metric])
+                for digest in digests
+            ]
+            for metric in metrics
+        }
+        corpus_keys = {
+            metric: self.cache.make_key(
+                corpus_digest, "corpus_" + metric, versions[metric]
+            )
+            for metric in metrics
+        }
+        cached = self.cache.get_many(
+            [key for ks in keys.values() for key in ks] + list(corpus_keys.values())
+        )
+        new_scores = {}
+
+        # metrics whose corpus-level score is calculated from sample-level scores: score the samples not cached
+        sample_metrics = [metric for metric in metrics if self.can_aggregate(metric)]
+        missing = [
+            i
+            for i in range(len(inputs))
+            if any(keys[metric][i] not in cached for metric in sample_metrics)
+        ]
+        if missing:
+            scores = self.scorer.score(
+                [inputs[i] for i in missing], sample_metrics, lang
+            )
+            for i, sample_level in zip(missing, scores["sample_level"]):
+                for metric in sample_metrics:
+                    new_scores[keys[metric][i]] = sample_level[metric]
+
+        # other metrics: score the whole corpus unless it was scored before
+        corpus_metrics = [
+            metric
+            for metric in metrics
+            if metric not in sample_metrics
+            and (
+                corpus_keys[metric] not in cached
+                or any(key not in cached for key in keys[metric])
+            )
+        ]
+        if corpus_metrics:
+            scores = self.scorer.score(inputs, corpus_metrics, lang)
+            for metric in corpus_metrics:
+                new_scores[corpus_keys[metric]] = scores["corpus_level"][
+                    "corpus_" + metric
+                ]
+                for key, sample_level in zip(keys[metric], scores["sample_level"]):
+                    new_scores[key] = sample_level[metric]
+
+        if new_scores:
+            self.cache.put_many(new_scores)
+        cached.update(new_scores)
+        sample_scores = {
+            metric: [cached[key] for key in keys[metric]] for metric in metrics
+        }
+        return {
+            "corpus_level": {
+                "corpus_"
+                + metric: (
+                    self.aggregate(inputs, metric, sample_scores[metric])
+                    if metric in sample_metrics
+                    else cached[corpus_keys[metric]]
+                )
+                for metric in metrics
+            },
+            "sample_level": [
+                {metric: sample_scores[metric][i] for metric in metrics}
+                for i in range(len(inputs))
+            ],
+        }
+
+
+def corpus_bleu(hypotheses: List[str], references: List[List[str]]) -> float:
+    """
+    :param hypotheses: the hypothesis of each sample
+    :param references: the references of each sample, the same number for every sample
+    :return: the corpus BLEU of the hypotheses
+    """
+    return float(
+        sacrebleu.corpus_bleu(hypotheses, _reference_streams(references)).score
+    )
+
+
+def bleu_sample_stats(hypotheses: List[str], references: List[List[str]]) -> np.ndarray:
+    """
+    :param hypotheses: the hypothesis of each sample
+    :param references: the references of each sample, the same number for every sample
+    :return: an array with a row of BLEU statistics (the hypothesis and reference lengths, then the matching and
+             total n-gram counts) for every sample, whose sum over samples gives their corpus BLEU by
+             `bleu_from_stats()`
+    """
+    bleu = sacrebleu.BLEU()
+    stats = bleu._extract_corpus_statistics(hypotheses, _reference_streams(references))
+    return np.array(stats, dtype=np.int64).reshape(
+        len(hypotheses), 2 + 2 * bleu.max_ngram_order
+    )
+
+
+def bleu_from_stats(stats_sum: np.ndarray) -> float:
+    """
+    :param stats_sum: the sum of `bleu_sample_stats()` over samples
+    :return: the corpus BLEU of the samples, the same as `corpus_bleu()`
+    """
+    return float(
+        sacrebleu.BLEU()._compute_score_from_stats([int(x) for x in stats_sum]).score
+    )
+
+
+def _reference_streams(references: List[List[str]]) -> List[List[str]]:
+    n_references = {len(refs) for refs in references}
+    if len(n_references) > 1:
+        raise ValueError('every sample must have the same number of references')
+    return [list(stream) for stream in zip(*references)]
+
+
+_NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+
+class _RougeTokenizer:
+    """
+    The tokenization of `rouge_score`: lowercased alphanumeric tokens, stemmed if longer than 3 characters
+    """
+
+    def __init__(self, use_stemmer: bool = True):
+        self._stemmer = None
+        if use_stemmer:
+            # nltk is slow to import, so it is only imported by the scorers that stem
+            from nltk.stem import porter
+
+            self._stemmer = porter.PorterStemmer()
+        self._stems: Dict[str, str] = {}
+
+    def tokenize(self, text: str) -> List[str]:
+        tokens = _NON_ALPHANUMERIC.sub(" ", text.lower()).split()
+        if self._stemmer is None:
+            return tokens
+        stems = []
+        for token in tokens:
+            stem = self._stems.get(token)
+            if stem is None:
+                stem = self._stems[token] = (
+                    self._stemmer.stem(token) if len(token) > 3 else token
+                )
+            stems.append(stem)
+        return stems
+
+
+def _f_measure(n_overlap: int, n_hypothesis: int, n_reference: int) -> float:
+    precision = n_overlap / max(n_hypothesis, 1)
+    recall = n_overlap / max(n_reference, 1)
+    if precision + recall == 0:
+        return 0.0
+    return 2 * precision * recall / (precision + recall)
+
+
+def _rouge_n(hypothesis: List[str], reference: List[str], n: int) -> float:
+    hypothesis_ngrams = Counter(zip(*[hypothesis[i:] for i in range(n)]))
+    reference_ngrams = Counter(zip(*[reference[i:] for i in range(n)]))
+    n_overlap = sum((hypothesis_ngrams & reference_ngrams).values())
+    return _f_measure(
+        n_overlap,
+        sum(hypothesis_ngrams.values()),
+        sum(reference_ngrams.values()),
+    )
+
+
+def _lcs_length(a: List[str], b: List[str]) -> int:
+    previous = [0] * (len(b) + 1)
+    for x in a:
+        current = [0]
+        for j, y in enumerate(b):
+            current.append(
+                previous[j] + 1 if x == y else max(previous[j + 1], current[j])
+            )
+        previous = current
+    return previous[-1]
+
+
+def _rouge(hypothesis: List[str], reference: List[str], metric: str) -> float:
+    if metric == "rougeL":
+        return _f_measure(
+            _lcs_length(hypothesis, reference), len(hypothesis), len(reference)
+        )
+    return _rouge_n(hypothesis, reference, int(metric[len("rouge") :]))
+
+
+def _score_chunk(chunk) -> List[Dict[str, float]]:
+    hypotheses, references, metrics, use_stemmer = chunk
+    tokenizer = _RougeTokenizer(use_stemmer)
+    rouge_metrics = [metric for metric in metrics if metric != "bleu"]
+    sample_level = []
+    for hypothesis, refs in zip(hypotheses, references):
+        scores = {}
+        if "bleu" in metrics:
+            scores["bleu"] = float(sacrebleu.sentence_bleu(hypothesis, refs).score)
+        if rouge_metrics:
+            hypothesis_tokens = tokenizer.tokenize(hypothesis)
+            reference_tokens = [tokenizer.tokenize(ref) for ref in refs]
+            for metric in rouge_metrics:
+                # the best score against any of the references
+                scores[metric] = max(
+                    (
+                        _rouge(hypothesis_tokens, ref, metric)
+                        for ref in reference_tokens
+                    ),
+                    default=0.0,
+                )
+        sample_level.append({metric: scores[metric] for metric in metrics})
+    return sample_level
@@ -1,17 +1,20 @@
-from typing import Dict, Tuple
-import spacy
-from spacy.language import Language
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from explainaboard.utils.entity_cache import EntityCache, spacy_model_version
+
+# the components that are not needed to find named entities
+_NON_NER_COMPONENTS = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer"]
 
 
 class SpacyLoader:
     """Loader for spacy models. This should be used in a singleton fashion to
     ensure that we don't load the same spacy model multiple times. It also
     encapsulates `spacy.load()` so we don't load big spacy models unless it's
-    necessary."""
+    necessary. spacy itself is only imported when the first model is loaded."""
 
-    _models: Dict[str, Language] = {}
+    _models: Dict[str, Any] = {}
 
-    def get_model(self, name: str) -> Language:
+    def get_model(self, name: str):
         """
         loads a spacy model if it's not in memory and returns it
         Parameter:
@@ -21,6 +24,8 @@ class SpacyLoader:
           - a spacy `Language` object
         """
         if name not in self._models:
+            import spacy
+
             self._models[name] = spacy.load(name)
         return self._models[name]
 
@@ -31,6 +36,47 @@ spacy_loader = SpacyLoader()
 
 def get_named_entities(text: str, model_name="en_core_web_sm") -> Tuple[str]:
     """Use spacy to extract named entities from `text`. All other spacy components are disabled to improve speed."""
-    return spacy_loader.get_model(model_name)(
-        text, disable=["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer"]
-    ).ents
+    return spacy_loader.get_model(model_name)(text, disable=_NON_NER_COMPONENTS).ents
+
+
+def get_named_entities_batch(
+    texts: Sequence[str],
+    model_name: str = "en_core_web_sm",
+    batch_size: int = 256,
+    n_process: int = 1,
+    cache: Optional[EntityCache] = None,
+) -> List[List[Tuple[str, str, int, int]]]:
+    """
+    Extract the named entities of many texts with `nlp.pipe()`, which is much faster than `get_named_entities()` on
+    one text at a time. Each distinct text is only processed once.
+    :param texts: the texts
+    :param model_name: the name of the spacy model
+    :param batch_size: the number of texts spacy processes at once
+    :param n_process: the number of processes spacy uses (-1 means one per CPU)
+    :param cache: a cache of the entities of texts processed before, if any
+    :return: the entities of each text, as `(text, label, start_char, end_char)` tuples
+    """
+    entities: Dict[str, Optional[list]] = {text: None for text in texts}
+    keys = {}
+    if cache is not None:
+        version = spacy_model_version(model_name)
+        keys = {text: cache.make_key(text, model_name, version) for text in entities}
+        cached = cache.get_many(list(keys.values()))
+        for text, key in keys.items():
+            entities[text] = cached.get(key)
+
+    missing = [text for text, value in entities.items() if value is None]
+    if missing:
+        docs = spacy_loader.get_model(model_name).pipe(
+            missing,
+            batch_size=batch_size,
+            n_process=n_process,
+            disable=_NON_NER_COMPONENTS,
+        )
+        for text, doc in zip(missing, docs):
+            entities[text] = [
+                (ent.text, ent.label_, ent.start_char, ent.end_char) for ent in doc.ents
+            ]
+        if cache is not None:
+            cache.put_many({keys[text]: entities[text] for text in missing})
+    return [entities[text] for text in texts]
@@ -0,0 +1,120 @@
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+from explainaboard.utils.py_utils import eprint
+
+# the number of keys looked up by one query, under SQLite's limit on query parameters
+_LOOKUP_BATCH_SIZE = 500
+
+
+class SQLiteCache:
+    """
+    A persistent key-value cache in one table of an SQLite database, which maps binary keys to values and holds at
+    most `max_entries` values by evicting the least recently used ones. Failures to read or write the database are
+    reported and otherwise ignored, like cache misses. Subclasses define the table and how values are stored, see
+    `ScoreCache` and `EntityCache`.
+    """
+
+    # the name of the table, the name and SQL type of its value column, and the name of the cache in error messages
+    table: str = ""
+    value_column: str = "value"
+    value_type: str = "BLOB"
+    description: str = "cache"
+
+    def __init__(self, path: str, max_entries: int):
+        """
+        :param path: the path of the database
+        :param max_entries: the maximum number of values in the cache
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def encode(self, value: Any) -> Any:
+        """
+        :return: the value as stored in the database
+        """
+        return value
+
+    def decode(self, stored: Any) -> Any:
+        """
+        :return: the value of a value stored in the database
+        """
+        return stored
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(
+                self.path, timeout=30, check_same_thread=False
+            )
+            with self._connection as connection:
+                # `used` is the time each value was last stored or looked up
+                connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {self.table} "
+                    f"(key BLOB PRIMARY KEY, {self.value_column} {self.value_type} NOT NULL, "
+                    "used REAL NOT NULL) WITHOUT ROWID"
+                )
+                connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {self.table}_used ON {self.table} (used)"
+                )
+        return self._connection
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, Any]:
+        """
+        :return: a dictionary mapping the keys that are in the cache to their values, which are marked as recently
+                 used
+        """
+        values = {}
+        try:
+            connection = self._connect()
+            for start in range(0, len(keys), _LOOKUP_BATCH_SIZE):
+                batch = keys[start : start + _LOOKUP_BATCH_SIZE]
+                for key, stored in connection.execute(
+                    f"SELECT key, {self.value_column} FROM {self.table} WHERE key IN "
+                    f"({','.join('?' * len(batch))})",
+                    batch,
+                ):
+                    values[key] = self.decode(stored)
+            if values:
+                now = time.time()
+                with connection:
+                    connection.executemany(
+                        f"UPDATE {self.table} SET used = ? WHERE key = ?",
+                        [(now, key) for key in values],
+                    )
+        except (OSError, sqlite3.Error) as e:
+            eprint(f"failed to read the {self.description}: {e}")
+        return values
+
+    def put_many(self, values: Dict[bytes, Any]):
+        """
+        Store values under their keys, then evict the least recently used values if the cache is over its size limit
+        """
+        now = time.time()
+        try:
+            with self._connect() as connection:
+                connection.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, {self.value_column}, used) VALUES (?, ?, ?)",
+                    [(key, self.encode(value), now) for key, value in values.items()],
+                )
+                (n_entries,) = connection.execute(
+                    f"SELECT COUNT(*) FROM {self.table}"
+                ).fetchone()
+                if n_entries > self.max_entries:
+                    connection.execute(
+                        f"DELETE FROM {self.table} WHERE key IN "
+                        f"(SELECT key FROM {self.table} ORDER BY used LIMIT ?)",
+                        (n_entries - self.max_entries,),
+                    )
+        except (OSError, sqlite3.Error) as e:
+            eprint(f"failed to write the {self.description}: {e}")
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
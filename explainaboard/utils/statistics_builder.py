@@ -0,0 +1,235 @@
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from tqdm import tqdm
+
+# the number of tokens that are buffered before they are counted, which bounds the memory of the buffer
+_BATCH_SIZE = 100000
+# the number of samples sent to a worker process at a time
+_SHARD_SIZE = 10000
+# the version of the statistics computed by this module, which is part of the key of cached statistics (see
+# `StatisticsCache.make_key()`), so it must be increased whenever a change here changes the statistics
+STATISTICS_VERSION = 1
+
+
+def get_vocab_rank(vocab: Dict[str, int]) -> Dict[str, int]:
+    """
+    :param vocab: the frequency of each word
+    :return: the rank of each word based on its frequency, where words of the same frequency share a rank
+    """
+    sorted_dict = {
+        key: rank
+        for rank, key in enumerate(sorted(set(vocab.values()), reverse=True), 1)
+    }
+    return {k: sorted_dict[v] for k, v in vocab.items()}
+
+
+class StatisticsBuilder:
+    """
+    Training set statistics computed in a single pass over the samples: the frequency of each token (`vocab`), the
+    frequency of each text length (`length_counts`) and, for the entity tables of sequence labeling tasks, the whole
+    tokenized corpus with its tags. Tokens are buffered and counted in batches, and the corpus is stored and returned
+    as arrays of token and tag IDs rather than lists of strings. Builders of different shards of a training set are combined with
+    `merge()`, see `build_statistics()`.
+    """
+
+    def __init__(
+        self,
+        count_lengths: bool = False,
+        keep_corpus: bool = False,
+        batch_size: int = _BATCH_SIZE,
+    ):
+        """
+        :param count_lengths: whether to count the number of tokens of each sample
+        :param keep_corpus: whether to keep the tokens and tags of all samples, see `corpus()`
+        :param batch_size: the number of tokens buffered before they are counted
+        """
+        self.vocab: Counter = Counter()
+        self.length_counts: Optional[Counter] = Counter() if count_lengths else None
+        self.num_samples = 0
+        self.keep_corpus = keep_corpus
+        self.batch_size = batch_size
+        self._batch: List[str] = []
+        self._tag_batch: List[int] = []
+        # the corpus, as the distinct tokens and chunks of token IDs and tag IDs
+        self._corpus_vocab: Dict[str, int] = {}
+        self._corpus_token_ids: List[np.ndarray] = []
+        self._corpus_tag_ids: List[np.ndarray] = []
+
+    def add(self, tokens: List[str], tags: Optional[List[int]] = None):
+        """
+        Add one sample
+        :param tokens: the tokens of the sample
+        :param tags: the tag IDs of the sample's tokens, if the corpus is kept
+        """
+        self.num_samples += 1
+        if self.length_counts is not None:
+            self.length_counts[len(tokens)] += 1
+        self._batch.extend(tokens)
+        if self.keep_corpus:
+            self._tag_batch.extend(tags)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Count the buffered tokens
+        """
+        if not self._batch:
+            return
+        self.vocab.update(self._batch)
+        if self.keep_corpus:
+            self._corpus_token_ids.append(
+                np.fromiter(
+                    (
+                        self._corpus_vocab.setdefault(t, len(self._corpus_vocab))
+                        for t in self._batch
+                    ),
+                    dtype=np.int32,
+                    count=len(self._batch),
+                )
+            )
+            self._corpus_tag_ids.append(np.array(self._tag_batch, dtype=np.int32))
+        self._batch = []
+        self._tag_batch = []
+
+    def _append_corpus(
+        self, words: List[str], token_ids: np.ndarray, tag_ids: np.ndarray
+    ):
+        """
+        :param words: the words that `token_ids` refer to
+        """
+        mapping = np.array(
+            [self._corpus_vocab.setdefault(w, len(self._corpus_vocab)) for w in words],
+            dtype=np.int32,
+        )
+        self._corpus_token_ids.append(mapping[token_ids])
+        self._corpus_tag_ids.append(tag_ids)
+
+    def merge(self, other: "StatisticsBuilder") -> "StatisticsBuilder":
+        """
+        Add the samples of another builder, as if they were added after the samples of this one
+        :return: this builder
+        """
+        self.flush()
+        other.flush()
+        self.vocab.update(other.vocab)
+        if self.length_counts is not None:
+            self.length_counts.update(other.length_counts)
+        self.num_samples += other.num_samples
+        if self.keep_corpus:
+            other_words = list(other._corpus_vocab)
+            for token_ids, tag_ids in zip(
+                other._corpus_token_ids, other._corpus_tag_ids
+            ):
+                self._append_corpus(other_words, token_ids, tag_ids)
+        return self
+
+    def vocab_rank(self) -> Dict[str, int]:
+        """
+        :return: the rank of each token based on its frequency
+        """
+        self.flush()
+        return get_vocab_rank(self.vocab)
+
+    def length_fre(self) -> Dict[int, float]:
+        """
+        :return: the fraction of samples of each length
+        """
+        self.flush()
+        return {k: v * 1.0 / self.num_samples for k, v in self.length_counts.items()}
+
+    def corpus(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        :return: the distinct tokens, and the token IDs (indices into the distinct tokens) and tag IDs of all samples,
+                 concatenated in the order the samples were added
+        """
+        self.flush()
+        if not self._corpus_token_ids:
+            return [], np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+        return (
+            list(self._corpus_vocab),
+            np.concatenate(self._corpus_token_ids),
+            np.concatenate(self._corpus_tag_ids),
+        )
+
+    def statistics(self) -> dict:
+        """
+        :return: the vocabulary statistics, and the length statistics if lengths are counted
+        """
+        self.flush()
+        statistics = {"vocab": dict(self.vocab), "vocab_rank": self.vocab_rank()}
+        if self.length_counts is not None:
+            statistics["length_fre"] = self.length_fre()
+        return statistics
+
+
+def _add_samples(
+    builder: StatisticsBuilder,
+    texts: Iterable[Union[str, List[str]]],
+    tags: Optional[Iterable[List[int]]],
+) -> StatisticsBuilder:
+    for text, sample_tags in zip(texts, repeat(None) if tags is None else tags):
+        builder.add(text.split(" ") if isinstance(text, str) else text, sample_tags)
+    return builder
+
+
+def _build_shard(
+    texts: List[Union[str, List[str]]], tags: Optional[List[List[int]]], kwargs: dict
+) -> StatisticsBuilder:
+    builder = _add_samples(StatisticsBuilder(**kwargs), texts, tags)
+    builder.flush()
+    return builder
+
+
+def build_statistics(
+    texts: Iterable[Union[str, List[str]]],
+    tags: Optional[Iterable[List[int]]] = None,
+    num_workers: Optional[int] = None,
+    shard_size: int = _SHARD_SIZE,
+    **kwargs,
+) -> StatisticsBuilder:
+    """
+    Build the statistics of a training set, in `num_workers` processes if there is more than one shard. The samples
+    are read in shards of `shard_size` samples, each shard is counted by a `StatisticsBuilder` in a worker process,
+    and the shards are merged in order, so the result is identical to a serial build. At most two shards per worker
+    are in flight at a time, which bounds the memory used for large training sets.
+    :param texts: the text of each sample (tokenized with `text.split(" ")`) or its tokens
+    :param tags: the tag IDs of each sample, for builders that keep the corpus
+    :param num_workers: the number of worker processes, the `EXPLAINABOARD_STATISTICS_WORKERS` environment variable
+                        or 1 by default
+    :param shard_size: the number of samples per shard
+    :param kwargs: the arguments of `StatisticsBuilder`
+    :return: the builder of the whole training set
+    """
+    if num_workers is None:
+        num_workers = int(os.environ.get("EXPLAINABOARD_STATISTICS_WORKERS", 1))
+    builder = StatisticsBuilder(**kwargs)
+    texts = tqdm(texts)
+    if num_workers <= 1:
+        return _add_samples(builder, texts, tags)
+
+    texts = iter(texts)
+    tags = None if tags is None else iter(tags)
+
+    def next_shard():
+        shard_texts = list(islice(texts, shard_size))
+        shard_tags = None if tags is None else list(islice(tags, len(shard_texts)))
+        return shard_texts, shard_tags
+
+    shard = next_shard()
+    if len(shard[0]) < shard_size:
+        # a single shard is not worth starting worker processes
+        return _add_samples(builder, *shard)
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures: deque = deque()
+        while shard[0] or futures:
+            while shard[0] and len(futures) < 2 * num_workers:
+                futures.append(executor.submit(_build_shard, *shard, kwargs))
+                shard = next_shard()
+            builder.merge(futures.popleft().result())
+    return builder
@@ -0,0 +1,155 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import tempfile
+import zlib
+from typing import Any, Callable, Optional
+
+from explainaboard.utils.py_utils import eprint
+from explainaboard.utils.statistics_builder import STATISTICS_VERSION
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "explainaboard", "statistics"
+)
+DEFAULT_MAX_SIZE = 1 << 30  # 1GB
+
+_SUFFIX = ".stat"
+
+
+def statistics_func_version(statistics_func: Callable) -> str:
+    """
+    A version string of a statistics function that changes whenever its code does
+    :param statistics_func: a statistics function, either a plain function or a DataLab operation wrapping one
+    :return: the hash of the function's source code (or of its bytecode if the source is not available)
+    """
+    func = getattr(statistics_func, "func", statistics_func)
+    try:
+        code = inspect.getsource(func).encode("utf8")
+    except (OSError, TypeError):
+        code = getattr(getattr(func, "__code__", None), "co_code", repr(func).encode())
+    return hashlib.sha256(code).hexdigest()
+
+
+def dataset_fingerprint(
+    dataset_name: str, sub_dataset_name: Optional[str] = None
+) -> Optional[str]:
+    """
+    A fingerprint of a DataLab dataset, which changes when its loading script or version does. Only locally
+    available files are used, so that looking up the cache does not go through the network.
+    :return: the fingerprint, or None if the dataset builder cannot be resolved locally
+    """
+    try:
+        from datalabs import DownloadConfig, load_dataset_builder
+
+        builder = load_dataset_builder(
+            dataset_name,
+            sub_dataset_name,
+            download_config=DownloadConfig(local_files_only=True),
+        )
+        return f"{builder.hash}:{builder.info.version}"
+    except Exception:
+        return None
+
+
+class StatisticsCache:
+    """
+    A local, content-addressed cache of training set statistics. Every entry is stored as one zlib-compressed pickle
+    file named after the hash of its key, so that `get()` never touches the network or the dataset. The total size of
+    the cache is kept under `max_size` bytes by evicting the least recently used entries.
+
+    The cache directory defaults to the `EXPLAINABOARD_CACHE_DIR` environment variable or
+    `~/.cache/explainaboard/statistics`.
+    """
+
+    def __init__(
+        self, cache_dir: Optional[str] = None, max_size: int = DEFAULT_MAX_SIZE
+    ):
+        self.cache_dir = (
+            cache_dir or os.environ.get("EXPLAINABOARD_CACHE_DIR") or DEFAULT_CACHE_DIR
+        )
+        self.max_size = max_size
+
+    @staticmethod
+    def make_key(
+        dataset_name: str,
+        sub_dataset_name: Optional[str],
+        statistics_func: Callable,
+        fingerprint: Optional[str] = None,
+    ) -> str:
+        """
+        :param dataset_name: the name of the dataset
+        :param sub_dataset_name: the name of the subset, if any
+        :param statistics_func: the function that calculates the statistics
+        :param fingerprint: a fingerprint of the dataset content (see `dataset_fingerprint()`)
+        :return: the cache key, which also changes with `STATISTICS_VERSION` since the source code of a statistics
+                 function does not cover the helpers it calls
+        """
+        key = json.dumps(
+            [
+                dataset_name,
+                sub_dataset_name,
+                STATISTICS_VERSION,
+                statistics_func_version(statistics_func),
+                fingerprint,
+            ]
+        )
+        return hashlib.sha256(key.encode("utf8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + _SUFFIX)
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        :return: the statistics stored under `key`, or None if there are none
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fin:
+                statistics = pickle.loads(zlib.decompress(fin.read()))
+            # mark the entry as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError):
+            eprint(f"ignoring corrupted statistics cache entry {path}")
+            return None
+        return statistics
+
+    def put(self, key: str, statistics: Any):
+        """
+        Store statistics under `key`, then evict the least recently used entries if the cache is over its size limit
+        """
+        data = zlib.compress(pickle.dumps(statistics, protocol=pickle.HIGHEST_PROTOCOL))
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # write to a temporary file first so that concurrent readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as fout:
+                fout.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            eprint(f"failed to write the statistics cache: {e}")
+            return
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(_SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total_size -= size
@@ -0,0 +1,116 @@
+from typing import Callable, Dict, Iterable, List, Sequence, Union
+
+import numpy as np
+
+
+class TokenizedTexts:
+    """
+    Space-tokenized texts (i.e. `text.split(" ")` for each text), stored compactly as the distinct tokens, one flat
+    array of token IDs and the offset of each text into it.
+    """
+
+    def __init__(self, vocab: np.ndarray, token_ids: np.ndarray, offsets: np.ndarray):
+        self.vocab = vocab
+        self.token_ids = token_ids
+        self.offsets = offsets
+
+    @classmethod
+    def _from_tokens(
+        cls, tokens: Iterable[str], lengths: List[int]
+    ) -> "TokenizedTexts":
+        """
+        :param tokens: the tokens of all texts, concatenated
+        :param lengths: the number of tokens of each text
+        """
+        # the distinct tokens are numbered with a dictionary and stored as objects, since a fixed-width string array
+        # would pad every token to the length of the longest one
+        token_to_id: Dict[str, int] = {}
+        token_ids = np.fromiter(
+            (token_to_id.setdefault(t, len(token_to_id)) for t in tokens),
+            dtype=int,
+            count=sum(lengths),
+        )
+        vocab = np.empty(len(token_to_id), dtype=object)
+        vocab[:] = list(token_to_id)
+        offsets = np.zeros(len(lengths) + 1, dtype=int)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(vocab, token_ids, offsets)
+
+    @classmethod
+    def from_texts(cls, texts: Sequence[str]) -> "TokenizedTexts":
+        texts = list(texts)
+        if not texts:
+            return cls._from_tokens([], [])
+        lengths = [text.count(" ") + 1 for text in texts]
+        # joining on the delimiter keeps the token boundaries of `text.split(" ")` for every text
+        return cls._from_tokens(" ".join(texts).split(" "), lengths)
+
+    @classmethod
+    def from_token_lists(cls, token_lists: Sequence[List[str]]) -> "TokenizedTexts":
+        """
+        :param token_lists: the texts, already tokenized
+        """
+        return cls._from_tokens(
+            (token for tokens in token_lists for token in tokens),
+            [len(tokens) for tokens in token_lists],
+        )
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def lengths(self) -> np.ndarray:
+        """
+        :return: the number of tokens of each text
+        """
+        return np.diff(self.offsets)
+
+    def text_ids(self) -> np.ndarray:
+        """
+        :return: the index of the text each entry of `token_ids` belongs to
+        """
+        return np.repeat(np.arange(len(self)), self.lengths())
+
+    def tokens(self, index: int) -> List[str]:
+        """
+        :return: the tokens of one text
+        """
+        return self.vocab[
+            self.token_ids[self.offsets[index] : self.offsets[index + 1]]
+        ].tolist()
+
+
+class TokenCache:
+    """
+    A cache of tokenized text fields that lives as long as one system output, so that every feature function
+    reading e.g. the "text" field shares a single tokenization. `hits` and `misses` count the lookups that were
+    served from the cache and the ones that had to tokenize.
+    """
+
+    def __init__(self):
+        self._cache: Dict[str, TokenizedTexts] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self, key: str, texts: Union[Sequence[str], Callable[[], Sequence[str]]]
+    ) -> TokenizedTexts:
+        """
+        Get the tokenization stored under `key`, tokenizing `texts` if it is not cached yet
+        :param key: the cache key, usually the name of a text field
+        :param texts: the texts to tokenize, or a function returning them so that they are only built on a miss
+        :return: the tokenized texts
+        """
+        tokenized = self._cache.get(key)
+        if tokenized is not None:
+            self.hits += 1
+            return tokenized
+        self.misses += 1
+        tokenized = TokenizedTexts.from_texts(texts() if callable(texts) else texts)
+        self._cache[key] = tokenized
+        return tokenized
+
+    def invalidate(self, key: str):
+        self._cache.pop(key, None)
+
+    def __repr__(self) -> str:
+        return f"TokenCache(keys={list(self._cache)}, hits={self.hits}, misses={self.misses})"
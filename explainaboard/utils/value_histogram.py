@@ -0,0 +1,163 @@
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from explainaboard.feature import BucketInfo
+from explainaboard.utils import bucketing
+
+
+class ValueHistogram:
+    """
+    Running statistics of one bucketing feature: for each feature value, the number of samples and the sums of
+    their metric statistics. Bucket boundaries and bucket performance only depend on these, so a system output can
+    be folded into a histogram chunk by chunk and bucketed at the end without keeping the samples around.
+
+    Numeric histograms keep at most `max_bins` bins sorted by value: when there are more distinct values, adjacent
+    bins are merged (keeping their lowest and highest values), which makes bucket boundaries approximate. Discrete
+    histograms (e.g. labels) keep one bin per distinct value, in order of first appearance.
+    """
+
+    def __init__(self, bucket_info: BucketInfo, max_bins: int = 100000):
+        self.bucket_info = bucket_info
+        self.numeric = bucket_info.method != "bucket_attribute_discrete_value" and not (
+            bucket_info.method == "bucket_attribute_specified_bucket_interval"
+            and isinstance(list(bucket_info.setting)[0][0], str)
+        )
+        self.max_bins = max_bins
+        # numeric bins are described by their lowest and highest values, discrete ones by `values`
+        self.low_values = np.zeros(0, dtype=np.float64)
+        self.high_values = np.zeros(0, dtype=np.float64)
+        self.values: List[Any] = []
+        self._value_to_bin: Dict[Any, int] = {}
+        self.counts = np.zeros(0, dtype=int)
+        self.stats: Dict[str, np.ndarray] = {}
+
+    def add(self, values: Sequence, stats: Dict[str, np.ndarray]):
+        """
+        Fold a chunk of samples into the histogram
+        :param values: the feature value of each sample in the chunk
+        :param stats: a dictionary mapping metric names to (n_samples, n_stats) arrays of sample statistics
+        """
+        if len(values) == 0:
+            return
+        if self.numeric:
+            self._add_numeric(values, stats)
+        else:
+            self._add_discrete(values, stats)
+
+    def _add_numeric(self, values: Sequence, stats: Dict[str, np.ndarray]):
+        order, distinct_values, counts = bucketing.group_float_values(values)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        low_values = np.concatenate((self.low_values, distinct_values))
+        high_values = np.concatenate((self.high_values, distinct_values))
+        all_counts = np.concatenate((self.counts, counts))
+        all_stats = {
+            name: np.concatenate(
+                (
+                    self.stats.get(name, np.zeros((0, metric_stats.shape[1]))),
+                    np.add.reduceat(metric_stats[order], starts, axis=0),
+                )
+            )
+            for name, metric_stats in stats.items()
+        }
+
+        # combine bins with the same range
+        bin_order = np.lexsort((high_values, low_values))
+        low_values, high_values = low_values[bin_order], high_values[bin_order]
+        is_new = np.ones(len(bin_order), dtype=bool)
+        is_new[1:] = (low_values[1:] != low_values[:-1]) | (
+            high_values[1:] != high_values[:-1]
+        )
+        self._set_bins(
+            np.flatnonzero(is_new),
+            low_values,
+            high_values,
+            all_counts[bin_order],
+            {name: s[bin_order] for name, s in all_stats.items()},
+        )
+
+        # merge pairs of adjacent bins until there are at most `max_bins`
+        while len(self.counts) > self.max_bins:
+            starts = np.arange(0, len(self.counts), 2)
+            ends = np.minimum(starts + 1, len(self.counts) - 1)
+            self.low_values, self.high_values = (
+                self.low_values[starts],
+                self.high_values[ends],
+            )
+            self.counts = np.add.reduceat(self.counts, starts)
+            self.stats = {
+                name: np.add.reduceat(s, starts, axis=0)
+                for name, s in self.stats.items()
+            }
+
+    def _set_bins(self, starts, low_values, high_values, counts, stats):
+        self.low_values = low_values[starts]
+        self.high_values = high_values[starts]
+        self.counts = np.add.reduceat(counts, starts)
+        self.stats = {
+            name: np.add.reduceat(s, starts, axis=0) for name, s in stats.items()
+        }
+
+    def _add_discrete(self, values: Sequence, stats: Dict[str, np.ndarray]):
+        distinct_values, group_ids = bucketing.group_discrete_values(values)
+        n_bins = len(self.values)
+        bins = []
+        for v in distinct_values:
+            if v not in self._value_to_bin:
+                self._value_to_bin[v] = len(self.values)
+                self.values.append(v)
+            bins.append(self._value_to_bin[v])
+        n_new = len(self.values) - n_bins
+        sample_bins = np.array(bins, dtype=int)[group_ids]
+        self.counts = np.concatenate((self.counts, np.zeros(n_new, dtype=int)))
+        self.counts += np.bincount(sample_bins, minlength=len(self.counts))
+        for name, metric_stats in stats.items():
+            bin_stats = self.stats.get(name, np.zeros((0, metric_stats.shape[1])))
+            bin_stats = np.concatenate(
+                (bin_stats, np.zeros((n_new, metric_stats.shape[1])))
+            )
+            np.add.at(bin_stats, sample_bins, metric_stats)
+            self.stats[name] = bin_stats
+
+    def get_buckets(self) -> Tuple[List[tuple], np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Bucket the histogram with its `bucket_info`, in the same way as the functions in `utils.bucketing`
+        :return: the bucket keys, the number of samples in each bucket and, for each metric, the sums of the sample
+            statistics in each bucket followed by the number of samples, as taken by `Metric.evaluate_from_stats_sum()`
+        """
+        bucket_info = self.bucket_info
+        if bucket_info.method == "bucket_attribute_specified_bucket_value":
+            if len(self.counts) == 0:
+                return [], np.zeros(0, dtype=int), {}
+            keys, bin_bucket = bucketing.specified_bucket_value_groups(
+                self.low_values,
+                self.high_values,
+                self.counts,
+                bucket_info.number,
+                bucket_info.setting,
+            )
+        elif bucket_info.method == "bucket_attribute_discrete_value":
+            keys, bin_bucket = bucketing.discrete_value_groups(
+                self.counts, self.values, bucket_info.number, bucket_info.setting
+            )
+        elif bucket_info.method == "bucket_attribute_specified_bucket_interval":
+            keys, bin_bucket = bucketing.specified_bucket_interval_groups(
+                self.low_values if self.numeric else self.values,
+                self.counts,
+                bucket_info.setting,
+            )
+        else:
+            raise ValueError(f"unknown bucketing method {bucket_info.method}")
+
+        in_bucket = bin_bucket >= 0
+        bucket_counts = np.bincount(
+            bin_bucket[in_bucket], weights=self.counts[in_bucket], minlength=len(keys)
+        ).astype(int)
+        bucket_stats = {}
+        for name, bin_stats in self.stats.items():
+            stats_sum = np.zeros((len(keys), bin_stats.shape[1]))
+            np.add.at(stats_sum, bin_bucket[in_bucket], bin_stats[in_bucket])
+            bucket_stats[name] = np.concatenate(
+                (stats_sum, bucket_counts[:, np.newaxis]), axis=1
+            )
+        return keys, bucket_counts, bucket_stats
@@ -0,0 +1,85 @@
+from typing import Any, Dict, Sequence, Tuple
+
+import numpy as np
+
+# the number of compiled indexes kept by `get_vocab_index()`, usually one per training set in use
+_MAX_CACHED_INDEXES = 2
+_index_cache: Dict[int, Tuple[Any, "VocabIndex"]] = {}
+
+
+class VocabIndex:
+    """
+    The vocabulary of training set statistics (`statistics['vocab']` and `statistics['vocab_rank']`) compiled into a
+    dictionary from each word to its position in arrays of the words' properties, so that the properties of all the
+    distinct tokens of a corpus are looked up once per token and gathered with array indexing.
+    """
+
+    def __init__(self, vocab: dict, vocab_rank: dict):
+        """
+        :param vocab: the frequency of each training set word
+        :param vocab_rank: the frequency rank of each training set word
+        """
+        # tokens that have no rank are ranked last, like the least frequent words
+        self.oov_rank = len(vocab_rank)
+        words = list(vocab_rank)
+        ranks = np.fromiter(vocab_rank.values(), dtype=np.float64, count=len(words))
+        # both are usually calculated from the same words, which saves looking up every word in `vocab`
+        same_words = vocab.keys() == vocab_rank.keys()
+        if not same_words:
+            unranked = [w for w in vocab if w not in vocab_rank]
+            words += unranked
+            ranks = np.concatenate([ranks, np.full(len(unranked), self.oov_rank)])
+        self.word_to_index: Dict[str, int] = {w: i for i, w in enumerate(words)}
+        if same_words:
+            in_vocab = np.ones(len(words), dtype=bool)
+        else:
+            in_vocab = np.fromiter(
+                (w in vocab for w in words), dtype=bool, count=len(words)
+            )
+        # the last entry holds the properties of the tokens that are not in the index, i.e. at position -1
+        self.ranks = np.append(ranks, self.oov_rank)
+        self.in_vocab = np.append(in_vocab, False)
+
+    def find(self, tokens: Sequence[str]) -> np.ndarray:
+        """
+        :param tokens: a sequence of tokens
+        :return: the position of each token in the index, or -1 for the tokens that are not in the index
+        """
+        return np.fromiter(
+            (self.word_to_index.get(t, -1) for t in tokens),
+            dtype=int,
+            count=len(tokens),
+        )
+
+    def is_oov(self, tokens: Sequence[str]) -> np.ndarray:
+        """
+        :param tokens: a sequence of tokens
+        :return: whether each token is out of the training set vocabulary
+        """
+        return ~self.in_vocab[self.find(tokens)]
+
+    def rank(self, tokens: Sequence[str]) -> np.ndarray:
+        """
+        :param tokens: a sequence of tokens
+        :return: the frequency rank of each token, `oov_rank` for the tokens without one
+        """
+        return self.ranks[self.find(tokens)]
+
+
+def get_vocab_index(statistics: Any) -> VocabIndex:
+    """
+    :param statistics: training set statistics with a "vocab" and a "vocab_rank"
+    :return: the vocabulary index of the statistics, which is compiled on the first call and reused by later calls
+             with the same statistics
+    """
+    cached = _index_cache.get(id(statistics))
+    # the cache holds a reference to the statistics, so their id is not reused while they are cached
+    if cached is None or cached[0] is not statistics:
+        cached = (
+            statistics,
+            VocabIndex(statistics['vocab'], statistics['vocab_rank']),
+        )
+        while len(_index_cache) >= _MAX_CACHED_INDEXES:
+            _index_cache.pop(next(iter(_index_cache)))
+        _index_cache[id(statistics)] = cached
+    return cached[1]
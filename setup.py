@@ -40,6 +40,7 @@ setup(
         "pandas",
         "pyarrow",
         "eaas",
+        "aiohttp",
         "wheel",
         "tqdm",
         "sacrebleu",